@@ -0,0 +1,421 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""Benchmarks for the P3 OpenStreetMap pipeline on synthetic data.
+
+Generates a reproducible OSM XML file of configurable size, then times each
+stage of the pipeline on it (audit, shaping, cleaning, csv export, sqlite load,
+every named query, and all of them at once through the query service) and
+writes the results as JSON, so that runs on different commits can be compared:
+
+    python p3_benchmark.py --nodes 200000 --output before.json
+    python p3_benchmark.py --nodes 200000 --output after.json --compare before.json
+
+Each stage runs in its own process, so its peak memory is measured on its
+own. Stages are module-level functions or callable objects, so they work with
+any multiprocessing start method, not just fork.
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import quoteattr
+
+import p3_osm
+from p3_osm import aggregates, queries, spatial
+from p3_osm.export import open_csv
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+timer = time.perf_counter
+
+
+# ================================================== #
+#               Synthetic Data                       #
+# ================================================== #
+STREET_BASES = [u'Greifswalder', u'Prenzlauer', u'Bornholmer', u'Sch\xf6nhauser', u'Danziger', u'Wisbyer',
+                u'Kastanien', u'Pappel', u'Linden', u'Dunckers', u'M\xfchlen', u'Ostsee', u'Berliner', u'Hermann']
+STREET_TYPES = [u'Stra\xdfe', u'Allee', u'Weg', u'Platz', u'Ufer']
+DIRTY_STREET_TYPES = [u'Str.', u'Str', u'Strasse', u'str.', u'strasse']
+AMENITIES = ['restaurant', 'cafe', 'fast_food', 'bench', 'parking', 'bicycle_parking', 'post_box', 'pharmacy']
+CUISINES = ['italian', 'vietnamese', 'german', 'pizza', 'coffee_shop', 'burger', 'thai', 'indian']
+LEISURE = ['playground', 'pitch', 'park', 'garden', 'hackerspace']
+SPORTS = ['table_tennis', 'soccer', 'basketball', 'beachvolleyball']
+PHONE_FORMATS = [u'+49 30 {a}{b}', u'030 {a} {b}', u'(030) {a}-{b}', u'+49 (0)30 {a} {b}', u'0049 30 {a}{b}',
+                 u'030/{a}{b}', u'+49 171 {a}{b}', u'0176 {a}{b}', u'{a}{b}']
+BERLIN_NORDOST = (52.50, 13.38, 52.60, 13.52)
+
+
+def street_name(rng, dirty_ratio):
+    base = rng.choice(STREET_BASES)
+    if rng.random() < dirty_ratio:
+        name = base + u' ' + rng.choice(DIRTY_STREET_TYPES)
+        return name.lower() if rng.random() < 0.2 else name
+    return base + u' ' + rng.choice(STREET_TYPES)
+
+
+def phone_num(rng, dirty_ratio):
+    a, b = rng.randint(100, 999), rng.randint(1000, 9999)
+    fmt = rng.choice(PHONE_FORMATS) if rng.random() < dirty_ratio else PHONE_FORMATS[0]
+    return fmt.format(a=a, b=b)
+
+
+def node_tags(rng, tags_per_node, dirty_ratio):
+    if rng.random() >= tags_per_node / 4.0:
+        return []
+    kind = rng.random()
+    if kind < 0.5:
+        amenity = rng.choice(AMENITIES)
+        tags = [('amenity', amenity)]
+        if amenity in ('restaurant', 'cafe', 'fast_food'):
+            tags.append(('cuisine', rng.choice(CUISINES)))
+    else:
+        leisure = rng.choice(LEISURE)
+        tags = [('leisure', leisure)]
+        if leisure == 'pitch':
+            tags.append(('sport', rng.choice(SPORTS)))
+    tags.append(('addr:street', street_name(rng, dirty_ratio)))
+    tags.append(('addr:housenumber', str(rng.randint(1, 200))))
+    if rng.random() < 0.5:
+        tags.append(('phone', phone_num(rng, dirty_ratio)))
+    return tags
+
+
+def generate_osm(path, nodes=100000, ways=15000, relations=500, tags_per_node=1.0, nodes_per_way=8,
+                 dirty_ratio=0.3, seed=42):
+    """Write a reproducible OSM XML file with the given number of elements and share of dirty values"""
+
+    rng = random.Random(seed)
+    min_lat, min_lon, max_lat, max_lon = BERLIN_NORDOST
+    users = [(u'mapper%d' % i, i + 1) for i in range(200)]
+
+    def attrs(el_id):
+        user, uid = rng.choice(users)
+        return u'id="%d" user=%s uid="%d" version="%d" changeset="%d" timestamp="2016-%02d-%02dT12:00:00Z"' % (
+            el_id, quoteattr(user), uid, rng.randint(1, 9), rng.randint(1, 10 ** 7),
+            rng.randint(1, 12), rng.randint(1, 28))
+
+    def tag_lines(tags):
+        return u''.join(u'  <tag k=%s v=%s/>\n' % (quoteattr(k), quoteattr(v)) for k, v in tags)
+
+    with open(path, 'wb') as f:
+        def write(text):
+            f.write(text.encode('utf-8'))
+
+        write(u'<?xml version="1.0" encoding="UTF-8"?>\n<osm version="0.6" generator="p3_benchmark">\n')
+        write(u' <bounds minlat="%s" minlon="%s" maxlat="%s" maxlon="%s"/>\n' % BERLIN_NORDOST)
+        for node_id in range(1, nodes + 1):
+            lat = round(rng.uniform(min_lat, max_lat), 7)
+            lon = round(rng.uniform(min_lon, max_lon), 7)
+            tags = node_tags(rng, tags_per_node, dirty_ratio)
+            head = u' <node %s lat="%s" lon="%s"' % (attrs(node_id), lat, lon)
+            write(head + (u'>\n' + tag_lines(tags) + u' </node>\n' if tags else u'/>\n'))
+        for way_id in range(1, ways + 1):
+            start = rng.randint(1, max(nodes - nodes_per_way, 1))
+            refs = range(start, min(start + rng.randint(2, 2 * nodes_per_way), nodes + 1))
+            name = street_name(rng, dirty_ratio)
+            tags = [('highway', 'residential'), ('name', name)]
+            if rng.random() < 0.5:
+                tags.append(('addr:street', name))
+            write(u' <way %s>\n' % attrs(way_id) + u''.join(u'  <nd ref="%d"/>\n' % ref for ref in refs) +
+                  tag_lines(tags) + u' </way>\n')
+        for relation_id in range(1, relations + 1):
+            members = [(u'way', rng.randint(1, max(ways, 1)), u'outer') for _ in range(rng.randint(1, 4))]
+            write(u' <relation %s>\n' % attrs(relation_id) +
+                  u''.join(u'  <member type="%s" ref="%d" role="%s"/>\n' % m for m in members) +
+                  tag_lines([('type', 'multipolygon')]) + u' </relation>\n')
+        write(u'</osm>\n')
+
+
+# ================================================== #
+#               Stages                               #
+# ================================================== #
+def tag_values(osm_path, key):
+    return [tag.get('v') for tag in ET.parse(osm_path).getroot().iter('tag') if tag.get('k') == key]
+
+
+def stage_audit(osm_path, work_dir):
+    n = count_elements(osm_path, ('node', 'way'))
+    start = timer()
+    p3_osm.audit(osm_path)
+    return n, timer() - start
+
+
+def stage_shape_element(osm_path, work_dir):
+    elements = [el for el in ET.parse(osm_path).getroot() if el.tag in ('node', 'way')]
+    start = timer()
+    for element in elements:
+        p3_osm.shape_element(element)
+    return len(elements), timer() - start
+
+
+def stage_update_name(osm_path, work_dir):
+    names = tag_values(osm_path, 'addr:street')
+    start = timer()
+    for name in names:
+        p3_osm.update_name(name, p3_osm.mapping)
+    return len(names), timer() - start
+
+
+def stage_update_phone_num(osm_path, work_dir):
+    nums = tag_values(osm_path, 'phone')
+    start = timer()
+    for num in nums:
+        p3_osm.update_phone_num(num)
+    return len(nums), timer() - start
+
+
+def stage_csv_writers(osm_path, work_dir):
+    shaped = [p3_osm.shape_element(el) for el in ET.parse(osm_path).getroot() if el.tag in ('node', 'way')]
+    paths = [os.path.join(work_dir, os.path.basename(path)) for path in p3_osm.CSV_PATHS]
+    files = [open_csv(path) for path in paths]
+    writers = dict(zip(['node', 'node_tags', 'way', 'way_nodes', 'way_tags'],
+                       [csv.DictWriter(f, fields) for f, fields in
+                        zip(files, [p3_osm.NODE_FIELDS, p3_osm.NODE_TAGS_FIELDS, p3_osm.WAY_FIELDS,
+                                    p3_osm.WAY_NODES_FIELDS, p3_osm.WAY_TAGS_FIELDS])]))
+    start = timer()
+    for el in shaped:
+        for part, rows in el.items():
+            if isinstance(rows, list):
+                writers[part].writerows(rows)
+            else:
+                writers[part].writerow(rows)
+    for f in files:
+        f.close()
+    return len(shaped), timer() - start
+
+
+def stage_process_map(osm_path, work_dir):
+    n = count_elements(osm_path, ('node', 'way'))
+    os.chdir(work_dir)
+    start = timer()
+    p3_osm.process_map(osm_path, validate=False)
+    return n, timer() - start
+
+
+def stage_scan_osm(osm_path, work_dir):
+    rows = p3_osm.ScannedRows()
+    n = 0
+    for count in p3_osm.scan_osm(osm_path, rows, tags=('node', 'way')):
+        rows.clear()
+        n += count
+    return n
+
+
+def stage_process_map_scan(osm_path, work_dir):
+    os.chdir(work_dir)
+    return p3_osm.process_map_scan(osm_path)
+
+
+def stage_load_sqlite(osm_path, work_dir):
+    db_path = os.path.join(work_dir, 'bench.db')
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    return p3_osm.load_sqlite(osm_path, db_path, geometry=True)
+
+
+def stage_load_shards(osm_path, work_dir):
+    out_dir = os.path.join(work_dir, 'shards')
+    shutil.rmtree(out_dir, ignore_errors=True)
+    manifest = p3_osm.load_shards(osm_path, out_dir, size=0.02, geometry=True)
+    return sum(entry['elements'] for entry in manifest['shards'].values())
+
+
+def count_elements(osm_path, tags):
+    return sum(1 for el in ET.parse(osm_path).getroot() if el.tag in tags)
+
+
+class QueryStage(object):
+    """Stage that runs one report query, the best of repeat runs"""
+
+    def __init__(self, name, aggregate=False, repeat=3):
+        self.name = name
+        self.aggregate = aggregate
+        self.repeat = repeat
+
+    def __call__(self, osm_path, work_dir):
+        if self.aggregate:
+            query = aggregates.AGGREGATE_QUERIES[self.name]
+        else:
+            query = getattr(spatial if self.name.endswith('_IN_BBOX') else queries, self.name)
+        con = sqlite3.connect(os.path.join(work_dir, 'bench.db'))
+        params = spatial.bbox(52.52, 13.40, 52.56, 13.46) if self.name.endswith('_IN_BBOX') else ()
+        best = None
+        rows = 0
+        for _ in range(self.repeat):
+            start = timer()
+            rows = len(con.execute(query, params).fetchall())
+            elapsed = timer() - start
+            best = elapsed if best is None else min(best, elapsed)
+        con.close()
+        return rows, best
+
+
+class ServiceStage(object):
+    """Stage that runs all the named queries through a QueryService of workers connections, the best of repeat runs"""
+
+    def __init__(self, workers, repeat=3):
+        self.workers = workers
+        self.repeat = repeat
+
+    def __call__(self, osm_path, work_dir):
+        names = [name for name, query in queries.NAMED_QUERIES]
+        best = None
+        for _ in range(self.repeat):
+            # A new service each time, so nothing comes from its cache
+            with p3_osm.QueryService(os.path.join(work_dir, 'bench.db'), size=self.workers) as service:
+                start = timer()
+                service.reports(names, aggregates=False)
+                elapsed = timer() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return len(names), best
+
+
+# Stages report either the number of items (and are timed as a whole), or
+# (items, seconds) when setup work has to be left out of the timing
+STAGES = [('audit', stage_audit),
+          ('shape_element', stage_shape_element),
+          ('update_name', stage_update_name),
+          ('update_phone_num', stage_update_phone_num),
+          ('csv_writers', stage_csv_writers),
+          ('process_map', stage_process_map),
+          ('scan_osm', stage_scan_osm),
+          ('process_map_scan', stage_process_map_scan),
+          ('load_sqlite', stage_load_sqlite),
+          ('load_shards', stage_load_shards)]
+QUERY_NAMES = ['N_NODES', 'N_WAYS', 'N_UNIQUE_USERS', 'TOP_10_AMENITIES', 'CUISINES', 'LEISURE', 'SPORTS',
+               'STREET_STR', 'NAMES_DUPL', 'STR_IN_NAMES_ONLY', 'STR_IN_NAMES_ONLY_COUNT',
+               'CUISINES_IN_BBOX', 'SPORTS_IN_BBOX']
+
+
+# What the items of a stage are: the query stages count the rows of their result, not rows scanned,
+# so their rates are not comparable with those of the parsing stages
+STAGE_UNITS = {'update_name': 'values', 'update_phone_num': 'values'}
+PREFIX_UNITS = {'query': 'rows', 'aggregate': 'rows', 'service': 'queries'}
+
+
+def stage_unit(name):
+    if ':' in name:
+        return PREFIX_UNITS[name.split(':', 1)[0]]
+    return STAGE_UNITS.get(name, 'elements')
+
+
+def run_stage(conn, stage, osm_path, work_dir):
+    start = timer()
+    try:
+        result = stage(osm_path, work_dir)
+    except BaseException:
+        # The exception itself may not pickle, so the parent gets the traceback text
+        conn.send({'error': traceback.format_exc()})
+        conn.close()
+        return
+    elapsed = timer() - start
+    items, seconds = result if isinstance(result, tuple) else (result, elapsed)
+    # ru_maxrss is in kB on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak //= 1024
+    conn.send({'items': items, 'seconds': seconds,
+               'items_per_sec': items / seconds if seconds else None, 'peak_rss_kb': peak})
+    conn.close()
+
+
+def measure(stage, osm_path, work_dir):
+    """Run one stage in a child process, return its timing and peak memory"""
+
+    parent, child = multiprocessing.Pipe()
+    proc = multiprocessing.Process(target=run_stage, args=(child, stage, osm_path, work_dir))
+    proc.start()
+    # Only the child holds its end now, so recv() fails instead of blocking if the child dies
+    child.close()
+    try:
+        result = parent.recv()
+    except EOFError:
+        result = None
+    proc.join()
+    parent.close()
+    if result is None:
+        result = {'error': 'the stage process exited with code %s without a result' % proc.exitcode}
+    if 'error' in result:
+        raise RuntimeError('Stage failed:\n' + result['error'])
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=REPO_DIR,
+                                       stderr=subprocess.STDOUT).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    """Print each stage's time relative to a baseline run"""
+
+    print('%-30s %12s %12s %8s' % ('stage', 'baseline s', 'now s', 'ratio'))
+    for name, stage in sorted(results['stages'].items()):
+        before = baseline['stages'].get(name)
+        if before and before['seconds']:
+            print('%-30s %12.4f %12.4f %8.2f' % (name, before['seconds'], stage['seconds'],
+                                                  stage['seconds'] / before['seconds']))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--nodes', type=int, default=100000)
+    parser.add_argument('--ways', type=int, default=15000)
+    parser.add_argument('--relations', type=int, default=500)
+    parser.add_argument('--tags-per-node', type=float, default=1.0,
+                        help='average number of tagged POIs per 4 nodes (0-4)')
+    parser.add_argument('--nodes-per-way', type=int, default=8)
+    parser.add_argument('--dirty-ratio', type=float, default=0.3,
+                        help='share of street names and phone numbers that need cleaning')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    args = parser.parse_args(argv)
+
+    params = dict((k, v) for k, v in vars(args).items() if k not in ('output', 'compare'))
+    work_dir = tempfile.mkdtemp(prefix='p3_bench_')
+    try:
+        osm_path = os.path.join(work_dir, 'synthetic.osm')
+        generate_osm(osm_path, args.nodes, args.ways, args.relations, args.tags_per_node, args.nodes_per_way,
+                     args.dirty_ratio, args.seed)
+        results = {'commit': git_commit(), 'python': platform.python_version(),
+                   'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                   'params': params, 'input_bytes': os.path.getsize(osm_path), 'stages': {}}
+        stages = STAGES + [('query:' + name, QueryStage(name)) for name in QUERY_NAMES]
+        stages += [('aggregate:' + name, QueryStage(name, aggregate=True)) for name in QUERY_NAMES
+                   if name in aggregates.AGGREGATE_QUERIES]
+        stages += [('service:reports_x%d' % workers, ServiceStage(workers)) for workers in (1, 4)]
+        for name, stage in stages:
+            results['stages'][name] = measure(stage, osm_path, work_dir)
+            results['stages'][name]['unit'] = stage_unit(name)
+            print('%-30s %10.4f s %12s %-10s %10d kB' % (
+                name, results['stages'][name]['seconds'],
+                '%.0f' % (results['stages'][name]['items_per_sec'] or 0), stage_unit(name) + '/s',
+                results['stages'][name]['peak_rss_kb']))
+    finally:
+        shutil.rmtree(work_dir)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Auditing, cleaning and export of OpenStreetMap extracts, and the queries of the P3 analysis.
+
+Importing the package does no I/O: the functions below are loaded from their
+submodules on first use, so e.g. ``from p3_osm import update_phone_num`` does
+not pull in sqlite3 or ElementTree.
+"""
+
+import importlib
+
+__version__ = '1.0.0'
+
+# Public name -> submodule that defines it
+_EXPORTS = {
+    'reader': ['open_osm', 'is_pbf', 'get_element'],
+    'pbf': ['pbf_elements'],
+    'auditing': ['expected', 'audit_street_type', 'audit_phone_num', 'audit_element', 'audit'],
+    'cleaning': ['mapping', 'StreetNormalizer', 'update_name', 'format_phone_num', 'update_phone_num',
+                 'normalize_phones', 'update_postcode', 'update_opening_hours', 'update_website'],
+    'rules': ['TagRules', 'tag_rules', 'reclean'],
+    'shaping': ['NODE_FIELDS', 'NODE_TAGS_FIELDS', 'WAY_FIELDS', 'WAY_TAGS_FIELDS', 'WAY_NODES_FIELDS',
+                'RELATION_FIELDS', 'RELATION_TAGS_FIELDS', 'RELATION_MEMBERS_FIELDS', 'WAY_GEOMETRY_FIELDS',
+                'shape_tag', 'shape_element'],
+    'instrument': ['RunStats'],
+    'export': ['CSV_PATHS', 'write_csvs', 'process_map', 'process_map_parallel', 'process_map_columnar',
+               'process_map_scan'],
+    'validation': ['Validator'],
+    'columns': ['ShapedColumns'],
+    'scanner': ['ScannedRows', 'scan_osm'],
+    'geometry': ['node_locations', 'way_geometry'],
+    'spatial': ['bbox', 'bbox_around', 'distance', 'nodes_in_bbox', 'nodes_within', 'nearest_nodes',
+                'ways_in_bbox'],
+    'database': ['create_indexes', 'create_spatial_index', 'load_sqlite'],
+    'updates': ['apply_changes'],
+    'shards': ['Partitioner', 'ShardSet', 'export_shards', 'load_shards'],
+    'aggregates': ['build_aggregates', 'report'],
+    'reconcile': ['StreetIndex', 'known_streets', 'reconcile_streets', 'candidate_users'],
+    'queries': ['NAMED_QUERIES', 'query_plans', 'database_size', 'run_query'],
+    'service': ['QueryService'],
+}
+_SUBMODULES = dict((name, module) for module, names in _EXPORTS.items() for name in names)
+
+__all__ = sorted(_SUBMODULES)
+
+
+def __getattr__(name):
+    module = _SUBMODULES.get(name)
+    if module is None:
+        raise AttributeError('module %r has no attribute %r' % (__name__, name))
+    value = getattr(importlib.import_module('.' + module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
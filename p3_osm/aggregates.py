@@ -0,0 +1,207 @@
+"""Summary tables for the report queries, built by the loader and kept up to date by apply_changes()."""
+
+import os
+import sqlite3
+
+from .queries import NAMED_QUERIES
+
+AGGREGATES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "p3_osm_aggregates.sql")
+# For the upserts (ON CONFLICT ... DO UPDATE) that the tables are built and updated with
+MIN_SQLITE_VERSION = (3, 24, 0)
+AGGREGATE_TABLES = ('tag_counts', 'user_counts', 'element_counts', 'category_counts')
+
+# Kinds of POI whose values of a key are counted: category -> (key, values one of the node's tags has to have),
+# like the CUISINES and SPORTS queries
+POI_CATEGORIES = {'cuisine': ('cuisine', ('restaurant', 'fast_food', 'cafe')),
+                  'sport': ('sport', ('pitch',))}
+
+# Element type, its table, its tag table and its column in user_counts
+AGGREGATED = (('node', 'nodes', 'nodes_tags', 'nodes'),
+              ('way', 'ways', 'ways_tags', 'ways'),
+              ('relation', 'relations', 'relations_tags', None))
+
+# Each statement adds :sign times the contribution of the rows matching {where},
+# so the same statements build the tables and update them around a change
+TAG_COUNTS = '''
+             INSERT INTO tag_counts (tags, key, value, num)
+             SELECT '{tags}', COALESCE(key, ''), value, :sign * COUNT(*)
+             FROM {tags}
+             WHERE value IS NOT NULL AND {where}
+             GROUP BY key, value
+             ON CONFLICT (tags, key, value) DO UPDATE SET num = num + excluded.num
+             '''
+USER_COUNTS = '''
+              INSERT INTO user_counts (uid, nodes, ways)
+              SELECT uid, {nodes}, {ways}
+              FROM {table}
+              WHERE uid IS NOT NULL AND {where}
+              GROUP BY uid
+              ON CONFLICT (uid) DO UPDATE SET nodes = nodes + excluded.nodes, ways = ways + excluded.ways
+              '''
+ELEMENT_COUNTS = '''
+                 INSERT INTO element_counts (element, num)
+                 SELECT '{table}', :sign * COUNT(*)
+                 FROM {table}
+                 WHERE {where}
+                 ON CONFLICT (element) DO UPDATE SET num = num + excluded.num
+                 '''
+CATEGORY_COUNTS = '''
+                  INSERT INTO category_counts (category, value, num)
+                  SELECT :category, t.value, :sign * COUNT(*)
+                  FROM nodes_tags t
+                  WHERE t.key = :key
+                      AND EXISTS (SELECT 1
+                          FROM nodes_tags i
+                          WHERE i.id = t.id
+                              AND i.value IN ({values}))
+                      AND {where}
+                  GROUP BY t.value
+                  ON CONFLICT (category, value) DO UPDATE SET num = num + excluded.num
+                  '''
+CHANGED_IDS = '{column} IN (SELECT id FROM temp.aggregate_ids)'
+
+# The report queries of NAMED_QUERIES, answered from the summary tables
+AGGREGATE_QUERIES = {
+    'N_NODES': "SELECT COALESCE(SUM(num), 0) FROM element_counts WHERE element = 'nodes';",
+    'N_WAYS': "SELECT COALESCE(SUM(num), 0) FROM element_counts WHERE element = 'ways';",
+    'N_UNIQUE_USERS': 'SELECT COUNT(*) FROM user_counts;',
+    'TOP_10_AMENITIES': '''
+                        SELECT value, num
+                        FROM tag_counts
+                        WHERE tags = 'nodes_tags' AND key = 'amenity'
+                        ORDER BY num DESC, value
+                        LIMIT 10;
+                        ''',
+    'CUISINES': '''
+                SELECT value, num
+                FROM category_counts
+                WHERE category = 'cuisine'
+                ORDER BY num DESC, value
+                LIMIT 10;
+                ''',
+    'LEISURE': '''
+               SELECT value, num
+               FROM tag_counts
+               WHERE tags = 'nodes_tags' AND key = 'leisure'
+               ORDER BY num DESC, value
+               LIMIT 10;
+               ''',
+    'SPORTS': '''
+              SELECT value, num
+              FROM category_counts
+              WHERE category = 'sport'
+              ORDER BY num DESC, value
+              LIMIT 10;
+              ''',
+    'STREET_STR': '''
+                  SELECT value
+                  FROM tag_counts
+                  WHERE tags = 'ways_tags' AND key = 'street'
+                  ORDER BY value
+                  LIMIT 10;
+                  ''',
+    'NAMES_DUPL': '''
+                  SELECT a.key, 'name', a.value
+                  FROM tag_counts AS a
+                  WHERE a.tags = 'ways_tags' AND a.key = 'street'
+                      AND EXISTS (SELECT 1 FROM tag_counts AS b
+                                  WHERE b.tags = 'ways_tags' AND b.key = 'name' AND b.value = a.value)
+                  ORDER BY a.value
+                  LIMIT 10;
+                  ''',
+    # Over the distinct values rather than every tag row, so the NOT EXISTS is cheap for both
+    'STR_IN_NAMES_ONLY': '''
+                         SELECT value
+                         FROM tag_counts
+                         WHERE tags = 'ways_tags' AND key = 'name'
+                             AND instr(value, 'str') > 0
+                             AND NOT EXISTS (SELECT 1 FROM tag_counts AS s
+                                             WHERE s.tags = 'ways_tags' AND s.key = 'street'
+                                                 AND s.value = tag_counts.value)
+                         ORDER BY value
+                         LIMIT 10;
+                         ''',
+    'STR_IN_NAMES_ONLY_COUNT': '''
+                               SELECT COUNT(*)
+                               FROM tag_counts
+                               WHERE tags = 'ways_tags' AND key = 'name'
+                                   AND instr(value, 'str') > 0
+                                   AND NOT EXISTS (SELECT 1 FROM tag_counts AS s
+                                                   WHERE s.tags = 'ways_tags' AND s.key = 'street'
+                                                       AND s.value = tag_counts.value);
+                               ''',
+}
+
+
+def has_aggregates(con):
+    return con.execute("SELECT 1 FROM sqlite_master WHERE name = 'tag_counts'").fetchone() is not None
+
+
+def add_counts(con, kind, sign, changed_only=False):
+    """Add sign times the contribution of the elements of one type (only those in temp.aggregate_ids) to the tables"""
+
+    if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+        raise RuntimeError('The summary tables need SQLite %s or newer, this is %s' % (
+            '.'.join(map(str, MIN_SQLITE_VERSION)), sqlite3.sqlite_version))
+    where = CHANGED_IDS.format(column='id') if changed_only else '1'
+    tag_where = CHANGED_IDS.format(column='t.id') if changed_only else '1'
+    for el_kind, table, tags, user_column in AGGREGATED:
+        if el_kind != kind:
+            continue
+        con.execute(ELEMENT_COUNTS.format(table=table, where=where), {'sign': sign})
+        con.execute(TAG_COUNTS.format(tags=tags, where=where), {'sign': sign})
+        if user_column:
+            counts = dict((column, ':sign * COUNT(*)' if column == user_column else '0')
+                          for column in ('nodes', 'ways'))
+            con.execute(USER_COUNTS.format(table=table, where=where, **counts), {'sign': sign})
+        if kind == 'node':
+            for category, (key, values) in sorted(POI_CATEGORIES.items()):
+                params = dict(('v%d' % i, value) for i, value in enumerate(values))
+                params.update(category=category, key=key, sign=sign)
+                con.execute(CATEGORY_COUNTS.format(values=', '.join(':v%d' % i for i in range(len(values))),
+                                                   where=tag_where), params)
+
+
+def drop_empty_counts(con):
+    con.execute('DELETE FROM tag_counts WHERE num = 0')
+    con.execute('DELETE FROM user_counts WHERE nodes = 0 AND ways = 0')
+    con.execute('DELETE FROM category_counts WHERE num = 0')
+
+
+def build_aggregates(con):
+    """Create (or rebuild) the summary tables from the full node, way and relation tables"""
+
+    with open(AGGREGATES_PATH) as aggregates_file:
+        con.executescript(aggregates_file.read())
+    for table in AGGREGATE_TABLES:
+        con.execute('DELETE FROM %s' % table)
+    for kind, table, tags, user_column in AGGREGATED:
+        add_counts(con, kind, 1)
+    drop_empty_counts(con)
+    con.commit()
+
+
+def update_aggregates(con, kind, ids, sign):
+    """Add (sign=1) or take away (sign=-1) the contribution of the given elements to the summary tables
+
+    Called with -1 before the rows of changed elements are replaced and with 1
+    afterwards, which leaves the tables as if they had been rebuilt.
+    """
+
+    if not ids:
+        return
+    con.execute('CREATE TEMP TABLE IF NOT EXISTS aggregate_ids (id INTEGER PRIMARY KEY)')
+    con.execute('DELETE FROM temp.aggregate_ids')
+    con.executemany('INSERT OR IGNORE INTO temp.aggregate_ids (id) VALUES (?)', [(el_id,) for el_id in ids])
+    add_counts(con, kind, sign, changed_only=True)
+    if sign > 0:
+        drop_empty_counts(con)
+
+
+def report(con, name, aggregates=None):
+    """Run a named report query, from the summary tables if the database has them (or aggregates=True)"""
+
+    if aggregates is None:
+        aggregates = name in AGGREGATE_QUERIES and has_aggregates(con)
+    query = AGGREGATE_QUERIES[name] if aggregates else dict(NAMED_QUERIES)[name]
+    return con.execute(query).fetchall()
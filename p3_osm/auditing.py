@@ -0,0 +1,62 @@
+"""Audit of street names and phone numbers."""
+
+import re
+
+from .reader import get_element
+
+# A list of expected German street types. Each can be capitalized if it's a separate word (e.g. Prenzlauer Allee),
+# or lowercase if it's all one word (e.g. Kastanienallee).
+expected = ["Straße", "straße", "Allee", "allee", "Weg", "weg", "Platz", "platz", "Gasse", "gasse",
+            "Promenade", "promenade", "Ufer", "ufer", "Brücke", "brücke"]
+
+# All expected types in one pattern, so each street name is scanned once
+EXPECTED_STREET_TYPES = re.compile('|'.join(re.escape(street_type) for street_type in expected))
+street_type_cache = {}
+STREET_TYPE_CACHE_SIZE = 100000
+
+
+def audit_street_type(street_types, street_name):
+    """If unexpected street type, add to set"""
+    try:
+        is_expected = street_type_cache[street_name]
+    except KeyError:
+        is_expected = EXPECTED_STREET_TYPES.search(street_name) is not None
+        if len(street_type_cache) >= STREET_TYPE_CACHE_SIZE:
+            street_type_cache.clear()
+        street_type_cache[street_name] = is_expected
+    if not is_expected:
+        street_types.add(street_name)
+
+
+def audit_phone_num(phone_nums, num):
+    """If badly formatted phone number, add to set"""
+    if not num.startswith("+49 30 "):
+        phone_nums.add(num)
+
+
+def is_street_name(elem):
+    """Check if the tag describes a street name"""
+    return (elem.attrib['k'] == "addr:street")
+
+
+def is_phone_num(elem):
+    """Check if the tag describes a phone number associated with the object"""
+    return (elem.attrib['k'] == "phone")
+
+
+def audit_element(elem, street_types, phone_nums):
+    """Run through the street name and phone number tags of a single node or way, add unexpected ones to the sets"""
+    for tag in elem.iter("tag"):
+        if is_street_name(tag):
+            audit_street_type(street_types, tag.attrib['v'])
+        elif is_phone_num(tag):
+            audit_phone_num(phone_nums, tag.attrib['v'])
+
+
+def audit(osmfile):
+    """Run through all street names and phone numbers in data, return unexpected street types and numbers"""
+    street_types = set([])
+    phone_nums = set([])
+    for elem in get_element(osmfile, tags=('node', 'way')):
+        audit_element(elem, street_types, phone_nums)
+    return street_types, phone_nums
@@ -0,0 +1,186 @@
+"""Cleaning of street names and phone numbers."""
+
+import re
+
+from .area_codes import AREA_CODES
+
+mapping = { "Str.": "Straße",
+            "Strasse": "Straße",
+            "Str": "Straße",
+            "str": "straße",
+            "str.": "straße",
+            "strasse": "straße"
+            }
+
+
+class StreetNormalizer(object):
+    """Fix street names with a mapping of abbreviated street types, caching the result for each distinct name"""
+
+    def __init__(self, mapping, cache_size=100000):
+        self.mapping = mapping
+        # Longest keys first, so that e.g. "Str." wins over "Str"
+        keys = sorted(mapping, key=len, reverse=True)
+        self.suffixes = re.compile('(?:%s)$' % '|'.join(re.escape(key) for key in keys))
+        self.cache = {}
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+
+    def fix(self, name):
+        """Replace an abbreviated street type at the end of the name, and capitalize it"""
+        m = self.suffixes.search(name)
+        if m:
+            name = name[:m.start()] + self.mapping[m.group()]
+        if name[:1].islower():
+            name = name[0].upper() + name[1:]
+        return name
+
+    def update(self, name):
+        """Return the fixed street name, from the cache if this name was seen before"""
+        try:
+            upd = self.cache[name]
+        except KeyError:
+            self.misses += 1
+            upd = self.fix(name)
+            if len(self.cache) >= self.cache_size:
+                self.cache.clear()
+            self.cache[name] = upd
+            return upd
+        self.hits += 1
+        return upd
+
+street_normalizer = StreetNormalizer(mapping)
+
+
+def update_name(name, mapping):
+    """If a street name is inappropriately abbreviated or not properly capitalized, fix it"""
+    if mapping is street_normalizer.mapping:
+        return street_normalizer.update(name)
+    return StreetNormalizer(mapping).fix(name)
+
+
+PHONE_NON_DIGITS = re.compile(r'[^0-9]')
+PHONE_TRUNK_ZERO = re.compile(r'\(\s*0\s*\)')
+PHONE_SEPARATORS = re.compile(r'\s*[;,]\s*')
+DEFAULT_AREA_CODE = '30'
+
+# Mobile and service prefixes, without the leading 0; the area codes are in area_codes.py
+MOBILE_PREFIXES = ['1511', '1512', '1514', '1515', '1516', '1517',
+                   '1520', '1521', '1522', '1523', '1525', '1526', '1529',
+                   '1570', '1573', '1575', '1577', '1578', '1579', '1590',
+                   '160', '162', '163', '170', '171', '172', '173', '174', '175', '176', '177', '178', '179']
+SERVICE_PREFIXES = ['180', '800', '900']
+
+PHONE_PREFIXES = dict([(p, 'area') for p in AREA_CODES] +
+                      [(p, 'mobile') for p in MOBILE_PREFIXES] +
+                      [(p, 'service') for p in SERVICE_PREFIXES])
+PHONE_PREFIX_LENGTHS = sorted(set(len(p) for p in PHONE_PREFIXES), reverse=True)
+
+PHONE_CACHE = {}
+PHONE_CACHE_SIZE = 100000
+
+
+def split_area_code(nsn):
+    """Split a German number without country code and leading 0 into its area code (or mobile prefix) and the rest"""
+    for length in PHONE_PREFIX_LENGTHS:
+        if nsn[:length] in PHONE_PREFIXES:
+            return nsn[:length], nsn[length:]
+    # Not a German number that is in use, so only guess where the code ends
+    length = 3 if nsn[2:3] == '1' else 4
+    return nsn[:length], nsn[length:]
+
+
+def format_phone_num(num):
+    """Bring a single phone number to the standard format of "+49 30 1234567", or "+" and the digits for foreign numbers"""
+    international = num.lstrip().startswith('+')
+    digits = PHONE_NON_DIGITS.sub('', PHONE_TRUNK_ZERO.sub('', num))
+    if len(digits) < 5:
+        return num.strip()
+    if digits.startswith('0049'):
+        nsn = digits[4:]
+    elif digits.startswith('49') and (international or len(digits) > 9):
+        nsn = digits[2:]
+    elif digits.startswith('00') or international:
+        return '+' + digits.lstrip('0')
+    elif digits.startswith('0'):
+        nsn = digits[1:]
+    elif PHONE_PREFIXES.get(split_area_code(digits)[0]) == 'mobile' and len(digits) >= 10:
+        nsn = digits
+    else:
+        nsn = DEFAULT_AREA_CODE + digits
+    if nsn.startswith('0'):
+        nsn = nsn[1:]
+    area, rest = split_area_code(nsn)
+    if not rest:
+        return '+49 ' + nsn
+    return '+49 ' + area + ' ' + rest
+
+
+def update_phone_num(num):
+    """Bring phone number (or several of them, separated by ";") to the standard format of "+49 30 1234567"
+    (or as close to it as possible)"""
+    try:
+        return PHONE_CACHE[num]
+    except KeyError:
+        pass
+    upd = '; '.join(format_phone_num(part) for part in PHONE_SEPARATORS.split(num.strip()) if part)
+    if len(PHONE_CACHE) >= PHONE_CACHE_SIZE:
+        PHONE_CACHE.clear()
+    PHONE_CACHE[num] = upd
+    return upd
+
+
+def normalize_phones(nums):
+    """Update a batch of phone numbers, return the list of standard-format numbers in the same order"""
+    return [update_phone_num(num) for num in nums]
+
+
+POSTCODE_PREFIX = re.compile(r'^D(?:E)?\s*-?\s*(?=\d)', re.I)
+POSTCODE = re.compile(r'\d{5}\Z')
+
+
+def update_postcode(code):
+    """Strip the "D-" (or "DE-") country prefix and any spaces from a German postcode"""
+    stripped = POSTCODE_PREFIX.sub('', code.strip()).replace(' ', '')
+    return stripped if POSTCODE.match(stripped) else code.strip()
+
+
+OPENING_DAYS = re.compile(r'\b(mo|tu|we|th|fr|sa|su|ph)\b', re.I)
+OPENING_HOUR = re.compile(r'\b(\d):(\d\d)\b')
+OPENING_RANGE = re.compile(r'(\d\d:\d\d)\s*[-\u2013\u2014]\s*(\d\d:\d\d)')
+OPENING_SEPARATORS = re.compile(r'\s*;\s*')
+WHITESPACE = re.compile(r'\s+')
+
+
+def update_opening_hours(hours):
+    """Bring opening hours closer to the OSM syntax: "Mo-Fr 09:00-18:00; Sa 10:00-14:00" """
+    hours = WHITESPACE.sub(' ', hours.strip()).replace('\u2013', '-').replace('\u2014', '-')
+    hours = OPENING_DAYS.sub(lambda m: m.group(1).capitalize() if m.group(1).lower() != 'ph' else 'PH', hours)
+    hours = OPENING_HOUR.sub(r'0\1:\2', hours)
+    hours = OPENING_RANGE.sub(r'\1-\2', hours)
+    return OPENING_SEPARATORS.sub('; ', hours).strip('; ')
+
+
+URL_SCHEME = re.compile(r'^([a-z][a-z0-9+.-]*)://', re.I)
+# e.g. mailto:, but not a host:port
+OTHER_SCHEME = re.compile(r'^[a-z][a-z0-9+.-]*:(?!\d)', re.I)
+
+
+def format_website(url):
+    """Add the missing http:// to a single web address, and lowercase its scheme and host"""
+    url = url.strip()
+    if ' ' in url or '.' not in url:
+        return url
+    m = URL_SCHEME.match(url)
+    if m is None:
+        if OTHER_SCHEME.match(url):
+            return url
+        url = 'http://' + url
+        m = URL_SCHEME.match(url)
+    host, sep, path = url[m.end():].partition('/')
+    return m.group(1).lower() + '://' + host.lower() + sep + path
+
+
+def update_website(url):
+    """Normalize a web address (or several of them, separated by ";")"""
+    return ';'.join(format_website(part) for part in url.split(';') if part.strip())
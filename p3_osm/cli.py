@@ -0,0 +1,280 @@
+"""Command line interface: p3-osm audit|export|load|shard|query|streets|reclean ..."""
+
+import argparse
+import sys
+
+
+def positive_int(value):
+    n = int(value)
+    if n < 1:
+        raise argparse.ArgumentTypeError('has to be at least 1, not %s' % value)
+    return n
+
+
+def cmd_audit(args):
+    from .auditing import audit
+
+    street_types, phone_nums = audit(args.osm_file)
+    print('Streets:')
+    for name in sorted(street_types)[:args.limit]:
+        print('    ' + name)
+    print('\nPhone numbers:')
+    for num in sorted(phone_nums)[:args.limit]:
+        print('    ' + num)
+
+
+def cmd_export(args):
+    from .export import process_map, process_map_columnar, process_map_parallel, process_map_scan
+
+    if args.validate and (args.columnar or args.scan):
+        raise SystemExit('--validate cannot be combined with --columnar or --scan')
+    if args.processes and args.osm_file.endswith(('.bz2', '.gz')):
+        raise SystemExit('--processes requires an uncompressed .osm file or a .pbf file')
+    if (args.stats or args.stats_json) and (args.processes or args.columnar or args.scan):
+        raise SystemExit('--stats and --stats-json cannot be combined with --processes, --columnar or --scan')
+    validate = False
+    if args.validate:
+        from .validation import Validator
+        validate = Validator(sample=args.sample, rejects_path=args.rejects)
+    if args.processes:
+        process_map_parallel(args.osm_file, validate=validate, processes=args.processes)
+    elif args.columnar:
+        process_map_columnar(args.osm_file)
+    elif args.scan:
+        process_map_scan(args.osm_file)
+    else:
+        stats = None
+        if args.stats or args.stats_json:
+            from .instrument import RunStats
+            stats = RunStats(progress_interval=args.progress)
+        process_map(args.osm_file, validate=validate, stats=stats)
+        if args.stats:
+            print(stats.report())
+        if args.stats_json:
+            stats.save(args.stats_json)
+    if validate:
+        print('Validated %d of %d elements, rejected %d (see %s)' % (
+            validate.checked, validate.seen, validate.rejected, validate.rejects_path))
+
+
+def cmd_load(args):
+    if args.changes:
+        from .updates import apply_changes
+
+        # apply_changes() updates whatever the database already has, so the options of a full load do not apply
+        ignored = [option for option, value in (('--columnar', args.columnar), ('--scan', args.scan),
+                                                ('--node-cache', args.node_cache), ('--no-spatial', args.no_spatial),
+                                                ('--no-aggregates', args.no_aggregates),
+                                                ('--no-reconcile', args.no_reconcile)) if value]
+        if ignored:
+            raise SystemExit('--changes cannot be combined with %s' % ', '.join(ignored))
+
+        counts = apply_changes(args.osm_file, args.db, args.batch_size, geometry=args.geometry)
+        print(', '.join('%s: %d' % item for item in sorted(counts.items())))
+    else:
+        from .database import load_sqlite
+
+        n = load_sqlite(args.osm_file, args.db, args.batch_size, columnar=args.columnar, geometry=args.geometry,
+                        node_cache=args.node_cache, spatial=not args.no_spatial, aggregates=not args.no_aggregates,
+                        reconcile=not args.no_reconcile, scan=args.scan)
+        print('Loaded %d elements into %s' % (n, args.db))
+
+
+def cmd_shard(args):
+    from .shards import export_shards, load_shards
+
+    if args.csv:
+        manifest = export_shards(args.osm_file, args.out_dir, args.by, args.size, args.only, args.node_cache)
+    else:
+        manifest = load_shards(args.osm_file, args.out_dir, args.by, args.size, args.only, args.node_cache,
+                               geometry=args.geometry, spatial=not args.no_spatial,
+                               aggregates=not args.no_aggregates, reconcile=not args.no_reconcile)
+    for name, entry in sorted(manifest['shards'].items()):
+        print('%s\t%d' % (entry['path'], entry['elements']))
+    print('Wrote %d shards into %s' % (len(manifest['shards']), args.out_dir))
+
+
+def print_results(results):
+    for name, rows in results:
+        print(name)
+        for row in rows:
+            print('    ' + '\t'.join(str(value) for value in row))
+
+
+def cmd_query(args):
+    import os
+    import sqlite3
+
+    from .aggregates import AGGREGATE_QUERIES, has_aggregates, report
+    from .queries import NAMED_QUERIES, query_plans
+
+    if args.wal and not args.workers:
+        raise SystemExit('--wal only applies with --workers')
+    names = args.names or [name for name, query in NAMED_QUERIES]
+    unknown = set(names) - set(name for name, query in NAMED_QUERIES)
+    if unknown:
+        raise SystemExit('Unknown queries: %s' % ', '.join(sorted(unknown)))
+    if os.path.isdir(args.db):
+        from .shards import ShardSet
+
+        if args.plan:
+            raise SystemExit('--plan needs a single database, not a directory of shards')
+        try:
+            shard_set = ShardSet(args.db)
+        except ValueError as e:
+            raise SystemExit(str(e))
+        print_results(shard_set.reports(names, not args.no_aggregates))
+        return
+    con = sqlite3.connect(args.db)
+    try:
+        aggregates = not args.no_aggregates and has_aggregates(con)
+        if args.plan:
+            queries = [(name, AGGREGATE_QUERIES[name] if aggregates and name in AGGREGATE_QUERIES else query)
+                       for name, query in NAMED_QUERIES if name in names]
+            for name, plan in query_plans(con, queries):
+                print(name)
+                for line in plan:
+                    print('    ' + line)
+            return
+        if args.workers:
+            from .service import QueryService
+
+            with QueryService(args.db, size=args.workers, wal=args.wal) as service:
+                results = service.reports(names, aggregates)
+        else:
+            results = [(name, report(con, name, aggregates and name in AGGREGATE_QUERIES)) for name in names]
+        print_results(results)
+    finally:
+        con.close()
+
+
+def cmd_streets(args):
+    import sqlite3
+
+    from .reconcile import candidate_users, has_street_candidates, reconcile_streets
+
+    con = sqlite3.connect(args.db)
+    try:
+        if args.rebuild or not has_street_candidates(con):
+            counts = reconcile_streets(con)
+            print('Found %d known street names and %d with a street type in name tags' % (
+                counts['known'], counts['street_type']))
+        print('uid\tuser\tknown\tstreet_type\ttotal')
+        for row in candidate_users(con, args.limit):
+            print('\t'.join(str(value) for value in row))
+    finally:
+        con.close()
+
+
+def cmd_reclean(args):
+    import sqlite3
+
+    from .rules import reclean
+
+    con = sqlite3.connect(args.db)
+    try:
+        changed = reclean(con, processes=args.processes)
+    finally:
+        con.close()
+    for k, n in sorted(changed.items()):
+        print('%s\t%d' % (k, n))
+
+
+def build_parser():
+    from .columns import BATCH_SIZE
+
+    parser = argparse.ArgumentParser(prog='p3-osm',
+                                     description='Audit, clean, export and query OpenStreetMap extracts.')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    p = subparsers.add_parser('audit', help='list unexpected street names and badly formatted phone numbers')
+    p.add_argument('osm_file')
+    p.add_argument('--limit', type=int, default=30, help='number of values to list of each (default: 30)')
+    p.set_defaults(func=cmd_audit)
+
+    p = subparsers.add_parser('export', help='clean and shape an extract into csv files in the current directory')
+    p.add_argument('osm_file')
+    mode = p.add_mutually_exclusive_group()
+    mode.add_argument('--processes', type=positive_int, metavar='N', help='split the file across N worker processes')
+    mode.add_argument('--columnar', action='store_true', help='shape into column buffers to save memory')
+    mode.add_argument('--scan', action='store_true', help='read plain XML with the fast scanner instead of ElementTree')
+    p.add_argument('--validate', action='store_true',
+                   help='check the shaped elements against the schema, writing those that fail to a rejects csv')
+    p.add_argument('--sample', type=positive_int, default=1, metavar='N',
+                   help='with --validate, check every Nth element')
+    p.add_argument('--rejects', default='rejects.csv', metavar='PATH', help='rejects csv (default: rejects.csv)')
+    p.add_argument('--stats', action='store_true', help='print progress and a timing summary')
+    p.add_argument('--stats-json', metavar='PATH', help='save the timing summary as JSON')
+    p.add_argument('--progress', type=float, default=10.0, metavar='SECONDS',
+                   help='interval between progress lines (default: 10)')
+    p.set_defaults(func=cmd_export)
+
+    p = subparsers.add_parser('load', help='load an extract straight into a new sqlite database')
+    p.add_argument('osm_file')
+    p.add_argument('db')
+    p.add_argument('--changes', action='store_true', help='apply osm_file as an osmChange diff to an existing database')
+    p.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    mode = p.add_mutually_exclusive_group()
+    mode.add_argument('--columnar', action='store_true', help='shape into column buffers to save memory')
+    mode.add_argument('--scan', action='store_true', help='read plain XML with the fast scanner instead of ElementTree')
+    p.add_argument('--geometry', action='store_true', help='also store way bounding boxes and geometry')
+    p.add_argument('--node-cache', metavar='PATH', help='memory-mapped node location file for large extracts')
+    p.add_argument('--no-spatial', action='store_true', help='skip building the R*Tree indexes')
+    p.add_argument('--no-aggregates', action='store_true', help='skip building the summary tables')
+    p.add_argument('--no-reconcile', action='store_true', help='skip building the street name retagging candidates')
+    p.set_defaults(func=cmd_load)
+
+    p = subparsers.add_parser('shard', help='load an extract into a sqlite database per tile or id range')
+    p.add_argument('osm_file')
+    p.add_argument('out_dir')
+    p.add_argument('--by', choices=('tile', 'id'), default='tile', help='partition by tile or id range (default: tile)')
+    p.add_argument('--size', type=float,
+                   help='tile size in degrees (default: 1) or number of ids per shard (default: 10000000)')
+    p.add_argument('--only', type=lambda value: value.split(','), metavar='SHARD[,SHARD...]',
+                   help='write only these shards, e.g. to split the work between machines')
+    p.add_argument('--csv', action='store_true', help='write the csv files of export per shard instead')
+    p.add_argument('--geometry', action='store_true', help='also store way bounding boxes and geometry')
+    p.add_argument('--node-cache', metavar='PATH', help='memory-mapped node location file for large extracts')
+    p.add_argument('--no-spatial', action='store_true', help='skip building the R*Tree indexes')
+    p.add_argument('--no-aggregates', action='store_true', help='skip building the summary tables')
+    p.add_argument('--no-reconcile', action='store_true', help='skip building the street name retagging candidates')
+    p.set_defaults(func=cmd_shard)
+
+    p = subparsers.add_parser('query', help='run the named report queries against a database')
+    p.add_argument('db', help='database, or directory of shards to fan the queries out over')
+    p.add_argument('names', nargs='*', metavar='NAME', help='queries to run (default: all)')
+    p.add_argument('--plan', action='store_true', help='show the query plans instead of the results')
+    p.add_argument('--no-aggregates', action='store_true', help='query the base tables, not the summary tables')
+    p.add_argument('--workers', type=positive_int, metavar='N',
+                   help='run the queries concurrently on N read-only connections')
+    p.add_argument('--wal', action='store_true',
+                   help='with --workers, switch the database to WAL mode first (a lasting change to the file)')
+    p.set_defaults(func=cmd_query)
+
+    p = subparsers.add_parser('streets', help='list the users whose name tags hold street names')
+    p.add_argument('db')
+    p.add_argument('--limit', type=int, default=30, help='number of users to list (default: 30)')
+    p.add_argument('--rebuild', action='store_true', help='reclassify the name tags first')
+    p.set_defaults(func=cmd_streets)
+
+    p = subparsers.add_parser('reclean', help='clean the tag values of a database again with the current rules')
+    p.add_argument('db')
+    p.add_argument('--processes', type=int, metavar='N', help='clean the distinct values in N worker processes')
+    p.set_defaults(func=cmd_reclean)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args, extras = parser.parse_known_args(argv)
+    # Report names after the options of query, as in query DB --workers 4 CUISINES, which argparse leaves over
+    if extras and args.func is cmd_query and not any(extra.startswith('-') for extra in extras):
+        args.names += extras
+    elif extras:
+        parser.error('unrecognized arguments: %s' % ' '.join(extras))
+    args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
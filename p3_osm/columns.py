@@ -0,0 +1,101 @@
+"""Columnar buffers: shaped rows kept as one typed array or list per column."""
+
+import array
+
+from .shaping import NODE_FIELDS, RELATION_FIELDS, WAY_FIELDS, shape_tag
+
+INT64 = 'q'
+BATCH_SIZE = 50000
+
+# Column types of each table: typed arrays for numbers, interned strings for the
+# small vocabularies (user names, tag keys and types) and plain lists for the rest
+COLUMN_TYPES = {'nodes': [INT64, 'd', 'd', 'intern', INT64, INT64, INT64, 'str'],
+                'nodes_tags': [INT64, 'intern', 'str', 'intern'],
+                'ways': [INT64, 'intern', INT64, INT64, INT64, 'str'],
+                'ways_nodes': [INT64, INT64, INT64],
+                'ways_tags': [INT64, 'intern', 'str', 'intern'],
+                'relations': [INT64, 'intern', INT64, INT64, INT64, 'str'],
+                'relations_members': [INT64, 'intern', INT64, 'intern', INT64],
+                'relations_tags': [INT64, 'intern', 'str', 'intern']}
+
+
+class ColumnTable(object):
+    """Rows of one table, kept as one array or list per column"""
+
+    def __init__(self, types, strings):
+        self.types = types
+        self.strings = strings
+        self.clear()
+
+    def clear(self):
+        self.columns = [list() if t in ('str', 'intern') else array.array(t) for t in self.types]
+
+    def __len__(self):
+        return len(self.columns[0])
+
+    def append(self, values):
+        for n, value in enumerate(values):
+            column = self.columns[n]
+            t = self.types[n]
+            if t == 'intern':
+                value = self.strings.setdefault(value, value)
+            elif t != 'str':
+                try:
+                    value = float(value) if t == 'd' else int(value)
+                except (TypeError, ValueError):
+                    # A missing or non-numeric value is kept as it is, like shape_element() keeps it, which turns
+                    # the column into a plain list for the rest of the batch
+                    if isinstance(column, array.array):
+                        column = self.columns[n] = column.tolist()
+            column.append(value)
+
+    def rows(self):
+        """Yield the rows as tuples, in the column order of the table"""
+        return zip(*self.columns)
+
+
+class ShapedColumns(object):
+    """Clean and shape node, way and relation XML elements into typed column buffers instead of one dict per row"""
+
+    def __init__(self, node_attr_fields=NODE_FIELDS, way_attr_fields=WAY_FIELDS):
+        self.node_attr_fields = node_attr_fields
+        self.way_attr_fields = way_attr_fields
+        self.strings = {}
+        self.tables = dict((table, ColumnTable(types, self.strings)) for table, types in COLUMN_TYPES.items())
+
+    def __len__(self):
+        return sum(len(table) for table in self.tables.values())
+
+    def clear(self):
+        for table in self.tables.values():
+            table.clear()
+        # Keep the interned strings from growing without bounds across batches
+        if len(self.strings) > 100000:
+            self.strings.clear()
+
+    def add(self, element):
+        """Shape one element into the buffers, with the same cleaning as shape_element()"""
+        el_id = element.get("id")
+        if element.tag == 'node':
+            self.tables['nodes'].append([element.get(attr) for attr in self.node_attr_fields])
+            tags = self.tables['nodes_tags']
+        elif element.tag == 'way':
+            self.tables['ways'].append([element.get(attr) for attr in self.way_attr_fields])
+            way_nodes = self.tables['ways_nodes']
+            for pos, nd in enumerate(element.iter("nd")):
+                way_nodes.append((el_id, nd.get("ref"), pos))
+            tags = self.tables['ways_tags']
+        elif element.tag == 'relation':
+            self.tables['relations'].append([element.get(attr) for attr in RELATION_FIELDS])
+            members = self.tables['relations_members']
+            for pos, member in enumerate(element.iter("member")):
+                members.append((el_id, member.get("type"), member.get("ref"), member.get("role"), pos))
+            tags = self.tables['relations_tags']
+        else:
+            return
+        for tag in element.iter("tag"):
+            key, value, tag_type = shape_tag(tag.get("k"), tag.get("v"))
+            tags.append((el_id, key or '', value, tag_type or ''))
+
+    def rows(self, table):
+        return self.tables[table].rows()
@@ -0,0 +1,196 @@
+"""Direct loading of OSM files into sqlite."""
+
+import os
+import sqlite3 as sql
+
+from .aggregates import build_aggregates
+from .columns import BATCH_SIZE, ShapedColumns
+from .geometry import node_locations, scanned_geometry, way_geometry
+from .reader import get_element
+from .reconcile import reconcile_streets
+from .shaping import (NODE_FIELDS, NODE_TAGS_FIELDS, RELATION_FIELDS, RELATION_MEMBERS_FIELDS,
+                      RELATION_TAGS_FIELDS, WAY_FIELDS, WAY_GEOMETRY_FIELDS, WAY_NODES_FIELDS, WAY_TAGS_FIELDS,
+                      shape_element)
+
+# The sql scripts ship next to the code, so loads work from any directory
+SQL_DIR = os.path.dirname(os.path.abspath(__file__))
+SCHEMA_PATH = os.path.join(SQL_DIR, "p3_osm_schema.sql")
+
+# Element parts as returned by shape_element(), with the table and columns they go to
+LOAD_TABLES = (('node', 'nodes', NODE_FIELDS),
+               ('node_tags', 'nodes_tags', NODE_TAGS_FIELDS),
+               ('way', 'ways', WAY_FIELDS),
+               ('way_nodes', 'ways_nodes', WAY_NODES_FIELDS),
+               ('way_tags', 'ways_tags', WAY_TAGS_FIELDS),
+               ('relation', 'relations', RELATION_FIELDS),
+               ('relation_members', 'relations_members', RELATION_MEMBERS_FIELDS),
+               ('relation_tags', 'relations_tags', RELATION_TAGS_FIELDS))
+
+# Trade durability for speed while loading; a failed load is simply rerun
+LOAD_PRAGMAS = ['PRAGMA journal_mode = MEMORY',
+                'PRAGMA synchronous = OFF',
+                'PRAGMA cache_size = -262144']
+RESTORE_PRAGMAS = ['PRAGMA journal_mode = DELETE',
+                   'PRAGMA synchronous = FULL']
+
+# Created only after all rows are in, which is much faster than maintaining them row by row
+INDEXES_PATH = os.path.join(SQL_DIR, "p3_osm_indexes.sql")
+
+
+def create_indexes(con):
+    """Add the analysis query indexes in INDEXES_PATH to an existing database"""
+
+    with open(INDEXES_PATH) as indexes_file:
+        con.executescript(indexes_file.read())
+
+
+SPATIAL_PATH = os.path.join(SQL_DIR, "p3_osm_spatial.sql")
+
+
+def create_spatial_index(con):
+    """Build (or rebuild) the R*Tree indexes in SPATIAL_PATH over the node locations and way bounding boxes"""
+
+    with open(SPATIAL_PATH) as spatial_file:
+        con.executescript(spatial_file.read())
+
+
+def insert_sql(table, fields, verb='INSERT'):
+    """Build a parameterized INSERT statement for the given table columns"""
+
+    return '%s INTO %s (%s) VALUES (%s)' % (
+        verb, table, ', '.join('"%s"' % f for f in fields), ', '.join('?' * len(fields)))
+
+
+def shaped_rows(el, part, fields):
+    """Return one part of a shaped element as row tuples in the given column order"""
+
+    rows = el[part] if isinstance(el[part], list) else [el[part]]
+    return [tuple(row.get(f, '') for f in fields) for row in rows]
+
+
+def create_database(db_path):
+    """Open a new database for loading: create the tables from SCHEMA_PATH, with the LOAD_PRAGMAS set
+
+    A database already at db_path is replaced, along with its journal and WAL
+    files, as a load always starts from scratch.
+    """
+
+    for path in (db_path, db_path + '-journal', db_path + '-wal', db_path + '-shm'):
+        if os.path.exists(path):
+            os.remove(path)
+    con = sql.connect(db_path)
+    try:
+        for pragma in LOAD_PRAGMAS:
+            con.execute(pragma)
+        with open(SCHEMA_PATH) as schema_file:
+            con.executescript(schema_file.read())
+    except Exception:
+        con.close()
+        raise
+    return con
+
+
+def finish_database(con, spatial=True, aggregates=True, reconcile=True):
+    """Build the indexes of a loaded database, and its spatial index, summary tables and street candidates if asked"""
+
+    create_indexes(con)
+    if spatial:
+        create_spatial_index(con)
+    if aggregates:
+        build_aggregates(con)
+    if reconcile:
+        reconcile_streets(con)
+    for pragma in RESTORE_PRAGMAS:
+        con.execute(pragma)
+
+
+def load_sqlite(osm_file, db_path, batch_size=BATCH_SIZE, columnar=False, geometry=False, node_cache=None,
+                spatial=True, aggregates=True, reconcile=True, scan=False):
+    """Iteratively process each XML element and insert it straight into a new sqlite database (replacing db_path)
+
+    The tables are created from the schema in SCHEMA_PATH, rows are inserted with
+    executemany() in transactions of batch_size elements, and the indexes from
+    INDEXES_PATH are built once the load is complete. Missing tag keys and types
+    are stored as empty strings, like the csv export does.
+
+    With columnar=True each batch is shaped into ShapedColumns buffers rather than
+    dicts, which keeps peak memory down on large extracts. With scan=True plain
+    XML files are read by the scanner in scanner.py instead of ElementTree, a
+    block of about scanner.BLOCK_SIZE bytes per transaction.
+
+    With geometry=True the node locations are kept while streaming (in memory, or
+    in the memory-mapped file node_cache for large extracts), so that the bounding
+    box and line geometry of each way go into ways_geometry in the same pass.
+
+    Unless spatial=False, the R*Tree indexes for nodes_in_bbox() and friends are
+    built at the end, over all nodes and (with geometry=True) way bounding boxes.
+
+    Unless aggregates=False, the summary tables that aggregates.report() answers
+    the report queries from are built at the end as well, and unless
+    reconcile=False so is the street_candidates table of reconcile_streets().
+    """
+
+    if scan and columnar:
+        raise ValueError('scan and columnar cannot be combined')
+    con = create_database(db_path)
+    try:
+        statements = dict((part, insert_sql(table, fields)) for part, table, fields in LOAD_TABLES)
+        batches = dict((part, []) for part, table, fields in LOAD_TABLES)
+        columns = ShapedColumns() if columnar else None
+        if scan:
+            from .scanner import ScannedRows
+            columns = ScannedRows()
+        if geometry:
+            locations = node_locations(node_cache)
+        geometries = []
+
+        def flush():
+            for part, table, fields in LOAD_TABLES:
+                if columns is not None:
+                    con.executemany(statements[part], columns.rows(table))
+                elif batches[part]:
+                    con.executemany(statements[part], batches[part])
+                    del batches[part][:]
+            if columns is not None:
+                columns.clear()
+            con.executemany(insert_sql('ways_geometry', WAY_GEOMETRY_FIELDS), geometries)
+            del geometries[:]
+            con.commit()
+
+        n = 0
+        if scan:
+            from .scanner import scan_osm
+            for count in scan_osm(osm_file, columns):
+                if geometry:
+                    geometries.extend(scanned_geometry(columns.rows('nodes'), columns.rows('ways_nodes'), locations))
+                n += count
+                flush()
+        else:
+            for element in get_element(osm_file, tags=('node', 'way', 'relation')):
+                if geometry:
+                    if element.tag == 'node':
+                        locations.set(int(element.get('id')), float(element.get('lat')), float(element.get('lon')))
+                    elif element.tag == 'way':
+                        row = way_geometry(element, locations)
+                        if row:
+                            geometries.append(row)
+                if columnar:
+                    columns.add(element)
+                else:
+                    el = shape_element(element)
+                    if not el:
+                        continue
+                    for part, table, fields in LOAD_TABLES:
+                        if part in el:
+                            batches[part].extend(shaped_rows(el, part, fields))
+                n += 1
+                if n % batch_size == 0:
+                    flush()
+        flush()
+        if geometry:
+            locations.close()
+
+        finish_database(con, spatial, aggregates, reconcile)
+    finally:
+        con.close()
+    return n
@@ -0,0 +1,347 @@
+"""Export of OSM files to the nodes, node tags, ways, way nodes and way tags csv files."""
+
+import csv
+import io
+import os
+import re
+import shutil
+import tempfile
+
+from .auditing import audit_element
+from .columns import BATCH_SIZE, ShapedColumns
+from .instrument import CountingReader, TimedWriter, timer
+from .pbf import pbf_blobs, pbf_elements
+from .reader import get_element, is_pbf, open_osm
+from .shaping import NODE_FIELDS, NODE_TAGS_FIELDS, WAY_FIELDS, WAY_NODES_FIELDS, WAY_TAGS_FIELDS, shape_element
+
+NODES_PATH = "nodes.csv"
+NODE_TAGS_PATH = "nodes_tags.csv"
+WAYS_PATH = "ways.csv"
+WAY_NODES_PATH = "ways_nodes.csv"
+WAY_TAGS_PATH = "ways_tags.csv"
+
+CSV_PATHS = (NODES_PATH, NODE_TAGS_PATH, WAYS_PATH, WAY_NODES_PATH, WAY_TAGS_PATH)
+# Tables of the csv files, in the order of CSV_PATHS
+CSV_TABLES = ('nodes', 'nodes_tags', 'ways', 'ways_nodes', 'ways_tags')
+
+
+def open_csv(path):
+    return open(path, 'w', encoding='utf-8', newline='')
+
+
+def validator_for(validate):
+    """Return the Validator to use for a validate argument (False, True or a Validator), or None"""
+
+    if not validate:
+        return None
+    from .validation import Validator
+    return validate if isinstance(validate, Validator) else Validator()
+
+
+def write_csvs(elements, paths, validate, audit_sets=None, stats=None):
+    """Shape each element and write it to the nodes, node tags, ways, way nodes and way tags csv(s) in paths
+
+    With validate (True or a Validator) the shaped elements are checked in
+    batches, and those that do not fit the schema go to its rejects csv instead.
+    """
+
+    validator = validator_for(validate)
+    with open_csv(paths[0]) as nodes_file, open_csv(paths[1]) as nodes_tags_file, \
+            open_csv(paths[2]) as ways_file, open_csv(paths[3]) as way_nodes_file, \
+            open_csv(paths[4]) as way_tags_file:
+
+        nodes_writer = csv.DictWriter(nodes_file, NODE_FIELDS)
+        node_tags_writer = csv.DictWriter(nodes_tags_file, NODE_TAGS_FIELDS)
+        ways_writer = csv.DictWriter(ways_file, WAY_FIELDS)
+        way_nodes_writer = csv.DictWriter(way_nodes_file, WAY_NODES_FIELDS)
+        way_tags_writer = csv.DictWriter(way_tags_file, WAY_TAGS_FIELDS)
+
+        if stats is not None:
+            nodes_writer = TimedWriter(nodes_writer, stats, 'write_nodes')
+            node_tags_writer = TimedWriter(node_tags_writer, stats, 'write_nodes_tags')
+            ways_writer = TimedWriter(ways_writer, stats, 'write_ways')
+            way_nodes_writer = TimedWriter(way_nodes_writer, stats, 'write_ways_nodes')
+            way_tags_writer = TimedWriter(way_tags_writer, stats, 'write_ways_tags')
+
+        def write(tag, el):
+            if tag == 'node':
+                nodes_writer.writerow(el['node'])
+                node_tags_writer.writerows(el['node_tags'])
+            elif tag == 'way':
+                ways_writer.writerow(el['way'])
+                way_nodes_writer.writerows(el['way_nodes'])
+                way_tags_writer.writerows(el['way_tags'])
+
+        def flush():
+            if stats is not None:
+                start = timer()
+            passed = validator.filter(pending)
+            if stats is not None:
+                stats.add_time('validate', timer() - start)
+            for tag, el in passed:
+                write(tag, el)
+            del pending[:]
+
+        if validator is not None:
+            validator.open()
+        pending = []
+        for element in elements:
+            if stats is not None:
+                stats.element(element.tag)
+                start = timer()
+            if audit_sets is not None:
+                audit_element(element, audit_sets[0], audit_sets[1])
+                if stats is not None:
+                    stats.add_time('audit', timer() - start)
+                    start = timer()
+            el = shape_element(element, stats=stats)
+            if stats is not None:
+                stats.add_time('shape_element', timer() - start)
+            if not el:
+                continue
+            if validator is None:
+                write(element.tag, el)
+            else:
+                pending.append((element.tag, el))
+                if len(pending) >= validator.batch_size:
+                    flush()
+        if validator is not None:
+            flush()
+            validator.close()
+
+
+def process_map(file_in, validate, with_audit=False, stats=None):
+    """Iteratively process each XML element and write to csv(s)
+
+    With with_audit=True the street name and phone number audit runs on the raw
+    elements during the same pass, and its (street_types, phone_nums) sets are
+    returned, so the file only has to be parsed once.
+
+    Passing a RunStats as stats instruments the run: it prints progress lines
+    (with an ETA for uncompressed XML) and holds the counters and timers
+    afterwards, see RunStats.report() and RunStats.save().
+
+    validate=True checks the shaped elements against the schema and writes those
+    that do not fit to rejects.csv instead. Pass a Validator for sampling or a
+    different rejects file; it holds the counts of checked and rejected elements
+    afterwards.
+    """
+
+    audit_sets = (set([]), set([])) if with_audit else None
+    if stats is None:
+        write_csvs(get_element(file_in, tags=('node', 'way')), CSV_PATHS, validate, audit_sets)
+    else:
+        reader = None if is_pbf(file_in) else CountingReader(open_osm(file_in))
+        plain = reader is not None and not file_in.endswith(('.bz2', '.gz'))
+        stats.begin(reader, os.path.getsize(file_in) if plain else None)
+        try:
+            elements = stats.timed(get_element(reader or file_in, tags=('node', 'way')), 'parse')
+            write_csvs(elements, CSV_PATHS, validate, audit_sets, stats)
+        finally:
+            if reader is not None:
+                reader.close()
+            stats.end()
+    if with_audit:
+        return audit_sets
+
+
+# Top-level elements can be located in the raw bytes: '<' is always escaped inside attribute
+# values and text, and the child elements are only ever <tag>, <nd> or <member>. That does not
+# hold inside comments, CDATA sections or a DTD, so files with any of them are not split.
+ELEMENT_START = re.compile(br'<(?:node|way|relation)[\s/>]')
+CHUNK_SIZE = 64 * 1024 * 1024
+SCAN_SIZE = 1024 * 1024
+
+
+def find_element_start(osm_file, offset):
+    """Return the byte offset of the first top-level element at or after offset, or None"""
+
+    osm_file.seek(offset)
+    overlap = b''
+    while True:
+        block = osm_file.read(SCAN_SIZE)
+        if not block:
+            return None
+        m = ELEMENT_START.search(overlap + block)
+        if m:
+            return offset - len(overlap) + m.start()
+        overlap = block[-16:]
+        offset += len(block)
+
+
+def splittable(file_in):
+    """Check that an OSM file can be split by find_chunks(): PBF, or UTF-8 XML with no comments, CDATA or DTD"""
+
+    from .scanner import map_osm
+
+    if is_pbf(file_in):
+        return True
+    if file_in.endswith(('.bz2', '.gz')):
+        return False
+    data = map_osm(file_in)
+    if data is None:
+        return False
+    data.close()
+    return True
+
+
+def find_chunks(file_in, chunk_size=CHUNK_SIZE):
+    """Split the file into (start, end) byte ranges that each hold a run of whole top-level elements"""
+
+    size = os.path.getsize(file_in)
+    if is_pbf(file_in):
+        # PBF blocks are independent, so the ranges just need to start on a block
+        starts = []
+        for offset, blob_type, blob in pbf_blobs(file_in, read_data=False):
+            if not starts or offset >= starts[-1] + chunk_size:
+                starts.append(offset)
+        return list(zip(starts, starts[1:] + [size]))
+    if file_in.endswith(('.bz2', '.gz')):
+        raise ValueError('Compressed XML cannot be split into chunks, use process_map() or a .pbf file')
+    starts = []
+    with open(file_in, 'rb') as osm_file:
+        start = find_element_start(osm_file, 0)
+        while start is not None:
+            starts.append(start)
+            start = find_element_start(osm_file, start + chunk_size)
+        osm_file.seek(max(size - SCAN_SIZE, 0))
+        tail = osm_file.read()
+    end = tail.rfind(b'</osm>')
+    end = size if end == -1 else size - len(tail) + end
+    return list(zip(starts, starts[1:] + [end]))
+
+
+def process_chunk(args):
+    """Shape the elements in one byte range of the file into that chunk's own csv(s)"""
+
+    file_in, start, end, paths, validate, with_audit = args
+    if validate:
+        from .validation import Validator
+        validate = Validator(**validate)
+    if is_pbf(file_in):
+        elements = pbf_elements(file_in, ('node', 'way'), start, end)
+    else:
+        with open(file_in, 'rb') as osm_file:
+            osm_file.seek(start)
+            data = osm_file.read(end - start)
+        elements = get_element(io.BytesIO(b'<osm>' + data + b'</osm>'), tags=('node', 'way'))
+    audit_sets = (set([]), set([])) if with_audit else None
+    write_csvs(elements, paths, validate, audit_sets)
+    counts = (validate.seen, validate.checked, validate.rejected) if validate else None
+    return audit_sets, counts
+
+
+def process_map_parallel(file_in, validate, with_audit=False, processes=None, chunk_size=CHUNK_SIZE):
+    """Process the XML file in chunks across a pool of worker processes and write to csv(s)
+
+    Each chunk is shaped into temporary csv(s) by a worker, then the chunk files are
+    concatenated in file order, so the output is identical to that of process_map().
+    With validate, so are the rejects, except that sampling restarts in each chunk.
+    Plain XML that splittable() rejects is processed serially by process_map().
+    """
+
+    import multiprocessing
+
+    if not is_pbf(file_in) and not file_in.endswith(('.bz2', '.gz')) and not splittable(file_in):
+        return process_map(file_in, validate, with_audit)
+    validator = validator_for(validate)
+    chunks = find_chunks(file_in, chunk_size)
+    tmp_dir = tempfile.mkdtemp(prefix='p3_osm_')
+    try:
+        jobs = []
+        rejects_paths = []
+        for i, (start, end) in enumerate(chunks):
+            paths = [os.path.join(tmp_dir, '%05d_%s' % (i, os.path.basename(path))) for path in CSV_PATHS]
+            chunk_validate = None
+            if validator is not None:
+                # Each worker checks its chunk with its own Validator, into its own rejects file
+                rejects_paths.append(os.path.join(tmp_dir, '%05d_rejects.csv' % i))
+                chunk_validate = {'sample': validator.sample, 'rejects_path': rejects_paths[-1],
+                                  'schema_path': validator.schema_path, 'batch_size': validator.batch_size}
+            jobs.append((file_in, start, end, paths, chunk_validate, with_audit))
+
+        pool = multiprocessing.Pool(processes)
+        try:
+            results = pool.map(process_chunk, jobs, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+
+        for n, path in enumerate(CSV_PATHS):
+            with open(path, 'wb') as out_file:
+                for job in jobs:
+                    with open(job[3][n], 'rb') as chunk_file:
+                        shutil.copyfileobj(chunk_file, out_file)
+        if validator is not None:
+            with open(validator.rejects_path, 'wb') as out_file:
+                for i, path in enumerate(rejects_paths):
+                    with open(path, 'rb') as chunk_file:
+                        # Every chunk's file starts with the header, which is only wanted once
+                        if i:
+                            chunk_file.readline()
+                        shutil.copyfileobj(chunk_file, out_file)
+            for audit_sets, (seen, checked, rejected) in results:
+                validator.seen += seen
+                validator.checked += checked
+                validator.rejected += rejected
+    finally:
+        shutil.rmtree(tmp_dir)
+
+    if with_audit:
+        street_types = set([])
+        phone_nums = set([])
+        for (chunk_streets, chunk_nums), counts in results:
+            street_types.update(chunk_streets)
+            phone_nums.update(chunk_nums)
+        return street_types, phone_nums
+
+
+def process_map_columnar(file_in, batch_size=BATCH_SIZE):
+    """Iteratively process each XML element into column buffers, and write them to csv(s) every batch_size elements"""
+
+    files = [open_csv(path) for path in CSV_PATHS]
+    try:
+        writers = [csv.writer(f) for f in files]
+        columns = ShapedColumns()
+
+        def flush():
+            for table, writer in zip(CSV_TABLES, writers):
+                writer.writerows(columns.rows(table))
+            columns.clear()
+
+        n = 0
+        for element in get_element(file_in, tags=('node', 'way')):
+            columns.add(element)
+            n += 1
+            if n % batch_size == 0:
+                flush()
+        flush()
+    finally:
+        for f in files:
+            f.close()
+    return n
+
+
+def process_map_scan(file_in):
+    """Scan plain OSM XML into shaped rows without ElementTree, and write them to csv(s) a block at a time
+
+    The output is the same as that of process_map(); see scanner.py for which
+    elements are still left to ElementTree.
+    """
+
+    from .scanner import ScannedRows, scan_osm
+
+    files = [open_csv(path) for path in CSV_PATHS]
+    try:
+        writers = [csv.writer(f) for f in files]
+        rows = ScannedRows()
+        n = 0
+        for count in scan_osm(file_in, rows, tags=('node', 'way')):
+            for table, writer in zip(CSV_TABLES, writers):
+                writer.writerows(rows.rows(table))
+            rows.clear()
+            n += count
+    finally:
+        for f in files:
+            f.close()
+    return n
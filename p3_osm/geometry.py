@@ -0,0 +1,145 @@
+"""Node location stores and way geometry."""
+
+import array
+import bisect
+import itertools
+import mmap
+import os
+import struct
+
+from .columns import INT64
+
+# Coordinates are stored as 1e-7 degree integers, like in the OSM database itself
+COORD_SCALE = 10000000
+# Added to stored latitudes so that 0 can mark a missing node in the dense store
+LAT_SHIFT = 900000001
+
+
+class SparseNodeLocations(object):
+    """Node locations in memory, in arrays sorted by node id"""
+
+    def __init__(self):
+        self.ids = array.array(INT64)
+        self.lats = array.array('i')
+        self.lons = array.array('i')
+        self.index = None  # {id: position}, only once ids arrive out of order
+
+    def set(self, node_id, lat, lon):
+        if self.index is None and self.ids and node_id <= self.ids[-1]:
+            self.index = dict((n, i) for i, n in enumerate(self.ids))
+        if self.index is not None:
+            self.index[node_id] = len(self.ids)
+        self.ids.append(node_id)
+        self.lats.append(int(round(lat * COORD_SCALE)))
+        self.lons.append(int(round(lon * COORD_SCALE)))
+
+    def get(self, node_id):
+        """Return (lat, lon) of the node, or None if it is unknown"""
+        if self.index is not None:
+            i = self.index.get(node_id)
+            if i is None:
+                return None
+        else:
+            i = bisect.bisect_left(self.ids, node_id)
+            if i == len(self.ids) or self.ids[i] != node_id:
+                return None
+        return float(self.lats[i]) / COORD_SCALE, float(self.lons[i]) / COORD_SCALE
+
+    def close(self):
+        pass
+
+
+class DenseNodeLocations(object):
+    """Node locations in a memory-mapped (sparse) file, with an 8 byte slot per node id
+
+    Negative ids, as editors give new objects that are not uploaded yet, have
+    no slot; they are kept in a SparseNodeLocations instead.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'w+b')
+        self.size = 0
+        self.map = None
+        self.negative = SparseNodeLocations()
+
+    def grow(self, node_id):
+        size = max((node_id + 1) * 8, self.size * 2, mmap.PAGESIZE)
+        size += -size % mmap.PAGESIZE
+        if self.map is not None:
+            self.map.close()
+        self.file.truncate(size)
+        self.map = mmap.mmap(self.file.fileno(), size)
+        self.size = size
+
+    def set(self, node_id, lat, lon):
+        if node_id < 0:
+            return self.negative.set(node_id, lat, lon)
+        if node_id * 8 + 8 > self.size:
+            self.grow(node_id)
+        struct.pack_into('<ii', self.map, node_id * 8,
+                         int(round(lat * COORD_SCALE)) + LAT_SHIFT, int(round(lon * COORD_SCALE)))
+
+    def get(self, node_id):
+        """Return (lat, lon) of the node, or None if it is unknown"""
+        if node_id < 0:
+            return self.negative.get(node_id)
+        if node_id * 8 + 8 > self.size:
+            return None
+        lat, lon = struct.unpack_from('<ii', self.map, node_id * 8)
+        if not lat:
+            return None
+        return float(lat - LAT_SHIFT) / COORD_SCALE, float(lon) / COORD_SCALE
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+        self.file.close()
+        os.remove(self.path)
+
+
+def node_locations(path=None):
+    """Return a node location store, memory-mapped to path if given (for extracts with many millions of nodes)"""
+
+    return DenseNodeLocations(path) if path else SparseNodeLocations()
+
+
+def geometry_row(way_id, coords):
+    """Return the ways_geometry row for a list of (lat, lon), with the line as WKT, or None if it is empty"""
+
+    if not coords:
+        return None
+    lats = [lat for lat, lon in coords]
+    lons = [lon for lat, lon in coords]
+    points = ', '.join('%r %r' % (lon, lat) for lat, lon in coords)
+    wkt = ('LINESTRING (%s)' if len(coords) > 1 else 'POINT (%s)') % points
+    return (way_id, min(lats), min(lons), max(lats), max(lons), wkt)
+
+
+def way_geometry(element, locations):
+    """Resolve a way element's node references against the location store; nodes outside the extract are skipped"""
+
+    coords = []
+    for nd in element.iter("nd"):
+        location = locations.get(int(nd.get("ref")))
+        if location is not None:
+            coords.append(location)
+    return geometry_row(int(element.get("id")), coords)
+
+
+def scanned_geometry(nodes, ways_nodes, locations):
+    """Store the locations of shaped node rows, then return the ways_geometry rows of shaped way node rows"""
+
+    for row in nodes:
+        locations.set(int(row[0]), float(row[1]), float(row[2]))
+    rows = []
+    for way_id, group in itertools.groupby(ways_nodes, lambda row: row[0]):
+        coords = []
+        for row in group:
+            location = locations.get(int(row[1]))
+            if location is not None:
+                coords.append(location)
+        row = geometry_row(int(way_id), coords)
+        if row:
+            rows.append(row)
+    return rows
@@ -0,0 +1,149 @@
+"""Counters, timers and progress reporting for process_map()."""
+
+import collections
+import json
+import sys
+import time
+
+timer = getattr(time, 'perf_counter', time.time)
+
+
+class CountingReader(object):
+    """File object wrapper that counts the bytes read through it"""
+
+    def __init__(self, f):
+        self.f = f
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        self.bytes_read += len(data)
+        return data
+
+    def close(self):
+        self.f.close()
+
+
+class TimedWriter(object):
+    """Writer wrapper that adds the time spent writing to a RunStats timer"""
+
+    def __init__(self, writer, stats, name):
+        self.writer = writer
+        self.stats = stats
+        self.name = name
+
+    def writerow(self, row):
+        start = timer()
+        self.writer.writerow(row)
+        self.stats.add_time(self.name, timer() - start)
+        self.stats.count(self.name + '_rows')
+
+    def writerows(self, rows):
+        start = timer()
+        self.writer.writerows(rows)
+        self.stats.add_time(self.name, timer() - start)
+        self.stats.count(self.name + '_rows', len(rows))
+
+
+class RunStats(object):
+    """Counters, timers and progress lines for an instrumented process_map() run
+
+    Times are summed per stage: 'parse' (waiting for get_element()), 'audit',
+    'shape_element' (which includes the cleaning functions, also timed on their
+    own) and one 'write_<table>' per csv writer. The cleaning functions also count
+    their calls and how many values they actually rewrote.
+    """
+
+    def __init__(self, progress_interval=10.0, stream=None):
+        self.counters = collections.defaultdict(int)
+        self.timers = collections.defaultdict(float)
+        self.progress_interval = progress_interval
+        self.stream = stream if stream is not None else sys.stderr
+        self.reader = None
+        self.total_bytes = None
+        self.started = self.last_progress = self.elapsed = None
+
+    def begin(self, reader=None, total_bytes=None):
+        self.reader = reader
+        self.total_bytes = total_bytes
+        self.started = self.last_progress = timer()
+
+    def end(self):
+        self.elapsed = timer() - self.started
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def add_time(self, name, seconds):
+        self.timers[name] += seconds
+
+    def timed(self, iterable, name):
+        """Yield from iterable, adding the time spent waiting for each item to a timer"""
+        it = iter(iterable)
+        while True:
+            start = timer()
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+            self.timers[name] += timer() - start
+            yield item
+
+    def clean(self, name, func, value, *args):
+        """Call a cleaning function on a value, timing it and counting whether it rewrote the value"""
+        start = timer()
+        result = func(value, *args)
+        self.timers[name] += timer() - start
+        self.counters[name + '_calls'] += 1
+        if result != value:
+            self.counters[name + '_rewrites'] += 1
+        return result
+
+    def element(self, tag):
+        self.counters[tag + 's'] += 1
+        self.counters['elements'] += 1
+        if self.progress_interval and self.counters['elements'] % 1000 == 0:
+            now = timer()
+            if now - self.last_progress >= self.progress_interval:
+                self.last_progress = now
+                self.stream.write(self.progress_line(now) + '\n')
+                self.stream.flush()
+
+    def bytes_read(self):
+        return self.reader.bytes_read if self.reader is not None else None
+
+    def progress_line(self, now=None):
+        elapsed = (now if now is not None else timer()) - self.started
+        n = self.counters['elements']
+        line = '%d elements (%d nodes, %d ways), %.0f/s' % (
+            n, self.counters['nodes'], self.counters['ways'], n / elapsed if elapsed else 0)
+        read = self.bytes_read()
+        if read is not None:
+            line += ', %.1f MB read' % (read / 1e6)
+            if self.total_bytes and read:
+                done = min(float(read) / self.total_bytes, 1.0)
+                eta = elapsed * (1 - done) / done
+                line += ', %.1f%%, ETA %d:%02d:%02d' % (100 * done, eta // 3600, eta % 3600 // 60, eta % 60)
+        return line
+
+    def summary(self):
+        """Return the counters and timers as a dict"""
+        return {'elapsed': self.elapsed,
+                'bytes_read': self.bytes_read(),
+                'counters': dict(self.counters),
+                'timers': dict(self.timers)}
+
+    def report(self):
+        """Return a readable summary of the run"""
+        lines = ['Processed ' + self.progress_line(self.started + (self.elapsed or 0)) +
+                 ' in %.1f s' % (self.elapsed or 0)]
+        for name, seconds in sorted(self.timers.items(), key=lambda item: -item[1]):
+            lines.append('  %-20s %10.2f s' % (name, seconds))
+        for name, n in sorted(self.counters.items()):
+            lines.append('  %-28s %10d' % (name, n))
+        return '\n'.join(lines)
+
+    def save(self, path):
+        """Write the summary to a JSON file"""
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=2, sort_keys=True)
@@ -0,0 +1,34 @@
+-- Summary tables for the report queries, kept up to date by load_sqlite() and
+-- apply_changes() (see p3_osm/aggregates.py). Safe to run against an existing
+-- database; build_aggregates() then fills them.
+
+-- Number of rows per (key, value) in each of the tag tables
+CREATE TABLE IF NOT EXISTS tag_counts (
+    tags TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    num INTEGER NOT NULL,
+    PRIMARY KEY (tags, key, value)
+) WITHOUT ROWID;
+
+-- Number of nodes and ways per user
+CREATE TABLE IF NOT EXISTS user_counts (
+    uid INTEGER NOT NULL,
+    nodes INTEGER NOT NULL,
+    ways INTEGER NOT NULL,
+    PRIMARY KEY (uid)
+) WITHOUT ROWID;
+
+-- Number of rows in nodes, ways and relations
+CREATE TABLE IF NOT EXISTS element_counts (
+    element TEXT PRIMARY KEY NOT NULL,
+    num INTEGER NOT NULL
+);
+
+-- Values of a key among the nodes of a kind of POI (see POI_CATEGORIES)
+CREATE TABLE IF NOT EXISTS category_counts (
+    category TEXT NOT NULL,
+    value TEXT NOT NULL,
+    num INTEGER NOT NULL,
+    PRIMARY KEY (category, value)
+) WITHOUT ROWID;
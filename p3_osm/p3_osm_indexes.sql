@@ -0,0 +1,23 @@
+-- Indexes for the analysis queries. Safe to run against an existing database:
+--     sqlite3 p3_osm_data.db < p3_osm/p3_osm_indexes.sql
+
+-- Tag lookups by key and value (amenities, cuisines, sports, street names).
+-- Carrying id makes them covering, so the queries never touch the table itself.
+CREATE INDEX IF NOT EXISTS nodes_tags_key_value ON nodes_tags (key, value, id);
+CREATE INDEX IF NOT EXISTS ways_tags_key_value ON ways_tags (key, value, id);
+CREATE INDEX IF NOT EXISTS relations_tags_key_value ON relations_tags (key, value, id);
+
+-- Tag lookups by element (joins back from a matching tag to its siblings)
+CREATE INDEX IF NOT EXISTS nodes_tags_id_key ON nodes_tags (id, key, value);
+CREATE INDEX IF NOT EXISTS ways_tags_id_key ON ways_tags (id, key, value);
+CREATE INDEX IF NOT EXISTS relations_tags_id_key ON relations_tags (id, key, value);
+
+-- Way geometry in both directions
+CREATE INDEX IF NOT EXISTS ways_nodes_id ON ways_nodes (id, position);
+CREATE INDEX IF NOT EXISTS ways_nodes_node_id ON ways_nodes (node_id);
+
+-- Relation members in both directions
+CREATE INDEX IF NOT EXISTS relations_members_id ON relations_members (id, position);
+CREATE INDEX IF NOT EXISTS relations_members_member ON relations_members (member_type, member_id);
+
+ANALYZE;
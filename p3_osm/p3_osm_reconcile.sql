@@ -0,0 +1,18 @@
+-- Name tags that look like street names, as candidates for retagging (see
+-- p3_osm/reconcile.py). Safe to run against an existing database;
+-- reconcile_streets() then fills the table.
+
+-- reason is 'known' if the normalized name is the street of some address,
+-- 'street_type' if it only has one of the expected street types
+CREATE TABLE IF NOT EXISTS street_candidates (
+    element TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    street TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    user TEXT,
+    uid INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS street_candidates_uid ON street_candidates (uid, reason);
+CREATE INDEX IF NOT EXISTS street_candidates_street ON street_candidates (street);
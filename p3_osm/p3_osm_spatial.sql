@@ -0,0 +1,15 @@
+-- R*Tree indexes over node locations and way bounding boxes (needs SQLite's rtree
+-- module). Rerunning the file rebuilds them:
+--     sqlite3 p3_osm_data.db < p3_osm/p3_osm_spatial.sql
+
+CREATE VIRTUAL TABLE IF NOT EXISTS nodes_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon);
+CREATE VIRTUAL TABLE IF NOT EXISTS ways_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon);
+
+DELETE FROM nodes_rtree;
+INSERT INTO nodes_rtree
+    SELECT id, lat, lat, lon, lon FROM nodes WHERE lat IS NOT NULL AND lon IS NOT NULL;
+
+-- Only filled for databases loaded with way geometry
+DELETE FROM ways_rtree;
+INSERT INTO ways_rtree
+    SELECT id, min_lat, max_lat, min_lon, max_lon FROM ways_geometry;
@@ -0,0 +1,268 @@
+"""A minimal reader for the protobuf messages of the PBF format (see
+https://wiki.openstreetmap.org/wiki/PBF_Format), which only needs zlib."""
+
+import struct
+import time
+import xml.etree.ElementTree as ET
+import zlib
+
+
+def pbf_varint(buf, pos):
+    result = 0
+    shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7f) << shift
+        if not b & 0x80:
+            return result, pos
+        shift += 7
+
+
+def pbf_signed(n):
+    """Reinterpret a plain varint as a two's complement int64"""
+    return n - (1 << 64) if n >= (1 << 63) else n
+
+
+def pbf_zigzag(n):
+    return (n >> 1) ^ -(n & 1)
+
+
+def pbf_fields(buf, start=0, end=None):
+    """Yield (field number, value) for each field of a message, with (start, end) positions as the value of
+    length-delimited fields"""
+    pos = start
+    end = len(buf) if end is None else end
+    while pos < end:
+        key, pos = pbf_varint(buf, pos)
+        wire_type = key & 7
+        if wire_type == 0:
+            value, pos = pbf_varint(buf, pos)
+        elif wire_type == 2:
+            length, pos = pbf_varint(buf, pos)
+            value = (pos, pos + length)
+            pos += length
+        elif wire_type == 1:
+            value = None
+            pos += 8
+        elif wire_type == 5:
+            value = None
+            pos += 4
+        else:
+            raise ValueError('Unsupported protobuf wire type %d' % wire_type)
+        yield key >> 3, value
+
+
+def pbf_packed(buf, value, zigzag=False, delta=False):
+    """Decode a packed (or single) repeated varint field"""
+    if isinstance(value, tuple):
+        pos, end = value
+        values = []
+        while pos < end:
+            n, pos = pbf_varint(buf, pos)
+            values.append(n)
+    else:
+        values = [value]
+    if zigzag:
+        values = [pbf_zigzag(n) for n in values]
+    if delta:
+        total = 0
+        for i, n in enumerate(values):
+            total += n
+            values[i] = total
+    return values
+
+
+def pbf_blobs(osmfile, start=0, end=None, read_data=True):
+    """Yield (offset, type, raw blob) for each file block, from byte offset start up to end"""
+    with open(osmfile, 'rb') as f:
+        f.seek(start)
+        offset = start
+        while end is None or offset < end:
+            size = f.read(4)
+            if len(size) < 4:
+                return
+            header = bytearray(f.read(struct.unpack('>I', size)[0]))
+            blob_type, datasize = None, 0
+            for field, value in pbf_fields(header):
+                if field == 1:
+                    blob_type = header[value[0]:value[1]].decode('utf-8')
+                elif field == 3:
+                    datasize = value
+            if read_data and blob_type == 'OSMData':
+                yield offset, blob_type, f.read(datasize)
+            else:
+                yield offset, blob_type, None
+                f.seek(datasize, 1)
+            offset += 4 + len(header) + datasize
+
+
+def pbf_block(blob):
+    """Unpack the data of a blob"""
+    blob = bytearray(blob)
+    for field, value in pbf_fields(blob):
+        if field == 1:
+            return blob[value[0]:value[1]]
+        elif field == 3:
+            return bytearray(zlib.decompress(bytes(blob[value[0]:value[1]])))
+    raise ValueError('Unsupported PBF blob compression')
+
+
+def pbf_timestamp(ts, date_granularity):
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(ts * date_granularity // 1000))
+
+
+def pbf_info(buf, value, strings, date_granularity):
+    """Decode an Info message into element attributes"""
+    attrib = {}
+    for field, v in pbf_fields(buf, *value):
+        if field == 1:
+            attrib['version'] = str(v)
+        elif field == 2:
+            attrib['timestamp'] = pbf_timestamp(pbf_signed(v), date_granularity)
+        elif field == 3:
+            attrib['changeset'] = str(pbf_signed(v))
+        elif field == 4:
+            attrib['uid'] = str(pbf_signed(v))
+        elif field == 5:
+            attrib['user'] = strings[v]
+        elif field == 6 and not v:
+            attrib['visible'] = 'false'
+    return attrib
+
+
+def pbf_element(tag, attrib, keys, vals, strings, refs=(), members=()):
+    """Build an element shaped like the ones parsed from OSM XML"""
+    elem = ET.Element(tag, attrib)
+    for ref in refs:
+        ET.SubElement(elem, 'nd', {'ref': str(ref)})
+    for member in members:
+        ET.SubElement(elem, 'member', member)
+    for k, v in zip(keys, vals):
+        ET.SubElement(elem, 'tag', {'k': strings[k], 'v': strings[v]})
+    return elem
+
+PBF_MEMBER_TYPES = ['node', 'way', 'relation']
+
+
+def pbf_dense_nodes(buf, value, strings, coord):
+    """Yield node elements from a DenseNodes message"""
+    ids, lats, lons, keys_vals, info = [], [], [], [], {}
+    for field, v in pbf_fields(buf, *value):
+        if field == 1:
+            ids = pbf_packed(buf, v, zigzag=True, delta=True)
+        elif field == 5:
+            info = dict(pbf_fields(buf, *v))
+        elif field == 8:
+            lats = pbf_packed(buf, v, zigzag=True, delta=True)
+        elif field == 9:
+            lons = pbf_packed(buf, v, zigzag=True, delta=True)
+        elif field == 10:
+            keys_vals = pbf_packed(buf, v)
+    versions = pbf_packed(buf, info[1]) if 1 in info else None
+    timestamps = pbf_packed(buf, info[2], zigzag=True, delta=True) if 2 in info else None
+    changesets = pbf_packed(buf, info[3], zigzag=True, delta=True) if 3 in info else None
+    uids = pbf_packed(buf, info[4], zigzag=True, delta=True) if 4 in info else None
+    user_sids = pbf_packed(buf, info[5], zigzag=True, delta=True) if 5 in info else None
+    kv = 0
+    for i, node_id in enumerate(ids):
+        attrib = {'id': str(node_id), 'lat': coord(lats[i], 'lat'), 'lon': coord(lons[i], 'lon')}
+        if versions is not None:
+            attrib['version'] = str(versions[i])
+        if timestamps is not None:
+            attrib['timestamp'] = pbf_timestamp(timestamps[i], coord.date_granularity)
+        if changesets is not None:
+            attrib['changeset'] = str(changesets[i])
+        if uids is not None:
+            attrib['uid'] = str(uids[i])
+        if user_sids is not None:
+            attrib['user'] = strings[user_sids[i]]
+        keys, vals = [], []
+        while kv < len(keys_vals) and keys_vals[kv]:
+            keys.append(keys_vals[kv])
+            vals.append(keys_vals[kv + 1])
+            kv += 2
+        kv += 1
+        yield pbf_element('node', attrib, keys, vals, strings)
+
+
+class PbfCoordinates(object):
+    """Converts the stored lat/lon integers of a block to the degree strings used in OSM XML"""
+    def __init__(self, granularity=100, lat_offset=0, lon_offset=0, date_granularity=1000):
+        self.granularity = granularity
+        self.offsets = {'lat': lat_offset, 'lon': lon_offset}
+        self.date_granularity = date_granularity
+
+    def __call__(self, n, axis):
+        return ('%.7f' % (1e-9 * (self.offsets[axis] + self.granularity * n))).rstrip('0').rstrip('.')
+
+
+def pbf_elements_from_block(data, tags):
+    """Yield the elements of the wanted types from one decompressed PrimitiveBlock"""
+    strings, groups, params = [], [], {}
+    for field, value in pbf_fields(data):
+        if field == 1:
+            strings = [data[s:e].decode('utf-8') for f, (s, e) in pbf_fields(data, *value) if f == 1]
+        elif field == 2:
+            groups.append(value)
+        elif field == 17:
+            params['granularity'] = value
+        elif field == 18:
+            params['date_granularity'] = value
+        elif field == 19:
+            params['lat_offset'] = pbf_signed(value)
+        elif field == 20:
+            params['lon_offset'] = pbf_signed(value)
+    coord = PbfCoordinates(**params)
+
+    for group in groups:
+        for field, value in pbf_fields(data, *group):
+            if field == 2 and 'node' in tags:
+                for elem in pbf_dense_nodes(data, value, strings, coord):
+                    yield elem
+            elif (field == 1 and 'node' in tags) or (field == 3 and 'way' in tags) or \
+                    (field == 4 and 'relation' in tags):
+                attrib, keys, vals, refs, members = {}, [], [], [], []
+                lat = lon = roles = memids = types = None
+                for f, v in pbf_fields(data, *value):
+                    if f == 1:
+                        attrib['id'] = str(pbf_zigzag(v) if field == 1 else pbf_signed(v))
+                    elif f == 2:
+                        keys = pbf_packed(data, v)
+                    elif f == 3:
+                        vals = pbf_packed(data, v)
+                    elif f == 4:
+                        attrib.update(pbf_info(data, v, strings, coord.date_granularity))
+                    elif f == 8 and field == 1:
+                        lat = pbf_zigzag(v)
+                    elif f == 9 and field == 1:
+                        lon = pbf_zigzag(v)
+                    elif f == 8 and field == 3:
+                        refs = pbf_packed(data, v, zigzag=True, delta=True)
+                    elif f == 8 and field == 4:
+                        roles = pbf_packed(data, v)
+                    elif f == 9 and field == 4:
+                        memids = pbf_packed(data, v, zigzag=True, delta=True)
+                    elif f == 10 and field == 4:
+                        types = pbf_packed(data, v)
+                if field == 1:
+                    attrib['lat'] = coord(lat, 'lat')
+                    attrib['lon'] = coord(lon, 'lon')
+                    tag = 'node'
+                elif field == 3:
+                    tag = 'way'
+                else:
+                    tag = 'relation'
+                    members = [{'type': PBF_MEMBER_TYPES[t], 'ref': str(m), 'role': strings[r]}
+                               for t, m, r in zip(types or [], memids or [], roles or [])]
+                yield pbf_element(tag, attrib, keys, vals, strings, refs, members)
+
+
+def pbf_elements(osmfile, tags=('node', 'way', 'relation'), start=0, end=None):
+    """Yield the elements of the wanted types from a .osm.pbf file, optionally only from the blobs
+    starting between byte offsets start and end"""
+    for offset, blob_type, blob in pbf_blobs(osmfile, start, end):
+        if blob_type == 'OSMData':
+            for elem in pbf_elements_from_block(pbf_block(blob), tags):
+                if elem.get('visible') != 'false':
+                    yield elem
@@ -0,0 +1,124 @@
+"""The report queries of the analysis, by name."""
+
+N_NODES = 'SELECT COUNT(*) FROM nodes;'
+N_WAYS = 'SELECT COUNT(*) FROM ways;'
+N_UNIQUE_USERS = '''
+                SELECT COUNT(DISTINCT(e.uid))
+                FROM (SELECT uid FROM nodes UNION ALL SELECT uid FROM ways) e;
+                '''
+TOP_10_AMENITIES = '''
+                   SELECT value, COUNT(*) as num
+                   FROM nodes_tags
+                   WHERE key='amenity'
+                   GROUP BY value
+                   ORDER BY num DESC
+                   LIMIT 10;
+                   '''
+
+CUISINES = '''
+          SELECT nodes_tags.value, COUNT(*) as num
+          FROM nodes_tags
+          WHERE nodes_tags.key='cuisine'
+              AND EXISTS (SELECT 1
+                  FROM nodes_tags i
+                  WHERE i.id=nodes_tags.id
+                      AND i.value IN ('restaurant', 'fast_food', 'cafe'))
+          GROUP BY nodes_tags.value
+          ORDER BY num DESC
+          LIMIT 10;
+          '''
+LEISURE = '''
+         SELECT value, COUNT(*) as num
+         FROM nodes_tags
+         WHERE key='leisure'
+         GROUP BY value
+         ORDER BY num DESC
+         LIMIT 10;
+         '''
+
+SPORTS = '''
+          SELECT nodes_tags.value, COUNT(*) as num
+          FROM nodes_tags
+          WHERE nodes_tags.key='sport'
+              AND EXISTS (SELECT 1
+                  FROM nodes_tags i
+                  WHERE i.id=nodes_tags.id
+                      AND i.value='pitch')
+          GROUP BY nodes_tags.value
+          ORDER BY num DESC
+          LIMIT 10;
+          '''
+
+STREET_STR = '''
+            SELECT value
+            FROM ways_tags
+            WHERE key = 'street'
+            GROUP BY value
+            ORDER BY value
+            LIMIT 10;
+            '''
+
+NAMES_DUPL = '''
+        SELECT a.key, 'name', a.value
+        FROM ways_tags as a
+        WHERE a.key = 'street'
+            AND EXISTS (SELECT 1 FROM ways_tags as b WHERE b.key = 'name' AND b.value = a.value)
+        GROUP BY a.value
+        ORDER BY a.value
+        LIMIT 10;
+        '''
+
+STR_IN_NAMES_ONLY = '''
+                    SELECT value
+                    FROM ways_tags
+                    WHERE key = 'name'
+                        AND instr(value, 'str') > 0
+                        AND NOT EXISTS (SELECT 1 FROM ways_tags as s WHERE s.key='street' AND s.value=ways_tags.value)
+                    GROUP BY value
+                    ORDER BY value
+                    LIMIT 10;
+                    '''
+
+STR_IN_NAMES_ONLY_COUNT = '''
+                        SELECT COUNT(DISTINCT value)
+                        FROM ways_tags
+                        WHERE key = 'name'
+                            AND instr(value, 'str') > 0
+                            AND NOT EXISTS (SELECT 1 FROM ways_tags as s WHERE s.key='street' AND s.value=ways_tags.value);
+                        '''
+
+NAMED_QUERIES = [('N_NODES', N_NODES),
+                 ('N_WAYS', N_WAYS),
+                 ('N_UNIQUE_USERS', N_UNIQUE_USERS),
+                 ('TOP_10_AMENITIES', TOP_10_AMENITIES),
+                 ('CUISINES', CUISINES),
+                 ('LEISURE', LEISURE),
+                 ('SPORTS', SPORTS),
+                 ('STREET_STR', STREET_STR),
+                 ('NAMES_DUPL', NAMES_DUPL),
+                 ('STR_IN_NAMES_ONLY', STR_IN_NAMES_ONLY),
+                 ('STR_IN_NAMES_ONLY_COUNT', STR_IN_NAMES_ONLY_COUNT)]
+
+
+def query_plans(con, queries=NAMED_QUERIES):
+    """Run EXPLAIN QUERY PLAN for each named query, return (name, plan lines) pairs"""
+
+    plans = []
+    for name, query in queries:
+        cur = con.execute('EXPLAIN QUERY PLAN ' + query)
+        plans.append((name, [row[-1] for row in cur.fetchall()]))
+    return plans
+
+
+def database_size(con):
+    """Return the size of the database in bytes"""
+
+    page_size = con.execute('PRAGMA PAGE_SIZE').fetchone()
+    page_count = con.execute('PRAGMA PAGE_COUNT').fetchone()
+    return int(page_size[0]) * int(page_count[0])
+
+
+def run_query(con, name):
+    """Run a named query, return its rows"""
+
+    return con.execute(dict(NAMED_QUERIES)[name]).fetchall()
@@ -0,0 +1,87 @@
+"""Streaming OSM input: plain, bzip2 or gzip compressed XML, and PBF."""
+
+import os
+import xml.etree.ElementTree as ET
+
+# Used to unpack .bz2 extracts on all cores, if one of them is installed
+PARALLEL_BZIP2 = ['lbzip2', 'pbzip2']
+
+
+def find_program(name):
+    """Return the full path of an executable on the PATH, or None"""
+
+    for directory in os.environ.get('PATH', '').split(os.pathsep):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path) and os.access(path, os.X_OK):
+            return path
+    return None
+
+
+class PipeReader(object):
+    """Read-only file object over the output of a decompression program
+
+    Once all of the output is read, close() raises IOError if the program
+    failed, so that a corrupt or truncated file is not taken for a short one.
+    """
+
+    def __init__(self, args):
+        import subprocess
+        self.args = args
+        self.proc = subprocess.Popen(args, stdout=subprocess.PIPE)
+        self.eof = False
+
+    def read(self, size=-1):
+        data = self.proc.stdout.read(size)
+        if not data and size != 0:
+            self.eof = True
+        return data
+
+    def close(self):
+        if not self.eof and self.proc.poll() is None:
+            self.proc.terminate()
+        self.proc.stdout.close()
+        returncode = self.proc.wait()
+        if self.eof and returncode:
+            raise IOError('%s failed with exit status %d' % (' '.join(self.args), returncode))
+
+
+def open_osm(osmfile):
+    """Open an .osm/.osc file for binary reading, decompressing .bz2 and .gz files on the fly"""
+
+    if osmfile.endswith('.bz2'):
+        for name in PARALLEL_BZIP2:
+            program = find_program(name)
+            if program:
+                return PipeReader([program, '-dc', osmfile])
+        import bz2
+        return bz2.BZ2File(osmfile, 'rb')
+    if osmfile.endswith('.gz'):
+        import gzip
+        return gzip.open(osmfile, 'rb')
+    return open(osmfile, 'rb')
+
+
+def is_pbf(osmfile):
+    return not hasattr(osmfile, 'read') and osmfile.endswith('.pbf')
+
+
+def get_element(osm_file, tags=('node', 'way', 'relation')):
+    """Yield element if it is the right type of tag"""
+
+    if is_pbf(osm_file):
+        from .pbf import pbf_elements
+        for elem in pbf_elements(osm_file, tags):
+            yield elem
+        return
+
+    f = osm_file if hasattr(osm_file, 'read') else open_osm(osm_file)
+    try:
+        context = ET.iterparse(f, events=('start', 'end'))
+        _, root = next(context)
+        for event, elem in context:
+            if event == 'end' and elem.tag in tags:
+                yield elem
+                root.clear()
+    finally:
+        if f is not osm_file:
+            f.close()
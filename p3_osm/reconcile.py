@@ -0,0 +1,129 @@
+"""Reconciliation of the street names in name tags with the streets of the address tags."""
+
+import os
+
+from .auditing import EXPECTED_STREET_TYPES
+from .cleaning import street_normalizer
+
+RECONCILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "p3_osm_reconcile.sql")
+RECONCILE_BATCH_SIZE = 10000
+
+# Element type, its table and its tag table
+RECONCILED = (('node', 'nodes', 'nodes_tags'),
+              ('way', 'ways', 'ways_tags'))
+
+# Covered by the (key, value, id) indexes, so neither query reads the tag tables themselves
+STREET_VALUES = "SELECT DISTINCT value FROM {tags} WHERE key = 'street'"
+NAME_TAGS = '''
+            SELECT t.id, t.value, e.user, e.uid
+            FROM {tags} AS t JOIN {table} AS e ON e.id = t.id
+            WHERE t.key = 'name'
+            '''
+INSERT_CANDIDATE = '''
+                   INSERT INTO street_candidates (element, id, name, street, reason, user, uid)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)
+                   '''
+CANDIDATE_USERS = '''
+                  SELECT uid, MAX(user), SUM(reason = 'known'), SUM(reason = 'street_type'), COUNT(*) AS num
+                  FROM street_candidates
+                  GROUP BY uid
+                  ORDER BY num DESC, uid
+                  '''
+
+
+class StreetIndex(object):
+    """Hashed set of the known street names, which classifies name tag values against it
+
+    Names are normalized with the street name cleaning first, so "Foostr." is
+    matched to the "Foostraße" of the (already cleaned) address tags. Each
+    distinct name is classified once and cached, as the same names repeat across
+    many elements.
+    """
+
+    def __init__(self, streets=(), normalizer=street_normalizer):
+        self.normalizer = normalizer
+        self.streets = set([])
+        self.cache = {}
+        for street in streets:
+            self.add(street)
+
+    def add(self, street):
+        self.streets.add(self.normalizer.update(street))
+        self.cache.clear()
+
+    def __len__(self):
+        return len(self.streets)
+
+    def __contains__(self, name):
+        return self.normalizer.update(name) in self.streets
+
+    def classify(self, name):
+        """Return (reason, street) if the name looks like a street name, else None"""
+        try:
+            return self.cache[name]
+        except KeyError:
+            pass
+        street = self.normalizer.update(name)
+        if street in self.streets:
+            result = ('known', street)
+        elif EXPECTED_STREET_TYPES.search(street):
+            result = ('street_type', street)
+        else:
+            result = None
+        self.cache[name] = result
+        return result
+
+
+def known_streets(con):
+    """Return a StreetIndex of the street names of all addr:street and street tags in the database"""
+
+    index = StreetIndex()
+    for kind, table, tags in RECONCILED:
+        for street, in con.execute(STREET_VALUES.format(tags=tags)):
+            index.add(street)
+    return index
+
+
+def has_street_candidates(con):
+    return con.execute("SELECT 1 FROM sqlite_master WHERE name = 'street_candidates'").fetchone() is not None
+
+
+def reconcile_streets(con, index=None):
+    """Create (or rebuild) street_candidates from the name tags of all nodes and ways
+
+    Every name tag is classified against the known streets (index, by default
+    those in the database) in a single pass; the ones that look like street names
+    are written with the user who last edited the element. Returns the number of
+    candidates for each reason.
+    """
+
+    if index is None:
+        index = known_streets(con)
+    with open(RECONCILE_PATH) as reconcile_file:
+        con.executescript(reconcile_file.read())
+    con.execute('DELETE FROM street_candidates')
+    counts = {'known': 0, 'street_type': 0}
+    rows = []
+    for kind, table, tags in RECONCILED:
+        for el_id, name, user, uid in con.execute(NAME_TAGS.format(tags=tags, table=table)):
+            result = index.classify(name)
+            if result is None:
+                continue
+            reason, street = result
+            counts[reason] += 1
+            rows.append((kind, el_id, name, street, reason, user, uid))
+            if len(rows) >= RECONCILE_BATCH_SIZE:
+                con.executemany(INSERT_CANDIDATE, rows)
+                del rows[:]
+    con.executemany(INSERT_CANDIDATE, rows)
+    con.commit()
+    return counts
+
+
+def candidate_users(con, limit=None):
+    """Return (uid, user, known, street_type, total) per user in street_candidates, most candidates first"""
+
+    query = CANDIDATE_USERS
+    if limit is not None:
+        query += ' LIMIT %d' % limit
+    return con.execute(query).fetchall()
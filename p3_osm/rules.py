@@ -0,0 +1,141 @@
+"""Tag cleaning rules: value normalizers registered per tag key, and the cached key/type split of tag keys."""
+
+import re
+
+from .cleaning import street_normalizer, update_opening_hours, update_phone_num, update_postcode, update_website
+
+LOWER_COLON = re.compile(r'^([a-z]|_)+:([a-z]|_)+')
+PROBLEMCHARS = re.compile(r'[=\+/&<>;\'"\?%#$@\,\. \t\r\n]')
+KEY_CACHE_SIZE = 100000
+
+# Tag tables that reclean() goes through
+TAG_TABLES = ('nodes_tags', 'ways_tags', 'relations_tags')
+DISTINCT_VALUES = 'SELECT DISTINCT value FROM {tags} WHERE key = ? AND type = ?'
+# One statement per key, so every row is cleaned from its original value even if the rules are not idempotent
+UPDATE_VALUES = '''
+                UPDATE {tags}
+                SET value = (SELECT new FROM temp.reclean_values WHERE old = {tags}.value)
+                WHERE key = ? AND type = ? AND value IN (SELECT old FROM temp.reclean_values)
+                '''
+
+
+class TagRules(object):
+    """Normalizers for the values of tags, keyed by the tag key as it is in the OSM file (e.g. "addr:street")
+
+    The key/type split of shape_tag() is cached per distinct key, so a tag whose
+    key has no normalizer costs two dict lookups however many rules are registered.
+    """
+
+    def __init__(self):
+        # key -> (name, function of the value); the name is what RunStats times it as
+        self.normalizers = {}
+        self.key_cache = {}
+
+    def register(self, k, func, name=None):
+        """Clean the values of tag key k with func(value) -> value"""
+        self.normalizers[k] = (name or func.__name__, func)
+
+    def unregister(self, k):
+        self.normalizers.pop(k, None)
+
+    def split_key(self, k):
+        """Return the (key, type) a tag key is stored as, both None for problematic keys"""
+        try:
+            return self.key_cache[k]
+        except KeyError:
+            pass
+        if PROBLEMCHARS.search(k):
+            split = (None, None)
+        elif LOWER_COLON.search(k):
+            tag_type, key = k.split(":", 1)
+            split = (key, tag_type)
+        else:
+            split = (k, "regular")
+        if len(self.key_cache) >= KEY_CACHE_SIZE:
+            self.key_cache.clear()
+        self.key_cache[k] = split
+        return split
+
+    def stored_keys(self):
+        """Return {(key, type): tag key} for the keys with a normalizer, as they are stored in the tag tables"""
+        return dict((self.split_key(k), k) for k in self.normalizers if self.split_key(k)[0] is not None)
+
+    def shape(self, k, v, stats=None):
+        """Clean a tag's value and split its key, return (key, value, type) with key and type None for problematic keys"""
+        rule = self.normalizers.get(k)
+        if rule is not None:
+            v = rule[1](v) if stats is None else stats.clean(rule[0], rule[1], v)
+        key, tag_type = self.key_cache.get(k) or self.split_key(k)
+        return key, v, tag_type
+
+    def clean_values(self, k, values):
+        """Clean a batch of values of one tag key, calling the normalizer once per distinct value"""
+        rule = self.normalizers.get(k)
+        if rule is None:
+            return list(values)
+        func = rule[1]
+        cleaned = {}
+        for value in values:
+            if value not in cleaned:
+                cleaned[value] = func(value)
+        return [cleaned[value] for value in values]
+
+
+tag_rules = TagRules()
+tag_rules.register("addr:street", street_normalizer.update, 'update_name')
+tag_rules.register("phone", update_phone_num)
+tag_rules.register("addr:postcode", update_postcode)
+tag_rules.register("opening_hours", update_opening_hours)
+tag_rules.register("website", update_website)
+
+
+def clean_distinct(args):
+    """Clean one chunk of distinct values in a worker process, for reclean()"""
+    rules, k, values = args
+    return rules.clean_values(k, values)
+
+
+def reclean(con, rules=None, processes=None, chunk_size=10000):
+    """Clean the tag values already in a database with the current rules, return the number of rows changed per key
+
+    Each key's distinct values are read through the (key, value, id) indexes and
+    cleaned once, in a pool of processes if given, and only the values that
+    change are rewritten. The summary and street candidate tables are rebuilt
+    afterwards if the database has them, as their counts depend on the values.
+    """
+
+    from .aggregates import build_aggregates, has_aggregates
+    from .reconcile import has_street_candidates, reconcile_streets
+
+    rules = tag_rules if rules is None else rules
+    changed = dict((k, 0) for k in rules.normalizers)
+    pool = None
+    if processes:
+        import multiprocessing
+        pool = multiprocessing.Pool(processes)
+    con.execute('CREATE TEMP TABLE IF NOT EXISTS reclean_values (old TEXT PRIMARY KEY, new TEXT)')
+    try:
+        for (key, tag_type), k in sorted(rules.stored_keys().items()):
+            for tags in TAG_TABLES:
+                values = [value for value, in con.execute(DISTINCT_VALUES.format(tags=tags), (key, tag_type))]
+                if pool is not None and len(values) > chunk_size:
+                    chunks = [(rules, k, values[i:i + chunk_size]) for i in range(0, len(values), chunk_size)]
+                    cleaned = [upd for chunk in pool.map(clean_distinct, chunks) for upd in chunk]
+                else:
+                    cleaned = rules.clean_values(k, values)
+                updates = [(value, upd) for value, upd in zip(values, cleaned) if upd != value]
+                if not updates:
+                    continue
+                con.execute('DELETE FROM temp.reclean_values')
+                con.executemany('INSERT INTO temp.reclean_values (old, new) VALUES (?, ?)', updates)
+                changed[k] += con.execute(UPDATE_VALUES.format(tags=tags), (key, tag_type)).rowcount
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    con.commit()
+    if has_aggregates(con):
+        build_aggregates(con)
+    if has_street_candidates(con):
+        reconcile_streets(con)
+    return changed
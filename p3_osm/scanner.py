@@ -0,0 +1,333 @@
+"""Fast reading of plain OSM XML: a memory-mapped scanner that shapes elements into rows without ElementTree."""
+
+import itertools
+import mmap
+import operator
+import re
+import xml.etree.ElementTree as ET
+
+from .database import LOAD_TABLES, shaped_rows
+from .reader import get_element, is_pbf
+from .rules import tag_rules
+from .shaping import NODE_FIELDS, RELATION_FIELDS, WAY_FIELDS, shape_element
+
+BLOCK_SIZE = 8 * 1024 * 1024
+
+# Top-level elements can be located in the raw bytes, like find_chunks() does: '<' is always
+# escaped inside attribute values, and the child elements are only <tag>, <nd> or <member>.
+ELEMENT_START = re.compile(br'<(?:node|way|relation)[\s/>]')
+ELEMENT_STARTS = dict((tag, re.compile(br'<%s[\s/>]' % tag.encode())) for tag in ('node', 'way', 'relation'))
+XML_ENCODING = re.compile(br'''<\?xml[^>]*encoding\s*=\s*["']([\w.-]+)''')
+
+# The patterns are all bytes patterns, run on the UTF-8 of the file as it is (memory-mapped), and only
+# the values they capture are decoded. Every byte of a multi-byte UTF-8 sequence is >= 0x80, so
+# it can neither be taken for nor hide any of the ASCII characters the patterns look for.
+
+# Any attributes, for elements that do not fit the pattern of their block
+ANY_ATTRS = br'''((?:\s+[^\s=/>]+\s*=\s*(?:"[^"]*"|'[^']*'))*)'''
+START_TAGS = dict((tag, re.compile(b'<%s%s' % (tag.encode(), ANY_ATTRS))) for tag in ('node', 'way', 'relation'))
+
+# Only values that ElementTree hands back unchanged are scanned: no entities, and no
+# tabs or newlines (which it normalizes to spaces). The patterns expect the quotes
+# that the first element of its type in a block uses; other elements go to ElementTree.
+VALUE = b'%s([^%s<&\\t\\n\\r]*)%s'
+SCAN_PATTERNS = {}
+for quote in (b'"', b"'"):
+    value = VALUE % (quote, quote, quote)
+    SCAN_PATTERNS[quote] = (re.compile(br'([^\s=/>]+)\s*=\s*' + value),
+                            re.compile(br'<tag\s+k\s*=\s*' + value + br'\s+v\s*=\s*' + value + br'\s*/>'),
+                            re.compile(br'<nd\s+ref\s*=\s*' + value + br'\s*/>'),
+                            re.compile(br'<member((?:\s+[^\s=/>]+\s*=\s*' + value.replace(b'(', b'(?:') + br')*)\s*/>'))
+UNUSUAL = re.compile(br'[&\t\n\r]')
+
+ELEMENT_FIELDS = {'node': NODE_FIELDS, 'way': WAY_FIELDS, 'relation': RELATION_FIELDS}
+FIELD_NAMES = dict((tag, tuple(field.encode() for field in fields)) for tag, fields in ELEMENT_FIELDS.items())
+ELEMENT_TABLES = {'node': ('nodes', 'nodes_tags'), 'way': ('ways', 'ways_tags'),
+                  'relation': ('relations', 'relations_tags')}
+# Values per row of the tables that scanned rows are put off for (see ScannedRows.flush())
+PENDING_WIDTHS = dict((tables[0], len(ELEMENT_FIELDS[tag])) for tag, tables in ELEMENT_TABLES.items())
+PENDING_WIDTHS.update((tables[1], 3) for tables in ELEMENT_TABLES.values())  # id, k, v
+PENDING_WIDTHS['ways_nodes'] = 2  # id, ref
+block_patterns = {}
+
+
+def decode_values(values):
+    """Decode a list of scanned values with one call; they cannot hold a newline, so it joins them"""
+
+    if not values:
+        return []
+    return b'\n'.join(values).decode('utf-8').split('\n')
+
+
+def decode_attrib(pairs):
+    """Decode a list of scanned (name, value) pairs into an attribute dict"""
+
+    values = iter(decode_values([value for pair in pairs for value in pair]))
+    return dict(zip(values, values))
+
+
+def quote_of(attrs):
+    """Return the quote that most of the attributes in the UTF-8 of a start tag are in"""
+
+    return b'"' if attrs.count(b'="') >= attrs.count(b"='") else b"'"
+
+
+def block_pattern(tag, names, quote):
+    """Compile the pattern for elements whose attributes are exactly names, in that order
+
+    Its groups are the attribute values, then the attributes of an element that
+    does not fit (None for those that do), then the children.
+    """
+
+    key = (tag, names, quote)
+    if key not in block_patterns:
+        value = VALUE % (quote, quote, quote)
+        fitting = b''.join(br'\s+%s=%s' % (re.escape(name), value) for name in names)
+        if not names:
+            fitting = b'(?!)'
+        name = tag.encode()
+        block_patterns[key] = re.compile(br'<%s(?:%s|%s)\s*(?:/>|>(.*?)</%s>)' % (name, fitting, ANY_ATTRS, name), re.S)
+    return block_patterns[key]
+
+
+class ScannedRows(object):
+    """Shaped rows of each table, as tuples in the column order of the schema
+
+    The rows are the ones shaped_rows() makes of shape_element()'s dicts: missing
+    attributes are None, and the key and type of problematic tag keys are ''.
+
+    Scanned values are kept as UTF-8 in pending until flush() decodes them, all
+    those of a table in one go; add_block() flushes before it returns, and before
+    any row that is added otherwise, so the rows keep the order of the file.
+    """
+
+    def __init__(self):
+        self.tables = dict((table, []) for part, table, fields in LOAD_TABLES)
+        self.pending = dict((table, []) for table in PENDING_WIDTHS)  # table -> values, row after row
+        self.positions = []  # of the pending ways_nodes rows
+
+    def __len__(self):
+        return sum(len(rows) for rows in self.tables.values())
+
+    def rows(self, table):
+        return self.tables[table]
+
+    def clear(self):
+        for rows in itertools.chain(self.tables.values(), self.pending.values(), [self.positions]):
+            del rows[:]
+
+    def flush(self):
+        """Decode the pending values into rows"""
+
+        normalizers = tag_rules.normalizers
+        key_cache = tag_rules.key_cache
+        for table, values in self.pending.items():
+            if not values:
+                continue
+            decoded = iter(decode_values(values))
+            rows = self.tables[table]
+            if table == 'ways_nodes':
+                rows.extend(zip(decoded, decoded, self.positions))
+                del self.positions[:]
+            elif table.endswith('_tags'):
+                for el_id, k, v in zip(decoded, decoded, decoded):
+                    rule = normalizers.get(k)
+                    if rule is not None:
+                        v = rule[1](v)
+                    key, tag_type = key_cache.get(k) or tag_rules.split_key(k)
+                    rows.append((el_id, key or '', v, tag_type or ''))
+            else:
+                rows.extend(zip(*[decoded] * PENDING_WIDTHS[table]))
+            del values[:]
+
+    def add_children(self, tag, el_id, body, quote):
+        """Scan the children of an element, return False (adding nothing) if they need ElementTree
+
+        el_id and body are UTF-8, like the values put off for flush().
+        """
+
+        attr_pattern, tag_pattern, nd_pattern, member_pattern = SCAN_PATTERNS[quote]
+        tags = tag_pattern.findall(body)
+        children = len(tags)
+        if tag == 'way':
+            refs = nd_pattern.findall(body)
+            children += len(refs)
+        elif tag == 'relation':
+            members = member_pattern.findall(body)
+            children += len(members)
+        # Every '<' in the body has to start one of the children matched above
+        if body.count(b'<') != children or b'&' in body:
+            return False
+        if tag == 'way':
+            pending = self.pending['ways_nodes']
+            for ref in refs:
+                pending += (el_id, ref)
+            self.positions.extend(range(len(refs)))
+        elif tag == 'relation':
+            # Relations are few, so their members are decoded right away
+            members = [decode_attrib(attr_pattern.findall(member)) for member in members]
+            self.tables['relations_members'].extend(
+                (el_id.decode('utf-8'), member.get('type'), member.get('ref'), member.get('role'), pos)
+                for pos, member in enumerate(members))
+        pending = self.pending[ELEMENT_TABLES[tag][1]]
+        for k, v in tags:
+            pending += (el_id, k, v)
+        return True
+
+    def add_scanned(self, tag, attrs, body):
+        """Shape an element from the UTF-8 of its attributes and children, return False if it needs ElementTree"""
+
+        quote = quote_of(attrs)
+        pairs = SCAN_PATTERNS[quote][0].findall(attrs)
+        # Every quote and '=' has to belong to one of the attributes matched, or some are in the other quotes
+        if attrs.count(quote) != 2 * len(pairs) or attrs.count(b'=') != len(pairs) or UNUSUAL.search(attrs):
+            return False
+        el_id = dict(pairs).get(b'id')
+        if body and (el_id is None or not self.add_children(tag, el_id, body, quote)):
+            return False
+        # The element row is added right away, so the rows put off so far go first
+        self.flush()
+        attrib = decode_attrib(pairs)
+        self.tables[ELEMENT_TABLES[tag][0]].append(tuple(map(attrib.get, ELEMENT_FIELDS[tag])))
+        return True
+
+    def add_element(self, element):
+        """Shape an ElementTree element with shape_element() into the rows"""
+
+        el = shape_element(element)
+        if not el:
+            return
+        for part, table, fields in LOAD_TABLES:
+            if part in el:
+                self.tables[table].extend(shaped_rows(el, part, fields))
+
+    def add_block(self, data, tags=('node', 'way', 'relation'), counts=None, start=0, end=None):
+        """Shape all elements of the right type in a byte range of OSM XML that holds whole elements only
+
+        data is bytes or any buffer of UTF-8, such as an mmap, and is scanned in
+        place. The attribute names and quotes of the first element of each type
+        set the pattern for the others, so most elements are matched with all
+        their values in one go; the rest are scanned on their own with
+        add_scanned(), or else parsed by ElementTree. Returns the number of
+        elements added.
+        """
+
+        end = len(data) if end is None else end
+        n = scanned = parsed = 0
+        for tag in tags:
+            first = ELEMENT_STARTS[tag].search(data, start, end)
+            if first is None:
+                continue
+            attrs = START_TAGS[tag].match(data, first.start(), end).group(1)
+            quote = quote_of(attrs)
+            names = tuple(name for name, value in SCAN_PATTERNS[quote][0].findall(attrs))
+            if not set(FIELD_NAMES[tag]) <= set(names):
+                names = ()
+            pattern = block_pattern(tag, names, quote)
+            if names:
+                row = operator.itemgetter(*[names.index(field) for field in FIELD_NAMES[tag]])
+                id_index = names.index(b'id')
+            pending = self.pending[ELEMENT_TABLES[tag][0]]
+            found = 0
+            for m in pattern.finditer(data, start, end):
+                found += 1
+                values = m.groups()
+                attrs, body = values[-2:]
+                if attrs is None:
+                    if not body or self.add_children(tag, values[id_index], body, quote):
+                        pending += row(values)
+                        scanned += 1
+                        continue
+                elif self.add_scanned(tag, attrs, body):
+                    scanned += 1
+                    continue
+                self.flush()
+                self.add_element(ET.fromstring(m.group(0)))
+                parsed += 1
+            self.flush()
+            # Anything that looked like an element but did not match is malformed
+            if found != len(ELEMENT_STARTS[tag].findall(data, start, end)):
+                raise ET.ParseError('malformed <%s> element' % tag)
+            n += found
+        if counts is not None:
+            counts['scanned'] = counts.get('scanned', 0) + scanned
+            counts['parsed'] = counts.get('parsed', 0) + parsed
+        return n
+
+
+def scannable(data, start=0, end=None):
+    """Check that a byte range of OSM XML can be scanned: UTF-8, with no comments, CDATA or DTD"""
+
+    m = XML_ENCODING.match(data, 0, 200)
+    if m and m.group(1).lower().replace(b'_', b'-') not in (b'utf-8', b'utf8', b'us-ascii', b'ascii'):
+        return False
+    return data.find(b'<!', start, len(data) if end is None else end) == -1
+
+
+def scan_buffer(data, rows, tags=('node', 'way', 'relation'), start=0, end=None, counts=None,
+                block_size=BLOCK_SIZE):
+    """Shape each element of the right type in a byte range of OSM XML into rows, a block at a time
+
+    data is anything that supports the buffer protocol, e.g. an mmap. It is cut
+    into blocks of about block_size bytes at element boundaries, and each block is
+    scanned in place with ScannedRows.add_block(); after each, the number of
+    elements it held is yielded so the caller can write the rows out. counts, if
+    given, gets the number of 'scanned' elements and those 'parsed' by ElementTree.
+    """
+
+    end = len(data) if end is None else end
+    pos = start
+    while pos < end:
+        cut = end
+        if pos + block_size < end:
+            m = ELEMENT_START.search(data, pos + block_size, end)
+            if m:
+                cut = m.start()
+        n = rows.add_block(data, tags, counts, pos, cut)
+        pos = cut
+        yield n
+
+
+def map_osm(osm_file):
+    """Memory-map a plain OSM XML file for scanning, or return None if it has to be parsed by ElementTree"""
+
+    if hasattr(osm_file, 'read') or is_pbf(osm_file) or osm_file.endswith(('.bz2', '.gz')):
+        return None
+    with open(osm_file, 'rb') as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            return None
+    if not scannable(data):
+        data.close()
+        return None
+    return data
+
+
+def scan_osm(osm_file, rows, tags=('node', 'way', 'relation'), counts=None, block_size=BLOCK_SIZE):
+    """Shape each element of the right type into rows, yielding the number of elements added every so often
+
+    Plain .osm files are memory-mapped and scanned with scan_buffer(). Compressed
+    and PBF files, open file objects and XML that scannable() rejects are read
+    with get_element() and shape_element() instead, into the same rows.
+    """
+
+    data = map_osm(osm_file)
+    if data is None:
+        n = 0
+        for element in get_element(osm_file, tags):
+            rows.add_element(element)
+            n += 1
+            if counts is not None:
+                counts['parsed'] = counts.get('parsed', 0) + 1
+            if n == 10000:
+                yield n
+                n = 0
+        yield n
+        return
+    try:
+        for n in scan_buffer(data, rows, tags, counts=counts, block_size=block_size):
+            yield n
+    finally:
+        data.close()
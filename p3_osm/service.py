@@ -0,0 +1,180 @@
+"""Concurrent read-only access to a loaded database: a pool of connections, cached reports and streamed results."""
+
+import contextlib
+import os
+import queue
+import sqlite3 as sql
+import threading
+
+from .aggregates import AGGREGATE_QUERIES, has_aggregates
+from .queries import NAMED_QUERIES
+
+POOL_SIZE = 4
+# Per connection; the memory map is shared between them through the page cache
+CACHE_SIZE = -32768  # in KiB, i.e. 32 MiB
+MMAP_SIZE = 256 * 1024 * 1024
+FETCH_SIZE = 1000
+
+
+class QueryService(object):
+    """A pool of read-only connections to a database that the report queries can be run on from many threads
+
+    With wal=True the database is switched to WAL mode when the service is
+    opened, so readers neither wait for nor block apply_changes() or reclean()
+    in another process. That changes the database file for good, so it is off
+    by default. Reports are cached per database generation:
+    each connection watches PRAGMA data_version, and any commit from elsewhere
+    starts a new generation, which empties the cache.
+
+    shared_cache=True opens the connections with SQLite's shared cache. It saves
+    memory, but the connections then share table locks, so it is off by default.
+    """
+
+    def __init__(self, db_path, size=POOL_SIZE, cache_size=CACHE_SIZE, mmap_size=MMAP_SIZE, wal=False,
+                 shared_cache=False):
+        if not os.path.exists(db_path):
+            raise IOError('No such database: %s' % db_path)
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self.mmap_size = mmap_size
+        self.shared_cache = shared_cache
+        if wal:
+            con = sql.connect(db_path)
+            try:
+                con.execute('PRAGMA journal_mode = WAL')
+            finally:
+                con.close()
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.cache = {}
+        self.data_versions = {}  # connection -> the data_version it saw last
+        self.pool = queue.LifoQueue()
+        self.connections = [self.connect() for _ in range(size)]
+        for con in self.connections:
+            self.data_versions[con] = con.execute('PRAGMA data_version').fetchone()[0]
+            self.pool.put(con)
+        self.aggregates = self.run(has_aggregates)
+        self.executor = None
+
+    def connect(self):
+        """Open a read-only connection with the service's pragmas, usable from any thread"""
+
+        uri = 'file:%s?mode=ro' % os.path.abspath(self.db_path).replace('?', '%3f').replace('#', '%23')
+        if self.shared_cache:
+            uri += '&cache=shared'
+        con = sql.connect(uri, uri=True, check_same_thread=False)
+        con.execute('PRAGMA query_only = ON')
+        con.execute('PRAGMA cache_size = %d' % self.cache_size)
+        con.execute('PRAGMA mmap_size = %d' % self.mmap_size)
+        return con
+
+    @contextlib.contextmanager
+    def connection(self):
+        """Take a connection from the pool for the duration of a with block, waiting for one if all are in use"""
+
+        con = self.pool.get()
+        try:
+            self.check_generation(con)
+            yield con
+        finally:
+            self.pool.put(con)
+
+    def check_generation(self, con):
+        """Start a new generation, dropping the cached reports, if the database changed since con last looked"""
+
+        version = con.execute('PRAGMA data_version').fetchone()[0]
+        with self.lock:
+            if self.data_versions[con] != version:
+                self.data_versions[con] = version
+                self.generation += 1
+                self.cache.clear()
+                self.aggregates = None
+
+    def run(self, func, *args):
+        """Call func(con, *args) with a pooled connection, return what it returns"""
+
+        with self.connection() as con:
+            return func(con, *args)
+
+    def report(self, name, aggregates=None):
+        """Return the rows of a named report query, from the cache if the database has not changed since
+
+        Like aggregates.report(), the summary tables are used if the database
+        has them, unless aggregates=False.
+        """
+
+        queries = dict(NAMED_QUERIES)
+        if name not in queries:
+            raise KeyError('Unknown query: %s' % name)
+        with self.connection() as con:
+            with self.lock:
+                if self.aggregates is None:
+                    self.aggregates = has_aggregates(con)
+                if aggregates is None:
+                    aggregates = self.aggregates
+                aggregates = aggregates and name in AGGREGATE_QUERIES
+                key = (name, aggregates, self.generation)
+                rows = self.cache.get(key)
+            if rows is not None:
+                return rows
+            rows = con.execute(AGGREGATE_QUERIES[name] if aggregates else queries[name]).fetchall()
+        with self.lock:
+            # Only cache rows of the current generation, in case the database changed meanwhile
+            if key[2] == self.generation:
+                self.cache[key] = rows
+        return rows
+
+    def reports(self, names=None, aggregates=None):
+        """Run named report queries concurrently on the pool, return [(name, rows)] in the order of names"""
+
+        if names is None:
+            names = [name for name, query in NAMED_QUERIES]
+        futures = [(name, self.submit(self.report, name, aggregates)) for name in names]
+        return [(name, future.result()) for name, future in futures]
+
+    def submit(self, func, *args):
+        """Run func(*args) on the service's thread pool, return a concurrent.futures.Future"""
+
+        with self.lock:
+            if self.executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+                self.executor = ThreadPoolExecutor(len(self.connections))
+        return self.executor.submit(func, *args)
+
+    async def report_async(self, name, aggregates=None):
+        """Return the rows of a named report query without blocking the asyncio event loop"""
+
+        import asyncio
+
+        return await asyncio.wrap_future(self.submit(self.report, name, aggregates))
+
+    def stream(self, query, params=(), fetch_size=FETCH_SIZE):
+        """Yield the rows of any query fetch_size at a time, instead of holding all of them in memory
+
+        The connection stays out of the pool until the rows are exhausted or the
+        generator is closed.
+        """
+
+        with self.connection() as con:
+            cur = con.execute(query, params)
+            try:
+                while True:
+                    rows = cur.fetchmany(fetch_size)
+                    if not rows:
+                        break
+                    for row in rows:
+                        yield row
+            finally:
+                cur.close()
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+        for con in self.connections:
+            con.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
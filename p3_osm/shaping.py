@@ -0,0 +1,73 @@
+"""Shaping of OSM elements into the rows of the csv files and database tables."""
+
+from .rules import PROBLEMCHARS, tag_rules
+
+# Make sure the fields order in the csvs matches the column order in the sql table schema
+NODE_FIELDS = ['id', 'lat', 'lon', 'user', 'uid', 'version', 'changeset', 'timestamp']
+NODE_TAGS_FIELDS = ['id', 'key', 'value', 'type']
+WAY_FIELDS = ['id', 'user', 'uid', 'version', 'changeset', 'timestamp']
+WAY_TAGS_FIELDS = ['id', 'key', 'value', 'type']
+WAY_NODES_FIELDS = ['id', 'node_id', 'position']
+RELATION_FIELDS = ['id', 'user', 'uid', 'version', 'changeset', 'timestamp']
+RELATION_TAGS_FIELDS = ['id', 'key', 'value', 'type']
+RELATION_MEMBERS_FIELDS = ['id', 'member_type', 'member_id', 'role', 'position']
+WAY_GEOMETRY_FIELDS = ['id', 'min_lat', 'min_lon', 'max_lat', 'max_lon', 'geometry']
+
+
+def shape_tag(k, v, stats=None):
+    """Clean a tag's value with the rules for its key and split the key, return (key, value, type)
+
+    key and type are None for problematic keys. The rules are those of
+    rules.tag_rules; register a normalizer there to clean another key.
+    """
+
+    return tag_rules.shape(k, v, stats)
+
+
+def shape_element(element, node_attr_fields=NODE_FIELDS, way_attr_fields=WAY_FIELDS,
+                  problem_chars=PROBLEMCHARS, default_tag_type='regular',
+                  relation_attr_fields=RELATION_FIELDS, stats=None):
+    """Clean and shape node, way or relation XML element to Python dict"""
+
+    node_attribs = {}
+    way_attribs = {}
+    way_nodes = []
+    relation_attribs = {}
+    relation_members = []
+    tags = []  # Handle secondary tags the same way for both node and way elements
+
+    for tag in element.iter("tag"):
+        key, value, tag_type = shape_tag(tag.get("k"), tag.get("v"), stats)
+        d = {"id": element.get("id"),
+             "value": value}
+        if key is not None:
+            d["type"] = tag_type
+            d["key"] = key
+        tags.append(d)
+
+    if element.tag == 'node':
+        for attr in node_attr_fields:
+            node_attribs[attr] = element.get(attr)
+        return {'node': node_attribs, 'node_tags': tags}
+    elif element.tag == 'way':
+        for attr in way_attr_fields:
+            way_attribs[attr] = element.get(attr)
+        pos = 0
+        for nd in element.iter("nd"):
+            d = {"id": element.get("id"),
+                 "node_id": nd.get("ref"),
+                 "position": pos}
+            way_nodes.append(d)
+            pos += 1
+        return {'way': way_attribs, 'way_nodes': way_nodes, 'way_tags': tags}
+    elif element.tag == 'relation':
+        for attr in relation_attr_fields:
+            relation_attribs[attr] = element.get(attr)
+        for pos, member in enumerate(element.iter("member")):
+            d = {"id": element.get("id"),
+                 "member_type": member.get("type"),
+                 "member_id": member.get("ref"),
+                 "role": member.get("role"),
+                 "position": pos}
+            relation_members.append(d)
+        return {'relation': relation_attribs, 'relation_members': relation_members, 'relation_tags': tags}
@@ -0,0 +1,454 @@
+"""Partitioned export and loading by geographic tile or id range, and the named queries fanned out over the shards."""
+
+import csv
+import json
+import math
+import os
+import sqlite3 as sql
+
+from .aggregates import AGGREGATE_QUERIES, has_aggregates
+from .database import LOAD_TABLES, create_database, finish_database, insert_sql
+from .export import CSV_PATHS, CSV_TABLES, open_csv
+from .geometry import node_locations, scanned_geometry
+from .scanner import ScannedRows, scan_osm
+from .shaping import WAY_GEOMETRY_FIELDS
+from .spatial import nodes_in_bbox
+
+TILE_SIZE = 1.0  # in degrees
+ID_RANGE = 10000000
+# Shard of the ways and relations of the tile scheme that have no node in the extract
+UNLOCATED = 'tile_none'
+MANIFEST = 'shards.json'
+SHARD_WORKERS = 8
+
+# Table -> the element type whose shard its rows go to
+OWNERS = {'nodes': 'node', 'nodes_tags': 'node',
+          'ways': 'way', 'ways_nodes': 'way', 'ways_tags': 'way',
+          'relations': 'relation', 'relations_members': 'relation', 'relations_tags': 'relation'}
+
+
+class Partitioner(object):
+    """Assigns shaped rows to shards, by the tile their location is in or by id range
+
+    In the tile scheme a node goes to the tile of its lat/lon, a way to that of
+    its first node in the extract, and a relation to that of its first node or
+    way member in the extract; elements with none go to UNLOCATED. Tags, way
+    nodes and members always go with their element, so every shard answers
+    the per-element parts of the report queries on its own.
+    """
+
+    def __init__(self, scheme='tile', size=None, node_cache=None):
+        if scheme not in ('tile', 'id'):
+            raise ValueError('Unknown shard scheme: %s' % scheme)
+        self.scheme = scheme
+        if scheme == 'tile':
+            self.size = float(size or TILE_SIZE)
+        else:
+            self.size = int(size or ID_RANGE)
+        self.locations = node_locations(node_cache)
+        # The location of each way's first node, which puts the relations of the tile scheme in a tile. It is
+        # kept in a node location store rather than a dict, so it grows by 16 bytes a way (or in a file next
+        # to node_cache), not by a dict entry and shard name
+        self.way_locations = node_locations(node_cache + '.ways' if node_cache else None)
+
+    def tile(self, location):
+        if location is None:
+            return None
+        lat, lon = location
+        return 'tile_%d_%d' % (math.floor(lat / self.size), math.floor(lon / self.size))
+
+    def bounds(self, shard):
+        """Return the manifest entry of what a shard can hold: its tile and bbox, or its [first, last) ids"""
+
+        if shard == UNLOCATED:
+            return {}
+        if self.scheme == 'tile':
+            row, col = (int(part) for part in shard.split('_')[1:])
+            return {'tile': [row, col],
+                    'bbox': [row * self.size, col * self.size, (row + 1) * self.size, (col + 1) * self.size]}
+        first = int(shard.split('_')[1]) * self.size
+        return {'ids': [first, first + self.size]}
+
+    def split(self, rows, geometry=False):
+        """Return {shard: {table: rows}} for the rows of a ScannedRows, with the ways_geometry rows if geometry=True"""
+
+        tables = rows.tables
+        tile = self.scheme == 'tile'
+        if tile or geometry:
+            for row in tables['nodes']:
+                self.locations.set(int(row[0]), float(row[1]), float(row[2]))
+        owners = {'node': {}, 'way': {}, 'relation': {}}
+        if tile:
+            for row in tables['nodes']:
+                owners['node'][int(row[0])] = self.tile((float(row[1]), float(row[2])))
+            first_nodes = {}
+            for row in tables['ways_nodes']:
+                first_nodes.setdefault(int(row[0]), int(row[1]))
+            for row in tables['ways']:
+                way_id = int(row[0])
+                location = self.locations.get(first_nodes[way_id]) if way_id in first_nodes else None
+                if location is not None:
+                    self.way_locations.set(way_id, location[0], location[1])
+                owners['way'][way_id] = self.tile(location) or UNLOCATED
+            relations = owners['relation']
+            for row in tables['relations_members']:
+                rel_id = int(row[0])
+                if relations.get(rel_id, UNLOCATED) != UNLOCATED:
+                    continue
+                if row[1] == 'node':
+                    relations[rel_id] = self.tile(self.locations.get(int(row[2]))) or UNLOCATED
+                elif row[1] == 'way':
+                    relations[rel_id] = self.tile(self.way_locations.get(int(row[2]))) or UNLOCATED
+            for row in tables['relations']:
+                relations.setdefault(int(row[0]), UNLOCATED)
+        else:
+            for kind, table in (('node', 'nodes'), ('way', 'ways'), ('relation', 'relations')):
+                for row in tables[table]:
+                    owners[kind][int(row[0])] = 'id_%d' % (int(row[0]) // self.size)
+
+        shards = {}
+        for table, kind in OWNERS.items():
+            shard_of = owners[kind]
+            for row in tables[table]:
+                shards.setdefault(shard_of[int(row[0])], {}).setdefault(table, []).append(row)
+        if geometry:
+            for row in scanned_geometry((), tables['ways_nodes'], self.locations):
+                shards[owners['way'][row[0]]].setdefault('ways_geometry', []).append(row)
+        return shards
+
+    def close(self):
+        self.locations.close()
+        self.way_locations.close()
+
+
+class CsvShards(object):
+    """The csv files of process_map() for each shard, in a directory of its own, opened on first use"""
+
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        self.files = {}
+        self.writers = {}
+
+    def path(self, shard):
+        return shard
+
+    def write(self, shard, tables):
+        if shard not in self.writers:
+            os.makedirs(os.path.join(self.out_dir, shard), exist_ok=True)
+            self.files[shard] = [open_csv(os.path.join(self.out_dir, shard, path)) for path in CSV_PATHS]
+            self.writers[shard] = [csv.writer(f) for f in self.files[shard]]
+        for table, writer in zip(CSV_TABLES, self.writers[shard]):
+            writer.writerows(tables.get(table, ()))
+
+    def commit(self):
+        pass
+
+    def close(self):
+        for files in self.files.values():
+            for f in files:
+                f.close()
+
+
+class DatabaseShards(object):
+    """A database built like load_sqlite() does for each shard, created on first use"""
+
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        self.connections = {}
+        self.statements = [(table, insert_sql(table, fields)) for part, table, fields in LOAD_TABLES]
+        self.statements.append(('ways_geometry', insert_sql('ways_geometry', WAY_GEOMETRY_FIELDS)))
+
+    def path(self, shard):
+        return shard + '.db'
+
+    def write(self, shard, tables):
+        if shard not in self.connections:
+            self.connections[shard] = create_database(os.path.join(self.out_dir, self.path(shard)))
+        con = self.connections[shard]
+        for table, statement in self.statements:
+            if table in tables:
+                con.executemany(statement, tables[table])
+
+    def commit(self):
+        for con in self.connections.values():
+            con.commit()
+
+    def finish(self, spatial=True, aggregates=True, reconcile=True):
+        for shard, con in sorted(self.connections.items()):
+            finish_database(con, spatial, aggregates, reconcile)
+
+    def close(self):
+        for con in self.connections.values():
+            con.close()
+
+
+def partition(osm_file, out_dir, sink, partitioner, tags=('node', 'way', 'relation'), shards=None, geometry=False):
+    """Scan an extract a block at a time and write the rows of each shard to sink, then the manifest
+
+    Only the shards named in shards are written, if given, so that several
+    machines can each build a part of the same partitioning. Returns the manifest.
+    """
+
+    os.makedirs(out_dir, exist_ok=True)
+    rows = ScannedRows()
+    elements = {}
+    for count in scan_osm(osm_file, rows, tags):
+        for shard, tables in partitioner.split(rows, geometry).items():
+            if shards is not None and shard not in shards:
+                continue
+            sink.write(shard, tables)
+            elements[shard] = elements.get(shard, 0) + sum(
+                len(tables.get(table, ())) for table in ('nodes', 'ways', 'relations'))
+        sink.commit()
+        rows.clear()
+
+    manifest = {'scheme': partitioner.scheme, 'size': partitioner.size,
+                'format': 'csv' if isinstance(sink, CsvShards) else 'sqlite', 'shards': {}}
+    for shard, n in sorted(elements.items()):
+        manifest['shards'][shard] = dict(partitioner.bounds(shard), path=sink.path(shard), elements=n)
+    with open(os.path.join(out_dir, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def export_shards(file_in, out_dir, scheme='tile', size=None, shards=None, node_cache=None):
+    """Shape the nodes and ways of an extract into the csv files of process_map(), in a directory per shard
+
+    scheme is 'tile' (size in degrees, TILE_SIZE by default) or 'id' (size ids
+    per shard, ID_RANGE by default); see Partitioner. Returns the manifest that
+    is also written to MANIFEST in out_dir.
+    """
+
+    partitioner = Partitioner(scheme, size, node_cache)
+    sink = CsvShards(out_dir)
+    try:
+        return partition(file_in, out_dir, sink, partitioner, ('node', 'way'), shards)
+    finally:
+        sink.close()
+        partitioner.close()
+
+
+def load_shards(osm_file, out_dir, scheme='tile', size=None, shards=None, node_cache=None, geometry=False,
+                spatial=True, aggregates=True, reconcile=True):
+    """Load an extract into a sqlite database per shard, each built like load_sqlite() builds one
+
+    See export_shards() for scheme and size. Each database is a complete one
+    for its part of the extract, so the single-database functions work on it
+    as well; ShardSet queries all of them together.
+    """
+
+    partitioner = Partitioner(scheme, size, node_cache)
+    sink = DatabaseShards(out_dir)
+    try:
+        manifest = partition(osm_file, out_dir, sink, partitioner, shards=shards, geometry=geometry)
+        sink.finish(spatial, aggregates, reconcile)
+    finally:
+        sink.close()
+        partitioner.close()
+    return manifest
+
+
+# The report queries as run on each shard, from its summary tables if it has them or else from the
+# base tables, and how the shards' rows are merged: counts add up, top-N lists are ranked on the summed
+# counts of all values (so the shards cannot cut them short), and the street and name queries compare
+# sets of distinct values, as the match of a value can be in another shard.
+TOP_N = 10
+SHARD_N_UNIQUE_USERS = 'SELECT uid FROM nodes UNION SELECT uid FROM ways;'
+SHARD_TOP_VALUES = '''
+                   SELECT value, COUNT(*)
+                   FROM nodes_tags
+                   WHERE key = '{key}'
+                   GROUP BY value;
+                   '''
+SHARD_CATEGORY_VALUES = '''
+                        SELECT nodes_tags.value, COUNT(*)
+                        FROM nodes_tags
+                        WHERE nodes_tags.key = '{key}'
+                            AND EXISTS (SELECT 1
+                                FROM nodes_tags i
+                                WHERE i.id = nodes_tags.id
+                                    AND i.value IN ({values}))
+                        GROUP BY nodes_tags.value;
+                        '''
+# The first values of the merged list are among the first of each shard
+SHARD_STREETS = "SELECT DISTINCT value FROM ways_tags WHERE key = 'street' ORDER BY value LIMIT %d;" % TOP_N
+SHARD_STREETS_AND_NAMES = '''
+                          SELECT DISTINCT key, value
+                          FROM ways_tags
+                          WHERE key IN ('street', 'name') {where};
+                          '''
+
+SHARD_AGGREGATE_USERS = 'SELECT uid FROM user_counts;'
+SHARD_TAG_COUNTS = "SELECT value, num FROM tag_counts WHERE tags = 'nodes_tags' AND key = '{key}';"
+SHARD_CATEGORY_COUNTS = "SELECT value, num FROM category_counts WHERE category = '{category}';"
+SHARD_AGGREGATE_STREETS = '''
+                          SELECT value
+                          FROM tag_counts
+                          WHERE tags = 'ways_tags' AND key = 'street'
+                          ORDER BY value
+                          LIMIT %d;
+                          ''' % TOP_N
+SHARD_AGGREGATE_STREETS_AND_NAMES = '''
+                                    SELECT key, value
+                                    FROM tag_counts
+                                    WHERE tags = 'ways_tags' AND key IN ('street', 'name') {where};
+                                    '''
+
+
+def merge_sum(results):
+    return [(sum(rows[0][0] for rows in results),)]
+
+
+def merge_distinct_count(results):
+    return [(len(set(row[0] for rows in results for row in rows if row[0] is not None)),)]
+
+
+def merge_top(results):
+    counts = {}
+    for rows in results:
+        for value, num in rows:
+            counts[value] = counts.get(value, 0) + num
+    return sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:TOP_N]
+
+
+def merge_sorted(results):
+    return [(value,) for value in sorted(set(row[0] for rows in results for row in rows))[:TOP_N]]
+
+
+def values_of(results, key):
+    return set(value for rows in results for k, value in rows if k == key)
+
+
+def merge_names_dupl(results):
+    duplicated = values_of(results, 'street') & values_of(results, 'name')
+    return [('street', 'name', value) for value in sorted(duplicated)[:TOP_N]]
+
+
+def merge_names_only(results):
+    return [(value,) for value in sorted(values_of(results, 'name') - values_of(results, 'street'))[:TOP_N]]
+
+
+def merge_names_only_count(results):
+    return [(len(values_of(results, 'name') - values_of(results, 'street')),)]
+
+
+# Only values with 'str' in them can match a name that has it
+STR_ONLY = "AND instr(value, 'str') > 0"
+
+# name -> (query on the base tables, query on the summary tables, merge)
+SHARD_QUERIES = {
+    'N_NODES': ('SELECT COUNT(*) FROM nodes;', AGGREGATE_QUERIES['N_NODES'], merge_sum),
+    'N_WAYS': ('SELECT COUNT(*) FROM ways;', AGGREGATE_QUERIES['N_WAYS'], merge_sum),
+    'N_UNIQUE_USERS': (SHARD_N_UNIQUE_USERS, SHARD_AGGREGATE_USERS, merge_distinct_count),
+    'TOP_10_AMENITIES': (SHARD_TOP_VALUES.format(key='amenity'), SHARD_TAG_COUNTS.format(key='amenity'), merge_top),
+    'CUISINES': (SHARD_CATEGORY_VALUES.format(key='cuisine', values="'restaurant', 'fast_food', 'cafe'"),
+                 SHARD_CATEGORY_COUNTS.format(category='cuisine'), merge_top),
+    'LEISURE': (SHARD_TOP_VALUES.format(key='leisure'), SHARD_TAG_COUNTS.format(key='leisure'), merge_top),
+    'SPORTS': (SHARD_CATEGORY_VALUES.format(key='sport', values="'pitch'"),
+               SHARD_CATEGORY_COUNTS.format(category='sport'), merge_top),
+    'STREET_STR': (SHARD_STREETS, SHARD_AGGREGATE_STREETS, merge_sorted),
+    'NAMES_DUPL': (SHARD_STREETS_AND_NAMES.format(where=''), SHARD_AGGREGATE_STREETS_AND_NAMES.format(where=''),
+                   merge_names_dupl),
+    'STR_IN_NAMES_ONLY': (SHARD_STREETS_AND_NAMES.format(where=STR_ONLY),
+                          SHARD_AGGREGATE_STREETS_AND_NAMES.format(where=STR_ONLY), merge_names_only),
+    'STR_IN_NAMES_ONLY_COUNT': (SHARD_STREETS_AND_NAMES.format(where=STR_ONLY),
+                                SHARD_AGGREGATE_STREETS_AND_NAMES.format(where=STR_ONLY), merge_names_only_count),
+}
+
+
+def fetch_partials(con, names, aggregates=True):
+    """Run the per-shard queries of the named reports, on the summary tables if the shard has them"""
+
+    column = 1 if aggregates and has_aggregates(con) else 0
+    return [con.execute(SHARD_QUERIES[name][column]).fetchall() for name in names]
+
+
+class ShardSet(object):
+    """The databases written by load_shards() into one or more directories, queried as one
+
+    Each directory has its own manifest, so the shards that different machines
+    loaded can be put side by side and opened together, as long as they were
+    cut with the same scheme and size. Queries run on the shards concurrently,
+    on a connection per shard and thread.
+    """
+
+    def __init__(self, *dirs, workers=SHARD_WORKERS):
+        self.workers = workers
+        self.scheme = self.size = None
+        self.shards = {}  # name -> (path, manifest entry)
+        for out_dir in dirs:
+            with open(os.path.join(out_dir, MANIFEST)) as f:
+                manifest = json.load(f)
+            if manifest['format'] != 'sqlite':
+                raise ValueError('%s holds csv shards, which cannot be queried' % out_dir)
+            if self.scheme is not None and (manifest['scheme'], manifest['size']) != (self.scheme, self.size):
+                raise ValueError('%s is partitioned differently from %s' % (out_dir, dirs[0]))
+            self.scheme, self.size = manifest['scheme'], manifest['size']
+            for name, entry in manifest['shards'].items():
+                if name in self.shards:
+                    raise ValueError('Shard %s is in more than one directory' % name)
+                self.shards[name] = (os.path.join(out_dir, entry['path']), entry)
+
+    def select(self, box=None):
+        """Return the paths of the shards that can hold nodes in a bbox(), or of all shards if box is None
+
+        Only tiles are skipped: a way can reach out of the tile it was put in,
+        so this only narrows down queries of nodes.
+        """
+
+        paths = []
+        for name, (path, entry) in sorted(self.shards.items()):
+            if box is not None and self.scheme == 'tile':
+                # Tile numbers are worked out like Partitioner.tile() does, so nodes on an edge are not missed
+                if 'tile' not in entry:
+                    continue
+                row, col = entry['tile']
+                if not (math.floor(box['min_lat'] / self.size) <= row <= math.floor(box['max_lat'] / self.size) and
+                        math.floor(box['min_lon'] / self.size) <= col <= math.floor(box['max_lon'] / self.size)):
+                    continue
+            paths.append(path)
+        return paths
+
+    def fan_out(self, func, *args, box=None):
+        """Call func(con, *args) on each shard (that can hold nodes in box) concurrently, return the results in order"""
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        def run(path):
+            con = sql.connect(path)
+            try:
+                return func(con, *args)
+            finally:
+                con.close()
+
+        paths = self.select(box)
+        if not paths:
+            return []
+        with ThreadPoolExecutor(max(1, min(len(paths), self.workers))) as executor:
+            return list(executor.map(run, paths))
+
+    def reports(self, names=None, aggregates=True):
+        """Run named report queries over all shards, return [(name, rows)] with the rows merged as SHARD_QUERIES says
+
+        Each shard answers from its summary tables unless it has none or
+        aggregates=False.
+        """
+
+        if names is None:
+            from .queries import NAMED_QUERIES
+            names = [name for name, query in NAMED_QUERIES]
+        unknown = set(names) - set(SHARD_QUERIES)
+        if unknown:
+            raise KeyError('Unknown queries: %s' % ', '.join(sorted(unknown)))
+        results = self.fan_out(fetch_partials, names, aggregates)
+        return [(name, SHARD_QUERIES[name][2]([shard[i] for shard in results])) for i, name in enumerate(names)]
+
+    def report(self, name, aggregates=True):
+        """Run a named report query over all shards, return the merged rows"""
+
+        return self.reports([name], aggregates)[0][1]
+
+    def nodes_in_bbox(self, box, key=None, value=None):
+        """Like spatial.nodes_in_bbox(), over the shards that can hold nodes in the box only"""
+
+        return [row for rows in self.fan_out(nodes_in_bbox, box, key, value, box=box) for row in rows]
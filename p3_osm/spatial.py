@@ -0,0 +1,153 @@
+"""Spatial queries over the R*Tree indexes."""
+
+import math
+
+EARTH_RADIUS = 6371008.8  # mean radius, in metres
+
+# The R*Tree stores 32 bit floats rounded outwards, so it only narrows the search
+# down, and the exact coordinates in nodes decide
+NODES_IN_BBOX = '''
+                SELECT nodes.id, nodes.lat, nodes.lon
+                FROM nodes_rtree
+                    JOIN nodes ON nodes.id = nodes_rtree.id
+                WHERE nodes_rtree.max_lat >= :min_lat AND nodes_rtree.min_lat <= :max_lat
+                    AND nodes_rtree.max_lon >= :min_lon AND nodes_rtree.min_lon <= :max_lon
+                    AND nodes.lat BETWEEN :min_lat AND :max_lat
+                    AND nodes.lon BETWEEN :min_lon AND :max_lon
+                '''
+NODE_HAS_TAG = '''
+               AND EXISTS (SELECT 1
+                   FROM nodes_tags
+                   WHERE nodes_tags.id = nodes.id
+                       AND nodes_tags.key = :key
+                       AND (:value IS NULL OR nodes_tags.value = :value))
+               '''
+WAYS_IN_BBOX = '''
+               SELECT ways_rtree.id
+               FROM ways_rtree
+                   JOIN ways_geometry ON ways_geometry.id = ways_rtree.id
+               WHERE ways_rtree.max_lat >= :min_lat AND ways_rtree.min_lat <= :max_lat
+                   AND ways_rtree.max_lon >= :min_lon AND ways_rtree.min_lon <= :max_lon
+                   AND ways_geometry.max_lat >= :min_lat AND ways_geometry.min_lat <= :max_lat
+                   AND ways_geometry.max_lon >= :min_lon AND ways_geometry.min_lon <= :max_lon
+               '''
+
+# Location-scoped versions of the CUISINES and SPORTS reports, run with a bbox dict
+CUISINES_IN_BBOX = '''
+                   SELECT nodes_tags.value, COUNT(*) as num
+                   FROM nodes_rtree
+                       JOIN nodes ON nodes.id = nodes_rtree.id
+                       JOIN nodes_tags ON nodes_tags.id = nodes.id
+                   WHERE nodes_rtree.max_lat >= :min_lat AND nodes_rtree.min_lat <= :max_lat
+                       AND nodes_rtree.max_lon >= :min_lon AND nodes_rtree.min_lon <= :max_lon
+                       AND nodes.lat BETWEEN :min_lat AND :max_lat
+                       AND nodes.lon BETWEEN :min_lon AND :max_lon
+                       AND nodes_tags.key = 'cuisine'
+                       AND EXISTS (SELECT 1
+                           FROM nodes_tags i
+                           WHERE i.id = nodes_tags.id
+                               AND i.value IN ('restaurant', 'fast_food', 'cafe'))
+                   GROUP BY nodes_tags.value
+                   ORDER BY num DESC
+                   LIMIT 10;
+                   '''
+SPORTS_IN_BBOX = '''
+                 SELECT nodes_tags.value, COUNT(*) as num
+                 FROM nodes_rtree
+                     JOIN nodes ON nodes.id = nodes_rtree.id
+                     JOIN nodes_tags ON nodes_tags.id = nodes.id
+                 WHERE nodes_rtree.max_lat >= :min_lat AND nodes_rtree.min_lat <= :max_lat
+                     AND nodes_rtree.max_lon >= :min_lon AND nodes_rtree.min_lon <= :max_lon
+                     AND nodes.lat BETWEEN :min_lat AND :max_lat
+                     AND nodes.lon BETWEEN :min_lon AND :max_lon
+                     AND nodes_tags.key = 'sport'
+                     AND EXISTS (SELECT 1
+                         FROM nodes_tags i
+                         WHERE i.id = nodes_tags.id
+                             AND i.value = 'pitch')
+                 GROUP BY nodes_tags.value
+                 ORDER BY num DESC
+                 LIMIT 10;
+                 '''
+
+
+def bbox(min_lat, min_lon, max_lat, max_lon):
+    """Return the query parameters for a bounding box"""
+
+    return {'min_lat': min_lat, 'min_lon': min_lon, 'max_lat': max_lat, 'max_lon': max_lon}
+
+
+def bbox_around(lat, lon, radius):
+    """Return the bounding box around a point that contains the circle of radius metres"""
+
+    angle = radius / EARTH_RADIUS
+    dlat = math.degrees(angle)
+    if abs(lat) + dlat >= 90.0:
+        # The circle takes in a pole, and with it every longitude
+        return bbox(max(lat - dlat, -90.0), -180.0, min(lat + dlat, 90.0), 180.0)
+    # The widest point of the circle lies poleward of lat, which takes more than dlat / cos(lat)
+    dlon = math.degrees(math.asin(math.sin(angle) / math.cos(math.radians(lat))))
+    return bbox(lat - dlat, max(lon - dlon, -180.0), lat + dlat, min(lon + dlon, 180.0))
+
+
+def distance(lat1, lon1, lat2, lon2):
+    """Great-circle (haversine) distance between two points, in metres"""
+
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2 +
+         math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+
+def nodes_in_bbox(con, box, key=None, value=None):
+    """Return (id, lat, lon) of the nodes in a bbox(), optionally only those with a key (and value) tag"""
+
+    query = NODES_IN_BBOX
+    params = dict(box)
+    if key is not None:
+        query += NODE_HAS_TAG
+        params.update(key=key, value=value)
+    return con.execute(query, params).fetchall()
+
+
+def nodes_within(con, lat, lon, radius, key=None, value=None):
+    """Return (distance, id, lat, lon) of the nodes within radius metres of a point, nearest first"""
+
+    found = []
+    for node_id, node_lat, node_lon in nodes_in_bbox(con, bbox_around(lat, lon, radius), key, value):
+        d = distance(lat, lon, node_lat, node_lon)
+        if d <= radius:
+            found.append((d, node_id, node_lat, node_lon))
+    found.sort()
+    return found
+
+
+def nearest_nodes(con, lat, lon, k=10, key=None, value=None, radius=250.0):
+    """Return (distance, id, lat, lon) of the k nodes nearest to a point, searching in growing circles"""
+
+    while True:
+        found = nodes_within(con, lat, lon, radius, key, value)
+        if len(found) >= k or radius > math.pi * EARTH_RADIUS:
+            return found[:k]
+        radius *= 4
+
+
+def ways_in_bbox(con, box):
+    """Return the ids of the ways whose bounding box overlaps a bbox() (needs a load with way geometry)"""
+
+    return [way_id for way_id, in con.execute(WAYS_IN_BBOX, box)]
+
+
+def update_spatial_index(con, node_ids, way_ids):
+    """Bring the R*Tree entries of the given nodes and ways in line with their rows, if the database has them"""
+
+    if not con.execute("SELECT 1 FROM sqlite_master WHERE name = 'nodes_rtree'").fetchone():
+        return
+    for table, ids, select in (('nodes_rtree', node_ids, 'SELECT id, lat, lat, lon, lon FROM nodes'),
+                               ('ways_rtree', way_ids,
+                                'SELECT id, min_lat, max_lat, min_lon, max_lon FROM ways_geometry')):
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            placeholders = ', '.join('?' * len(chunk))
+            con.execute('DELETE FROM %s WHERE id IN (%s)' % (table, placeholders), chunk)
+            con.execute('INSERT INTO %s %s WHERE id IN (%s)' % (table, select, placeholders), chunk)
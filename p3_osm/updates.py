@@ -0,0 +1,163 @@
+"""Applying osmChange diffs to a database built by load_sqlite()."""
+
+import itertools
+import sqlite3 as sql
+import xml.etree.ElementTree as ET
+
+from .aggregates import has_aggregates, update_aggregates
+from .database import BATCH_SIZE, LOAD_TABLES, insert_sql, shaped_rows
+from .geometry import geometry_row
+from .reader import open_osm
+from .reconcile import has_street_candidates, reconcile_streets
+from .shaping import WAY_GEOMETRY_FIELDS, shape_element
+from .spatial import update_spatial_index
+
+CHANGE_ACTIONS = ('create', 'modify', 'delete')
+
+# Element type, its table, and the tables holding its child rows
+CHANGE_TABLES = (('node', 'nodes', ('nodes_tags',)),
+                 ('way', 'ways', ('ways_tags', 'ways_nodes', 'ways_geometry')),
+                 ('relation', 'relations', ('relations_tags', 'relations_members')))
+
+
+def update_way_geometry(con, way_ids):
+    """Recompute ways_geometry for the given ways from the node locations in the database"""
+
+    for i in range(0, len(way_ids), 500):
+        chunk = way_ids[i:i + 500]
+        placeholders = ', '.join('?' * len(chunk))
+        con.execute('DELETE FROM ways_geometry WHERE id IN (%s)' % placeholders, chunk)
+        cur = con.execute('''SELECT ways_nodes.id, nodes.lat, nodes.lon
+                             FROM ways_nodes JOIN nodes ON nodes.id = ways_nodes.node_id
+                             WHERE ways_nodes.id IN (%s)
+                             ORDER BY ways_nodes.id, ways_nodes.position''' % placeholders, chunk)
+        rows = [geometry_row(way_id, [(lat, lon) for _, lat, lon in group])
+                for way_id, group in itertools.groupby(cur, lambda row: row[0])]
+        con.executemany(insert_sql('ways_geometry', WAY_GEOMETRY_FIELDS), rows)
+
+
+def get_changes(osc_file, tags=('node', 'way', 'relation')):
+    """Yield (action, element) for each element of the right type in an osmChange file"""
+
+    f = osc_file if hasattr(osc_file, 'read') else open_osm(osc_file)
+    try:
+        context = ET.iterparse(f, events=('start', 'end'))
+        _, root = next(context)
+        action = None
+        block = root
+        for event, elem in context:
+            if event == 'start':
+                if elem.tag in CHANGE_ACTIONS:
+                    action = elem.tag
+                    block = elem
+            elif elem.tag in tags:
+                yield action, elem
+                block.clear()
+    finally:
+        if f is not osc_file:
+            f.close()
+
+
+def current_versions(con, table, ids):
+    """Return {id: version} for the ids that are already in the table"""
+
+    versions = {}
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        cur = con.execute('SELECT id, version FROM %s WHERE id IN (%s)' % (table, ', '.join('?' * len(chunk))), chunk)
+        for el_id, version in cur:
+            versions[el_id] = int(version)
+    return versions
+
+
+def apply_change_batch(con, batch, counts, geometry=False):
+    """Apply a batch of {(element type, id): (version, action, shaped element)} changes in one transaction"""
+
+    part_fields = dict((table, (part, fields)) for part, table, fields in LOAD_TABLES)
+    aggregates = has_aggregates(con)
+    changed = {}
+    for kind, table, child_tables in CHANGE_TABLES:
+        changes = dict((el_id, change) for (el_kind, el_id), change in batch.items() if el_kind == kind)
+        versions = current_versions(con, table, list(changes))
+        fresh = []
+        for el_id, (version, action, el) in changes.items():
+            if versions.get(el_id, -1) >= version:
+                counts['skipped'] += 1
+            elif action == 'delete' and el_id not in versions:
+                counts['skipped'] += 1
+            else:
+                fresh.append((el_id, action, el))
+                counts[action] += 1
+
+        ids = [(el_id,) for el_id, action, el in fresh]
+        changed[kind] = [el_id for el_id, action, el in fresh]
+        if aggregates:
+            update_aggregates(con, kind, changed[kind], -1)
+        for child_table in child_tables:
+            con.executemany('DELETE FROM %s WHERE id = ?' % child_table, ids)
+        con.executemany('DELETE FROM %s WHERE id = ?' % table,
+                        [(el_id,) for el_id, action, el in fresh if action == 'delete'])
+
+        upserts = [el for el_id, action, el in fresh if action != 'delete']
+        for child in (table,) + child_tables:
+            if child not in part_fields:
+                continue
+            part, fields = part_fields[child]
+            rows = []
+            for el in upserts:
+                rows.extend(shaped_rows(el, part, fields))
+            verb = 'INSERT OR REPLACE' if child == table else 'INSERT'
+            con.executemany(insert_sql(child, fields, verb), rows)
+        if aggregates:
+            update_aggregates(con, kind, changed[kind], 1)
+
+    if geometry:
+        way_ids = set(changed['way'])
+        node_ids = changed['node']
+        for i in range(0, len(node_ids), 500):
+            chunk = node_ids[i:i + 500]
+            cur = con.execute('SELECT DISTINCT id FROM ways_nodes WHERE node_id IN (%s)' % ', '.join('?' * len(chunk)),
+                              chunk)
+            way_ids.update(way_id for way_id, in cur)
+        update_way_geometry(con, sorted(way_ids))
+        changed['way'] = sorted(way_ids)
+    update_spatial_index(con, changed['node'], changed['way'])
+    con.commit()
+
+
+def apply_changes(osc_file, db_path, batch_size=BATCH_SIZE, geometry=False):
+    """Apply the creates, modifies and deletes of an osmChange file to a database built by load_sqlite()
+
+    Changed nodes, ways and relations are cleaned and shaped with shape_element(),
+    then their rows and all of their tags, way nodes and members are replaced. A
+    change is only applied if its version is newer than the one in the database,
+    so a diff can safely be applied twice. Returns the number of created, modified,
+    deleted and skipped elements.
+
+    The geometry of changed ways is dropped; with geometry=True it is recomputed,
+    along with that of all ways whose nodes moved. The summary tables of
+    aggregates.py, if the database has them, are updated for the changed elements,
+    and street_candidates is rebuilt once the whole diff is in.
+    """
+
+    counts = {'create': 0, 'modify': 0, 'delete': 0, 'skipped': 0}
+    con = sql.connect(db_path)
+    try:
+        batch = {}
+        for action, element in get_changes(osc_file):
+            key = (element.tag, int(element.get('id')))
+            version = int(element.get('version'))
+            if key in batch and batch[key][0] > version:
+                counts['skipped'] += 1
+                continue
+            el = None if action == 'delete' else shape_element(element)
+            batch[key] = (version, action, el)
+            if len(batch) >= batch_size:
+                apply_change_batch(con, batch, counts, geometry)
+                batch.clear()
+        apply_change_batch(con, batch, counts, geometry)
+        if has_street_candidates(con):
+            reconcile_streets(con)
+    finally:
+        con.close()
+    return counts
@@ -0,0 +1,139 @@
+"""Validation of shaped elements against the column types of the sql schema."""
+
+import csv
+import re
+
+from .database import LOAD_TABLES, SCHEMA_PATH
+
+REJECTS_PATH = "rejects.csv"
+REJECTS_FIELDS = ['element', 'id', 'table', 'field', 'value', 'error']
+VALIDATE_BATCH_SIZE = 1000
+
+CREATE_TABLE = re.compile(r'CREATE TABLE\s+(\w+)\s*\((.*?)\);', re.S | re.I)
+COLUMN = re.compile(r'^\s*(\w+)\s+(INTEGER|REAL|TEXT)\b(.*)$', re.I)
+
+INTEGER = re.compile(r'-?\d+\Z')
+REAL = re.compile(r'-?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?\Z')
+
+
+def schema_columns(schema_path=SCHEMA_PATH):
+    """Return {table: {column: (type, not null)}} from the CREATE TABLE statements of a schema file"""
+
+    with open(schema_path) as schema_file:
+        schema = schema_file.read()
+    tables = {}
+    for table, body in CREATE_TABLE.findall(schema):
+        columns = tables[table] = {}
+        for line in body.split(','):
+            m = COLUMN.match(line)
+            if m:
+                columns[m.group(1)] = (m.group(2).upper(), 'NOT NULL' in m.group(3).upper())
+    return tables
+
+
+def check_integer(value):
+    return type(value) is int or (isinstance(value, str) and INTEGER.match(value) is not None)
+
+
+def check_real(value):
+    return type(value) in (int, float) or (isinstance(value, str) and REAL.match(value) is not None)
+
+
+def check_text(value):
+    return isinstance(value, str)
+
+
+TYPE_CHECKS = {'INTEGER': check_integer, 'REAL': check_real, 'TEXT': check_text}
+
+
+class Validator(object):
+    """Check shaped elements against the schema, and write the elements that do not fit to a rejects csv
+
+    The checks are compiled once from the field lists in LOAD_TABLES and the
+    column types in the schema file: each value has to match its column type,
+    and NOT NULL columns must not be empty. Missing tag keys and types are checked
+    as the empty strings they are written as, so e.g. a way tag whose key has
+    problem characters is rejected, as ways_tags.key is NOT NULL.
+
+    With sample=n only every nth element is checked; the others pass unchecked.
+    The rejects csv starts with a header of REJECTS_FIELDS.
+    """
+
+    def __init__(self, sample=1, rejects_path=REJECTS_PATH, schema_path=SCHEMA_PATH,
+                 batch_size=VALIDATE_BATCH_SIZE):
+        if sample < 1:
+            raise ValueError('sample has to be at least 1, not %r' % sample)
+        self.sample = sample
+        self.rejects_path = rejects_path
+        self.schema_path = schema_path
+        self.batch_size = batch_size
+        columns = schema_columns(schema_path)
+        # {part: (table, [(field, column type, type check, empty allowed)])}; the csv files cannot tell
+        # NULL from an empty string, so neither is allowed in a NOT NULL column
+        self.checks = {}
+        for part, table, fields in LOAD_TABLES:
+            checks = []
+            for field in fields:
+                col_type, not_null = columns[table][field]
+                checks.append((field, col_type, TYPE_CHECKS[col_type], not not_null))
+            self.checks[part] = (table, checks)
+        self.seen = 0
+        self.checked = 0
+        self.rejected = 0
+        self.rejects_file = None
+        self.writer = None
+
+    def open(self):
+        self.rejects_file = open(self.rejects_path, 'w', encoding='utf-8', newline='')
+        self.writer = csv.DictWriter(self.rejects_file, REJECTS_FIELDS)
+        self.writer.writeheader()
+        return self
+
+    def close(self):
+        if self.rejects_file is not None:
+            self.rejects_file.close()
+            self.rejects_file = self.writer = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def errors(self, tag, el):
+        """Return the violations of one shaped element, as rows for the rejects csv"""
+
+        errors = []
+        for part, rows in el.items():
+            table, checks = self.checks[part]
+            for row in (rows if isinstance(rows, list) else [rows]):
+                for field, col_type, check, empty_ok in checks:
+                    value = row.get(field, '')
+                    if value is None or value == '':
+                        if not empty_ok:
+                            errors.append({'table': table, 'field': field, 'value': value, 'error': 'missing'})
+                    elif not check(value):
+                        errors.append({'table': table, 'field': field, 'value': value, 'error': 'not ' + col_type})
+        if errors:
+            el_id = el[tag].get('id') if tag in el else None
+            for error in errors:
+                error.update(element=tag, id=el_id)
+        return errors
+
+    def filter(self, batch):
+        """Return the (tag, shaped element) pairs of a batch that pass, writing the violations of the others"""
+
+        passed = []
+        for tag, el in batch:
+            self.seen += 1
+            if (self.seen - 1) % self.sample:
+                passed.append((tag, el))
+                continue
+            self.checked += 1
+            errors = self.errors(tag, el)
+            if errors:
+                self.rejected += 1
+                self.writer.writerows(errors)
+            else:
+                passed.append((tag, el))
+        return passed
@@ -0,0 +1,156 @@
+import calendar
+import itertools
+import struct
+import time
+import xml.etree.ElementTree as ET
+import zlib
+
+import pytest
+
+SAMPLE_OSM = '''<?xml version="1.0" encoding="UTF-8"?>
+<osm version="0.6" generator="test">
+ <node id="1" lat="52.5201" lon="13.4051" user="anna" uid="10" version="1" changeset="100" timestamp="2016-01-01T00:00:00Z">
+  <tag k="amenity" v="restaurant"/>
+  <tag k="cuisine" v="italian"/>
+  <tag k="addr:street" v="Foo Str."/>
+  <tag k="phone" v="030 1234567"/>
+ </node>
+ <node id="2" lat="52.5301" lon="13.4151" user="ben" uid="11" version="2" changeset="101" timestamp="2016-01-02T00:00:00Z">
+  <tag k="amenity" v="cafe"/>
+  <tag k="phone" v="033201 1234"/>
+ </node>
+ <node id="3" lat="52.5401" lon="13.4251" user="anna" uid="10" version="1" changeset="102" timestamp="2016-01-03T00:00:00Z"/>
+ <way id="10" user="ben" uid="11" version="1" changeset="103" timestamp="2016-01-04T00:00:00Z">
+  <nd ref="1"/>
+  <nd ref="2"/>
+  <nd ref="3"/>
+  <tag k="highway" v="residential"/>
+  <tag k="name" v="Foo Straße"/>
+  <tag k="addr:street" v="Foo Strasse"/>
+ </way>
+ <way id="11" user="anna" uid="10" version="1" changeset="104" timestamp="2016-01-05T00:00:00Z">
+  <nd ref="3"/>
+  <nd ref="1"/>
+  <tag k="name" v="Bar Weg"/>
+ </way>
+ <relation id="20" user="anna" uid="10" version="1" changeset="105" timestamp="2016-01-06T00:00:00Z">
+  <member type="way" ref="10" role="outer"/>
+  <member type="node" ref="2" role=""/>
+  <tag k="type" v="multipolygon"/>
+ </relation>
+</osm>
+'''
+
+
+MEMBER_TYPES = ['node', 'way', 'relation']  # in the order of the PBF enum
+
+
+def write_osm(path, text=SAMPLE_OSM):
+    with open(str(path), 'w', encoding='utf-8') as f:
+        f.write(text)
+    return str(path)
+
+
+@pytest.fixture
+def osm_file(tmp_path):
+    return write_osm(tmp_path / 'sample.osm')
+
+
+def pbf_varint(n):
+    n &= (1 << 64) - 1
+    out = bytearray()
+    while n > 0x7f:
+        out.append(n & 0x7f | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def pbf_field(number, value):
+    """Encode a varint field for an int value, a length-delimited one for bytes"""
+
+    if isinstance(value, int):
+        return pbf_varint(number << 3) + pbf_varint(value)
+    return pbf_varint(number << 3 | 2) + pbf_varint(len(value)) + value
+
+
+def pbf_packed(number, values, zigzag=False, delta=False):
+    if delta:
+        values = [value - previous for value, previous in zip(values, [0] + values[:-1])]
+    if zigzag:
+        values = [(value << 1) ^ (value >> 63) for value in values]
+    return pbf_field(number, b''.join(pbf_varint(value) for value in values)) if values else b''
+
+
+def pbf_blob(blob_type, data):
+    blob = pbf_field(2, len(data)) + pbf_field(3, zlib.compress(data))
+    header = pbf_field(1, blob_type.encode()) + pbf_field(3, len(blob))
+    return struct.pack('>I', len(header)) + header + blob
+
+
+def pbf_timestamp(element):
+    return calendar.timegm(time.strptime(element.get('timestamp'), '%Y-%m-%dT%H:%M:%SZ'))
+
+
+def pbf_block(elements):
+    """Encode elements of one type as a PrimitiveBlock: dense nodes, or ways or relations"""
+
+    strings = ['']
+
+    def string_id(s):
+        if s not in strings:
+            strings.append(s)
+        return strings.index(s)
+
+    def info(element):
+        return (pbf_field(1, int(element.get('version'))) + pbf_field(2, pbf_timestamp(element)) +
+                pbf_field(3, int(element.get('changeset'))) + pbf_field(4, int(element.get('uid'))) +
+                pbf_field(5, string_id(element.get('user'))))
+
+    def tags(element):
+        pairs = [(string_id(tag.get('k')), string_id(tag.get('v'))) for tag in element.iter('tag')]
+        return pbf_packed(2, [k for k, v in pairs]) + pbf_packed(3, [v for k, v in pairs])
+
+    if elements[0].tag == 'node':
+        keys_vals = []
+        for node in elements:
+            for tag in node.iter('tag'):
+                keys_vals += [string_id(tag.get('k')), string_id(tag.get('v'))]
+            keys_vals.append(0)
+        dense_info = (pbf_packed(1, [int(n.get('version')) for n in elements]) +
+                      pbf_packed(2, [pbf_timestamp(n) for n in elements], zigzag=True, delta=True) +
+                      pbf_packed(3, [int(n.get('changeset')) for n in elements], zigzag=True, delta=True) +
+                      pbf_packed(4, [int(n.get('uid')) for n in elements], zigzag=True, delta=True) +
+                      pbf_packed(5, [string_id(n.get('user')) for n in elements], zigzag=True, delta=True))
+        coords = [[int(round(float(n.get(name)) * 10000000)) for n in elements] for name in ('lat', 'lon')]
+        group = pbf_field(2, pbf_packed(1, [int(n.get('id')) for n in elements], zigzag=True, delta=True) +
+                          pbf_field(5, dense_info) + pbf_packed(8, coords[0], zigzag=True, delta=True) +
+                          pbf_packed(9, coords[1], zigzag=True, delta=True) + pbf_packed(10, keys_vals))
+    elif elements[0].tag == 'way':
+        group = b''.join(pbf_field(3, pbf_field(1, int(way.get('id'))) + tags(way) + pbf_field(4, info(way)) +
+                                   pbf_packed(8, [int(nd.get('ref')) for nd in way.iter('nd')], zigzag=True,
+                                              delta=True))
+                         for way in elements)
+    else:
+        group = b''.join(pbf_field(4, pbf_field(1, int(rel.get('id'))) + tags(rel) + pbf_field(4, info(rel)) +
+                                   pbf_packed(8, [string_id(m.get('role')) for m in rel.iter('member')]) +
+                                   pbf_packed(9, [int(m.get('ref')) for m in rel.iter('member')], zigzag=True,
+                                              delta=True) +
+                                   pbf_packed(10, [MEMBER_TYPES.index(m.get('type')) for m in rel.iter('member')]))
+                         for rel in elements)
+    string_table = b''.join(pbf_field(1, s.encode('utf-8')) for s in strings)
+    return pbf_field(1, string_table) + pbf_field(2, group)
+
+
+def write_pbf(path, text=SAMPLE_OSM, block_size=2):
+    """Write OSM XML as a PBF file, with at most block_size elements of one type per block"""
+
+    data = pbf_blob('OSMHeader', pbf_field(4, b'OsmSchema-V0.6') + pbf_field(4, b'DenseNodes'))
+    elements = [element for element in ET.fromstring(text.encode('utf-8')) if element.tag in MEMBER_TYPES]
+    for tag, group in itertools.groupby(elements, key=lambda element: element.tag):
+        group = list(group)
+        for i in range(0, len(group), block_size):
+            data += pbf_blob('OSMData', pbf_block(group[i:i + block_size]))
+    with open(str(path), 'wb') as f:
+        f.write(data)
+    return str(path)
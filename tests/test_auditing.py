@@ -0,0 +1,29 @@
+import pytest
+
+from p3_osm import auditing
+from p3_osm.auditing import audit_street_type
+
+
+@pytest.mark.parametrize('name, is_expected', [
+    ('Oberbaumbrücke', True),
+    ('Jannowitzbrücke', True),
+    ('Glienicker Brücke', True),
+    ('Prenzlauer Allee', True),
+    ('Kastanienallee', True),
+    ('Foo Str.', False),
+    ('Unter den Linden', False),
+])
+def test_audit_street_type(name, is_expected):
+    street_types = set()
+    audit_street_type(street_types, name)
+    assert street_types == (set() if is_expected else {name})
+
+
+def test_audit_street_type_cache_is_capped(monkeypatch):
+    monkeypatch.setattr(auditing, 'street_type_cache', {})
+    monkeypatch.setattr(auditing, 'STREET_TYPE_CACHE_SIZE', 2)
+    street_types = set()
+    for name in ['A Str.', 'B Weg', 'C Str.', 'A Str.']:
+        audit_street_type(street_types, name)
+        assert len(auditing.street_type_cache) <= 2
+    assert street_types == {'A Str.', 'C Str.'}
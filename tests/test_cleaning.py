@@ -0,0 +1,115 @@
+import pytest
+
+from p3_osm.cleaning import (StreetNormalizer, format_phone_num, mapping, split_area_code, update_name,
+                             update_opening_hours, update_phone_num, update_postcode, update_website)
+
+
+@pytest.mark.parametrize('nsn, expected', [
+    ('301234567', ('30', '1234567')),        # Berlin, 2 digits
+    ('331123456', ('331', '123456')),        # Potsdam, 3 digits
+    ('332212345', ('3322', '12345')),        # Falkensee, 4 digits
+    ('332011234', ('33201', '1234')),        # Groß Glienicke, 5 digits
+    ('3543312345', ('35433', '12345')),      # Vetschau, 5 digits
+    ('1751234567', ('175', '1234567')),      # mobile
+])
+def test_split_area_code(nsn, expected):
+    assert split_area_code(nsn) == expected
+
+
+def test_split_area_code_longest_prefix_first():
+    assert split_area_code('212923456') == ('2129', '23456')
+    assert split_area_code('212234567') == ('212', '234567')
+
+
+@pytest.mark.parametrize('num, expected', [
+    ('033201 1234', '+49 33201 1234'),
+    ('+49 (0) 3322 12345', '+49 3322 12345'),
+    ('0049 331 123456', '+49 331 123456'),
+    ('030/123 4567', '+49 30 1234567'),
+    ('1234567', '+49 30 1234567'),
+    ('0175 1234567', '+49 175 1234567'),
+    ('+33 1 23 45 67 89', '+33123456789'),
+])
+def test_format_phone_num(num, expected):
+    assert format_phone_num(num) == expected
+
+
+def test_update_phone_num_several():
+    assert update_phone_num('030 1234567; 033201 1234') == '+49 30 1234567; +49 33201 1234'
+
+
+def test_update_name():
+    assert update_name('Foo Str.', mapping) == 'Foo Straße'
+    assert update_name('berliner strasse', mapping) == 'Berliner straße'
+
+
+@pytest.mark.parametrize('code, expected', [
+    ('D-10115', '10115'),
+    ('DE 10 115', '10115'),
+    (' 14467 ', '14467'),
+    ('1011', '1011'),
+])
+def test_update_postcode(code, expected):
+    assert update_postcode(code) == expected
+
+
+@pytest.mark.parametrize('hours, expected', [
+    ('mo-fr 9:00 - 18:00;sa 10:00-14:00', 'Mo-Fr 09:00-18:00; Sa 10:00-14:00'),
+    ('Mo-Su 08:00\u201320:00', 'Mo-Su 08:00-20:00'),
+    ('ph off', 'PH off'),
+    ('24/7', '24/7'),
+])
+def test_update_opening_hours(hours, expected):
+    assert update_opening_hours(hours) == expected
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('Example.COM/Path', 'http://example.com/Path'),
+    ('www.a.de; https://B.de', 'http://www.a.de;https://b.de'),
+    ('mailto:x@y.de', 'mailto:x@y.de'),
+    ('Example.com:8080/x', 'http://example.com:8080/x'),
+    ('not a url', 'not a url'),
+])
+def test_update_website(url, expected):
+    assert update_website(url) == expected
+
+
+@pytest.mark.parametrize('name, expected', [
+    ('Foo Str.', 'Foo Straße'),
+    ('Foo Str', 'Foo Straße'),
+    ('Foo Strasse', 'Foo Straße'),
+    ('Kastanienstr.', 'Kastanienstraße'),
+    ('Kastanienstrasse', 'Kastanienstraße'),
+    # Only the suffix is rewritten, not earlier occurrences of the key
+    ('Str. des 17. Juni', 'Str. des 17. Juni'),
+    ('Strasse am Strasse', 'Strasse am Straße'),
+    ('Strausberger Str', 'Strausberger Straße'),
+    # Lowercase names are capitalized, the rest of the name is left alone
+    ('am Kupfergraben', 'Am Kupfergraben'),
+    ('unter den Linden', 'Unter den Linden'),
+    ('Prenzlauer Allee', 'Prenzlauer Allee'),
+    ('', ''),
+])
+def test_update_name_rewrites_the_suffix(name, expected):
+    assert update_name(name, mapping) == expected
+    assert StreetNormalizer(mapping).fix(name) == expected
+
+
+def test_update_name_with_another_mapping():
+    assert update_name('Foo Pl.', {'Pl.': 'Platz', 'Pl': 'Platz'}) == 'Foo Platz'
+    assert update_name('Foo Str.', {'Pl.': 'Platz'}) == 'Foo Str.'
+
+
+def test_normalizer_counts_hits_and_misses():
+    normalizer = StreetNormalizer(mapping)
+    assert [normalizer.update(name) for name in ['Foo Str.', 'Bar Str', 'Foo Str.', 'Foo Str.']] == \
+        ['Foo Straße', 'Bar Straße', 'Foo Straße', 'Foo Straße']
+    assert (normalizer.hits, normalizer.misses) == (2, 2)
+
+
+def test_normalizer_cache_is_capped():
+    normalizer = StreetNormalizer(mapping, cache_size=2)
+    for name in ['A Str.', 'B Str.', 'C Str.', 'A Str.']:
+        normalizer.update(name)
+        assert len(normalizer.cache) <= 2
+    assert (normalizer.hits, normalizer.misses) == (0, 4)
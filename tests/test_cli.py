@@ -0,0 +1,58 @@
+import gzip
+
+import pytest
+
+from p3_osm.cli import main
+from p3_osm.database import load_sqlite
+
+from conftest import SAMPLE_OSM
+
+
+def test_export_processes_rejects_compressed_xml(tmp_path, monkeypatch):
+    path = str(tmp_path / 'sample.osm.gz')
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        f.write(SAMPLE_OSM)
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(SystemExit) as exc_info:
+        main(['export', path, '--processes', '2'])
+    assert '--processes' in str(exc_info.value)
+
+
+@pytest.mark.parametrize('option', ['--processes', '--sample'])
+def test_count_options_reject_zero(osm_file, option):
+    with pytest.raises(SystemExit) as exc_info:
+        main(['export', osm_file, option, '0'])
+    assert exc_info.value.code == 2
+
+
+def test_query_takes_names_after_options(osm_file, tmp_path, capsys):
+    db = str(tmp_path / 'sample.db')
+    load_sqlite(osm_file, db)
+    main(['query', db, 'N_NODES', 'N_WAYS'])
+    expected = capsys.readouterr().out
+    main(['query', db, '--workers', '2', 'N_NODES', 'N_WAYS'])
+    assert capsys.readouterr().out == expected
+    assert 'N_NODES' in expected and 'N_WAYS' in expected and 'CUISINES' not in expected
+    with pytest.raises(SystemExit):
+        main(['query', db, '--workers', '2', 'N_NODES', '--bogus'])
+
+
+@pytest.mark.parametrize('mode', [['--processes', '2'], ['--columnar'], ['--scan']])
+def test_export_stats_needs_the_serial_export(osm_file, mode):
+    with pytest.raises(SystemExit) as exc_info:
+        main(['export', osm_file, '--stats'] + mode)
+    assert '--stats' in str(exc_info.value)
+
+
+@pytest.mark.parametrize('options', [['--columnar'], ['--scan'], ['--node-cache', 'nodes.bin'], ['--no-spatial'],
+                                     ['--no-aggregates'], ['--no-reconcile']])
+def test_load_changes_rejects_full_load_options(osm_file, tmp_path, options):
+    db = str(tmp_path / 'sample.db')
+    load_sqlite(osm_file, db)
+    with open(db, 'rb') as f:
+        before = f.read()
+    with pytest.raises(SystemExit) as exc_info:
+        main(['load', osm_file, db, '--changes'] + options)
+    assert options[0] in str(exc_info.value)
+    with open(db, 'rb') as f:
+        assert f.read() == before
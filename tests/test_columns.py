@@ -0,0 +1,36 @@
+import array
+import sqlite3
+
+from p3_osm.columns import INT64, ColumnTable
+from p3_osm.database import LOAD_TABLES, load_sqlite
+
+from conftest import write_osm
+from test_export import ODD_NUMBERS_OSM
+
+
+def test_column_table_keeps_values_it_cannot_convert():
+    table = ColumnTable([INT64, 'd', 'intern'], {})
+    table.append(('1', '52.5', 'a'))
+    assert isinstance(table.columns[0], array.array)
+    table.append(('', 'x', 'a'))
+    table.append((None, '13.25', 'b'))
+    table.append(('3', '1', 'a'))
+    assert list(table.rows()) == [(1, 52.5, 'a'), ('', 'x', 'a'), (None, 13.25, 'b'), (3, 1.0, 'a')]
+
+
+def table_rows(db):
+    con = sqlite3.connect(db)
+    try:
+        return dict((table, sorted(con.execute('SELECT * FROM %s' % table), key=repr))
+                    for part, table, fields in LOAD_TABLES)
+    finally:
+        con.close()
+
+
+def test_columnar_load_matches_load(tmp_path):
+    osm_file = write_osm(tmp_path / 'odd.osm', ODD_NUMBERS_OSM)
+    load_sqlite(osm_file, str(tmp_path / 'rows.db'))
+    load_sqlite(osm_file, str(tmp_path / 'columns.db'), columnar=True, batch_size=2)
+    rows = table_rows(str(tmp_path / 'rows.db'))
+    assert rows['nodes'] and rows['relations_members']
+    assert table_rows(str(tmp_path / 'columns.db')) == rows
@@ -0,0 +1,101 @@
+import csv
+import io
+import sqlite3
+
+import pytest
+
+from p3_osm import database
+from p3_osm.database import SCHEMA_PATH, load_sqlite
+from p3_osm.export import CSV_PATHS, CSV_TABLES
+
+from conftest import SAMPLE_OSM, write_osm
+from test_export import ODD_NUMBERS_OSM, export
+
+
+def table_rows(db, tables=CSV_TABLES):
+    con = sqlite3.connect(db)
+    try:
+        return dict((table, sorted(con.execute('SELECT * FROM %s' % table), key=repr)) for table in tables)
+    finally:
+        con.close()
+
+
+def import_csvs(csvs, db):
+    """Import the csv files of an export into the schema, the way the sqlite3 shell's .import does"""
+    con = sqlite3.connect(db)
+    try:
+        with open(SCHEMA_PATH) as schema_file:
+            con.executescript(schema_file.read())
+        for table, path in zip(CSV_TABLES, CSV_PATHS):
+            rows = list(csv.reader(io.StringIO(csvs[path])))
+            if rows:
+                con.executemany('INSERT INTO %s VALUES (%s)' % (table, ', '.join('?' * len(rows[0]))), rows)
+        con.commit()
+    finally:
+        con.close()
+
+
+@pytest.mark.parametrize('text', [SAMPLE_OSM, ODD_NUMBERS_OSM], ids=['sample', 'odd_numbers'])
+def test_load_matches_csv_import(tmp_path, text):
+    osm_file = write_osm(tmp_path / 'in.osm', text)
+    import_csvs(export(osm_file, str(tmp_path / 'csv'), parallel=False), str(tmp_path / 'csv.db'))
+    load_sqlite(osm_file, str(tmp_path / 'load.db'), batch_size=1)
+    assert table_rows(str(tmp_path / 'load.db')) == table_rows(str(tmp_path / 'csv.db'))
+
+
+def test_load_restores_the_pragmas(osm_file, tmp_path, monkeypatch):
+    pragmas = []
+
+    class Connection(sqlite3.Connection):
+        def commit(self):
+            pragmas.append(('commit', self.execute('PRAGMA journal_mode').fetchone()[0],
+                            self.execute('PRAGMA synchronous').fetchone()[0]))
+            super(Connection, self).commit()
+
+        def close(self):
+            pragmas.append(('close', self.execute('PRAGMA journal_mode').fetchone()[0],
+                            self.execute('PRAGMA synchronous').fetchone()[0]))
+            super(Connection, self).close()
+
+    connect = sqlite3.connect
+    monkeypatch.setattr(database.sql, 'connect', lambda path: connect(path, factory=Connection))
+    db = str(tmp_path / 'load.db')
+    load_sqlite(osm_file, db)
+    monkeypatch.undo()
+    # Loaded without a journal or syncs, then back to the defaults before the connection is closed
+    assert pragmas[0] == ('commit', 'memory', 0)
+    assert pragmas[-1] == ('close', 'delete', 2)
+    con = sqlite3.connect(db)
+    try:
+        assert con.execute('PRAGMA journal_mode').fetchone()[0] == 'delete'
+    finally:
+        con.close()
+
+
+def test_load_replaces_an_existing_database(osm_file, tmp_path):
+    db = str(tmp_path / 'load.db')
+    load_sqlite(write_osm(tmp_path / 'odd.osm', ODD_NUMBERS_OSM), db)
+    load_sqlite(osm_file, db)
+    load_sqlite(osm_file, str(tmp_path / 'fresh.db'))
+    tables = [table for part, table, fields in database.LOAD_TABLES]
+    assert table_rows(db, tables) == table_rows(str(tmp_path / 'fresh.db'), tables)
+
+
+def test_load_replaces_a_database_in_wal_mode(osm_file, tmp_path):
+    db = str(tmp_path / 'load.db')
+    con = sqlite3.connect(db)
+    try:
+        con.execute('PRAGMA journal_mode = WAL')
+        con.execute('CREATE TABLE other (x)')
+        con.execute('INSERT INTO other VALUES (1)')
+        con.commit()
+    finally:
+        con.close()
+    load_sqlite(osm_file, db)
+    con = sqlite3.connect(db)
+    try:
+        assert con.execute('PRAGMA journal_mode').fetchone()[0] == 'delete'
+        assert con.execute("SELECT 1 FROM sqlite_master WHERE name = 'other'").fetchone() is None
+        assert con.execute('SELECT COUNT(*) FROM nodes').fetchone() == (3,)
+    finally:
+        con.close()
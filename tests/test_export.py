@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+from p3_osm.export import CSV_PATHS, find_chunks, process_map, process_map_columnar, process_map_parallel, splittable
+
+from conftest import SAMPLE_OSM, write_osm
+
+
+def read_csvs(directory):
+    result = {}
+    for path in CSV_PATHS:
+        with open(os.path.join(directory, path), encoding='utf-8') as f:
+            result[path] = f.read()
+    return result
+
+
+def export(osm_file, directory, parallel, columnar=False):
+    os.makedirs(directory)
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        if parallel:
+            process_map_parallel(osm_file, validate=False, processes=2, chunk_size=200)
+        elif columnar:
+            process_map_columnar(osm_file, batch_size=2)
+        else:
+            process_map(osm_file, validate=False)
+    finally:
+        os.chdir(cwd)
+    return read_csvs(directory)
+
+
+def test_parallel_export_matches_serial(osm_file, tmp_path):
+    assert len(find_chunks(osm_file, 200)) > 1
+    serial = export(osm_file, str(tmp_path / 'serial'), False)
+    assert export(osm_file, str(tmp_path / 'parallel'), True) == serial
+    assert serial['nodes.csv'].count('\n') == 3
+
+
+def test_parallel_export_with_comments_matches_serial(tmp_path):
+    text = SAMPLE_OSM.replace(' <way id="11"', ' <!-- <node id="999"/> -->\n <way id="11"')
+    osm_file = write_osm(tmp_path / 'comments.osm', text)
+    assert not splittable(osm_file)
+    serial = export(osm_file, str(tmp_path / 'serial'), False)
+    assert export(osm_file, str(tmp_path / 'parallel'), True) == serial
+    assert '999' not in serial['nodes.csv']
+
+
+# Empty and non-numeric values in numeric columns, which the dict path passes through as they are
+ODD_NUMBERS_OSM = SAMPLE_OSM.replace('uid="11" version="2"', 'uid="" version="2"').replace(
+    'lon="13.4251" user="anna" uid="10" version="1"', 'lon="13.4251" user="anna" uid="10" version="one"')
+
+
+@pytest.mark.parametrize('text', [SAMPLE_OSM, ODD_NUMBERS_OSM], ids=['sample', 'odd_numbers'])
+def test_columnar_export_matches_serial(tmp_path, text):
+    osm_file = write_osm(tmp_path / 'sample.osm', text)
+    serial = export(osm_file, str(tmp_path / 'serial'), False)
+    assert export(osm_file, str(tmp_path / 'columnar'), False, columnar=True) == serial
@@ -0,0 +1,53 @@
+import sqlite3
+
+import pytest
+
+from p3_osm.database import load_sqlite
+from p3_osm.geometry import DenseNodeLocations, SparseNodeLocations
+
+from conftest import SAMPLE_OSM, write_osm
+
+
+@pytest.fixture(params=['sparse', 'dense'])
+def store(request, tmp_path):
+    locations = SparseNodeLocations() if request.param == 'sparse' else DenseNodeLocations(str(tmp_path / 'nodes'))
+    yield locations
+    locations.close()
+
+
+def test_node_locations(store):
+    store.set(5, 52.5, 13.4)
+    store.set(2, -33.8688197, 151.2092955)
+    store.set(-7, 1.0, -2.0)
+    assert store.get(5) == (52.5, 13.4)
+    assert store.get(2) == (-33.8688197, 151.2092955)
+    assert store.get(-7) == (1.0, -2.0)
+    assert store.get(3) is None
+    assert store.get(-3) is None
+    assert store.get(10 ** 6) is None
+
+
+def test_dense_store_keeps_negative_ids_apart(tmp_path):
+    store = DenseNodeLocations(str(tmp_path / 'nodes'))
+    try:
+        store.set(1, 10.0, 20.0)
+        last = store.size // 8 - 1  # the slot a negative offset of -8 would hit
+        store.set(last, 10.0, 20.0)
+        store.set(-1, 30.0, 40.0)
+        assert store.get(last) == (10.0, 20.0)
+        assert store.get(-1) == (30.0, 40.0)
+    finally:
+        store.close()
+
+
+def test_geometry_with_negative_ids(tmp_path):
+    text = SAMPLE_OSM.replace('id="1"', 'id="-1"').replace('ref="1"', 'ref="-1"')
+    osm_file = write_osm(tmp_path / 'new.osm', text)
+    db = str(tmp_path / 'new.db')
+    load_sqlite(osm_file, db, geometry=True, node_cache=str(tmp_path / 'nodes'))
+    con = sqlite3.connect(db)
+    try:
+        row = con.execute('SELECT min_lat, max_lat FROM ways_geometry WHERE id = 10').fetchone()
+    finally:
+        con.close()
+    assert row == (52.5201, 52.5401)
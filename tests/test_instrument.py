@@ -0,0 +1,74 @@
+import gzip
+import io
+import json
+import os
+
+from p3_osm.export import CSV_PATHS, CSV_TABLES, process_map
+from p3_osm.instrument import CountingReader, RunStats
+
+from conftest import SAMPLE_OSM
+
+
+def export_with_stats(osm_file, directory):
+    os.makedirs(directory)
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        stats = RunStats(progress_interval=0, stream=io.StringIO())
+        process_map(osm_file, validate=False, stats=stats)
+        lines = {}
+        for table, path in zip(CSV_TABLES, CSV_PATHS):
+            with open(path, encoding='utf-8') as f:
+                lines[table] = len(f.read().splitlines())
+    finally:
+        os.chdir(cwd)
+    return stats, lines
+
+
+def test_process_map_stats(osm_file, tmp_path):
+    stats, lines = export_with_stats(osm_file, str(tmp_path / 'out'))
+    counters = stats.summary()['counters']
+    assert (counters['nodes'], counters['ways'], counters['elements']) == (3, 2, 5)
+    assert lines['nodes'] == counters['nodes'] and lines['ways'] == counters['ways']
+    for table in CSV_TABLES:
+        assert counters.get('write_%s_rows' % table, 0) == lines[table], table
+    assert stats.summary()['bytes_read'] == os.path.getsize(osm_file)
+    assert stats.total_bytes == os.path.getsize(osm_file)
+    # Two phone numbers and two street names, all of which the cleaning rewrites
+    assert counters['update_phone_num_calls'] == counters['update_phone_num_rewrites'] == 2
+    assert counters['update_name_calls'] == counters['update_name_rewrites'] == 2
+    assert set(stats.timers) >= {'parse', 'shape_element', 'write_nodes', 'update_name'}
+    assert stats.report().startswith('Processed 5 elements (3 nodes, 2 ways)')
+
+    path = str(tmp_path / 'stats.json')
+    stats.save(path)
+    with open(path) as f:
+        assert json.load(f)['counters'] == counters
+
+
+def test_process_map_stats_of_compressed_input(tmp_path):
+    path = str(tmp_path / 'sample.osm.gz')
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        f.write(SAMPLE_OSM)
+    stats, lines = export_with_stats(path, str(tmp_path / 'out'))
+    assert stats.summary()['bytes_read'] == len(SAMPLE_OSM.encode('utf-8'))
+    assert stats.total_bytes is None
+    assert stats.summary()['counters']['elements'] == 5
+
+
+def test_counting_reader():
+    reader = CountingReader(io.BytesIO(b'x' * 10))
+    assert reader.read(4) == b'xxxx'
+    assert reader.read() == b'x' * 6
+    assert reader.read() == b''
+    assert reader.bytes_read == 10
+
+
+def test_progress_line_with_eta():
+    stats = RunStats(stream=io.StringIO())
+    stats.begin(CountingReader(io.BytesIO(b'x' * 100)), total_bytes=100)
+    stats.reader.read(25)
+    for n in range(4):
+        stats.element('node')
+    line = stats.progress_line(stats.started + 2.0)
+    assert line.startswith('4 elements (4 nodes, 0 ways), 2/s, 0.0 MB read, 25.0%, ETA 0:00:06')
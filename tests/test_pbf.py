@@ -0,0 +1,52 @@
+import os
+import sqlite3
+
+import pytest
+
+from p3_osm.database import load_sqlite
+from p3_osm.export import find_chunks
+from p3_osm.reader import get_element, is_pbf
+
+from conftest import write_pbf
+from test_export import export
+
+TABLES = ('nodes', 'nodes_tags', 'ways', 'ways_nodes', 'ways_tags', 'relations', 'relations_members',
+          'relations_tags', 'ways_geometry')
+
+
+@pytest.fixture
+def pbf_file(tmp_path):
+    return write_pbf(tmp_path / 'sample.osm.pbf')
+
+
+def element_tuple(element):
+    children = [(child.tag, sorted(child.attrib.items())) for child in element]
+    return element.tag, sorted(element.attrib.items()), children
+
+
+def test_pbf_elements_match_xml(osm_file, pbf_file):
+    assert is_pbf(pbf_file) and not is_pbf(osm_file)
+    xml = [element_tuple(element) for element in get_element(osm_file)]
+    assert [element_tuple(element) for element in get_element(pbf_file)] == xml
+
+
+def table_rows(db):
+    con = sqlite3.connect(db)
+    try:
+        return dict((table, sorted(con.execute('SELECT * FROM %s' % table))) for table in TABLES)
+    finally:
+        con.close()
+
+
+def test_pbf_loads_like_xml(osm_file, pbf_file, tmp_path):
+    load_sqlite(osm_file, str(tmp_path / 'xml.db'), geometry=True)
+    load_sqlite(pbf_file, str(tmp_path / 'pbf.db'), geometry=True)
+    xml_rows = table_rows(str(tmp_path / 'xml.db'))
+    assert xml_rows['nodes'] and xml_rows['ways_geometry']
+    assert table_rows(str(tmp_path / 'pbf.db')) == xml_rows
+
+
+def test_parallel_pbf_export_matches_xml(osm_file, pbf_file, tmp_path):
+    assert len(find_chunks(pbf_file, 200)) > 1
+    serial = export(osm_file, str(tmp_path / 'xml'), False)
+    assert export(pbf_file, os.path.join(str(tmp_path), 'pbf'), True) == serial
@@ -0,0 +1,150 @@
+import sqlite3
+
+import pytest
+
+from p3_osm.database import load_sqlite
+from p3_osm.queries import NAMED_QUERIES, query_plans
+
+from conftest import write_osm
+
+# The queries as they were before they were rewritten for the covering indexes
+ORIGINAL_QUERIES = {
+    'CUISINES': '''
+                SELECT nodes_tags.value, COUNT(*) as num
+                FROM nodes_tags
+                    JOIN (SELECT DISTINCT(id)
+                        FROM nodes_tags
+                        WHERE value='restaurant'
+                            OR value='fast_food'
+                            OR value='cafe') i
+                    ON nodes_tags.id=i.id
+                WHERE nodes_tags.key='cuisine'
+                GROUP BY nodes_tags.value
+                ORDER BY num DESC
+                LIMIT 10;
+                ''',
+    'LEISURE': '''
+               SELECT nodes_tags.value, COUNT(*) as num
+               FROM nodes_tags
+                   JOIN (SELECT DISTINCT(id)
+                       FROM nodes_tags) i
+                   ON nodes_tags.id=i.id
+               WHERE nodes_tags.key='leisure'
+               GROUP BY nodes_tags.value
+               ORDER BY num DESC
+               LIMIT 10;
+               ''',
+    'SPORTS': '''
+              SELECT nodes_tags.value, COUNT(*) as num
+              FROM nodes_tags
+                  JOIN (SELECT DISTINCT(id)
+                      FROM nodes_tags
+                      WHERE value='pitch') i
+                  ON nodes_tags.id=i.id
+              WHERE nodes_tags.key='sport'
+              GROUP BY nodes_tags.value
+              ORDER BY num DESC
+              LIMIT 10;
+              ''',
+    'NAMES_DUPL': '''
+                  SELECT a.key, b.key, a.value
+                  FROM ways_tags as a, ways_tags as b
+                  WHERE a.value = b.value
+                      AND a.key = 'street'
+                      AND b.key = 'name'
+                  GROUP BY a.value
+                  ORDER BY a.value
+                  LIMIT 10;
+                  ''',
+    'STR_IN_NAMES_ONLY': '''
+                         SELECT value
+                         FROM ways_tags
+                         WHERE key = 'name'
+                             AND instr(value, 'str') > 0
+                             AND value NOT IN (SELECT value FROM ways_tags WHERE key='street')
+                         GROUP BY value
+                         ORDER BY value
+                         LIMIT 10;
+                         ''',
+    'STR_IN_NAMES_ONLY_COUNT': '''
+                               SELECT COUNT(DISTINCT value)
+                               FROM ways_tags
+                               WHERE key = 'name'
+                                   AND instr(value, 'str') > 0
+                                   AND value NOT IN (SELECT value FROM ways_tags WHERE key='street');
+                               ''',
+}
+
+AMENITIES = ['restaurant', 'fast_food', 'cafe', 'bar', 'bench']
+CUISINES = ['italian', 'german', 'pizza', 'vietnamese', 'burger', 'kebab', 'thai']
+LEISURES = ['playground', 'pitch', 'park', 'garden', 'hackerspace']
+SPORTS = ['table_tennis', 'soccer', 'basketball', 'beachvolleyball']
+STREETS = ['Alpha', 'Beta', 'Gamma', 'Delta', 'Epsilon', 'Zeta', 'Eta', 'Theta', 'Iota', 'Kappa', 'Lambda', 'My']
+
+
+def tag(k, v):
+    return '  <tag k="%s" v="%s"/>\n' % (k, v)
+
+
+def node(i, tags):
+    return (' <node id="%d" lat="52.5" lon="13.4" user="u%d" uid="%d" version="1" changeset="1" '
+            'timestamp="2016-01-01T00:00:00Z">\n%s </node>\n' % (i, i % 7, i % 7, ''.join(tags)))
+
+
+def way(i, tags):
+    return (' <way id="%d" user="u%d" uid="%d" version="1" changeset="1" timestamp="2016-01-01T00:00:00Z">\n'
+            '  <nd ref="1"/>\n%s </way>\n' % (i, i % 5, i % 5, ''.join(tags)))
+
+
+def synthetic_osm():
+    """Tags in skewed amounts, so that the counts of the report queries differ and their order is fixed"""
+
+    elements = []
+    i = 1
+    for a, amenity in enumerate(AMENITIES):
+        for c, cuisine in enumerate(CUISINES):
+            for n in range((a + 1) * (c + 1)):
+                elements.append(node(i, [tag('amenity', amenity), tag('cuisine', cuisine)]))
+                i += 1
+    for l, leisure in enumerate(LEISURES):
+        for s, sport in enumerate(SPORTS):
+            for n in range(l * 11 + s * 3 + 1):
+                tags = [tag('leisure', leisure)] + ([tag('sport', sport)] if n % 2 else [])
+                elements.append(node(i, tags))
+                i += 1
+    for s, street in enumerate(STREETS):
+        for n in range(s % 4 + 1):
+            tags = [tag('addr:street', street + 'straße')] if s % 3 else []
+            if s % 2:
+                tags.append(tag('name', street + 'straße'))
+            elif n:
+                tags.append(tag('name', street + 'str. %d' % n))
+            elements.append(way(100000 + i, tags))
+            i += 1
+    return '<?xml version="1.0" encoding="UTF-8"?>\n<osm version="0.6">\n%s</osm>\n' % ''.join(elements)
+
+
+@pytest.fixture(scope='module')
+def con(tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp('queries')
+    db = str(tmp_path / 'synthetic.db')
+    load_sqlite(write_osm(tmp_path / 'synthetic.osm', synthetic_osm()), db, aggregates=False, reconcile=False)
+    con = sqlite3.connect(db)
+    yield con
+    con.close()
+
+
+@pytest.mark.parametrize('name', sorted(ORIGINAL_QUERIES))
+def test_rewritten_queries_match_the_originals(con, name):
+    rows = con.execute(dict(NAMED_QUERIES)[name]).fetchall()
+    assert rows
+    assert rows == con.execute(ORIGINAL_QUERIES[name]).fetchall()
+
+
+def test_tag_tables_are_only_read_through_covering_indexes(con):
+    for name, plan in query_plans(con):
+        if '_tags' not in dict(NAMED_QUERIES)[name]:
+            continue
+        for line in plan:
+            if line.startswith(('SCAN', 'SEARCH')):
+                assert 'COVERING INDEX' in line, (name, line)
@@ -0,0 +1,75 @@
+import bz2
+import gzip
+import os
+
+import pytest
+
+from p3_osm import reader
+from p3_osm.reader import PipeReader, get_element, open_osm
+
+from conftest import SAMPLE_OSM
+
+
+def element_tuples(osm_file):
+    return [(element.tag, sorted(element.attrib.items()), [sorted(child.attrib.items()) for child in element])
+            for element in get_element(osm_file)]
+
+
+@pytest.fixture
+def no_parallel_bzip2(monkeypatch):
+    monkeypatch.setattr(reader, 'PARALLEL_BZIP2', [])
+
+
+@pytest.mark.parametrize('suffix, compress', [('.gz', gzip.compress), ('.bz2', bz2.compress)])
+def test_compressed_xml_reads_like_plain(osm_file, tmp_path, no_parallel_bzip2, suffix, compress):
+    path = str(tmp_path / ('sample.osm' + suffix))
+    with open(path, 'wb') as f:
+        f.write(compress(SAMPLE_OSM.encode('utf-8')))
+    assert element_tuples(path) == element_tuples(osm_file)
+
+
+def test_truncated_bz2_raises(tmp_path, no_parallel_bzip2):
+    path = str(tmp_path / 'sample.osm.bz2')
+    with open(path, 'wb') as f:
+        f.write(bz2.compress(SAMPLE_OSM.encode('utf-8'))[:-20])
+    with pytest.raises(EOFError):
+        element_tuples(path)
+
+
+def fake_bzip2(tmp_path, monkeypatch, osm_file, status):
+    """Put an lbzip2 on the PATH that writes osm_file, whatever it is asked for, and exits with status"""
+
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    program = bin_dir / 'lbzip2'
+    program.write_text('#!/bin/sh\ncat "%s"\nexit %d\n' % (osm_file, status))
+    program.chmod(0o755)
+    monkeypatch.setenv('PATH', str(bin_dir) + os.pathsep + os.environ.get('PATH', ''))
+    path = str(tmp_path / 'sample.osm.bz2')
+    open(path, 'wb').close()
+    return path
+
+
+@pytest.mark.skipif(os.name != 'posix', reason='needs a shell script as the decompressor')
+def test_parallel_bzip2_output(osm_file, tmp_path, monkeypatch):
+    path = fake_bzip2(tmp_path, monkeypatch, osm_file, 0)
+    f = open_osm(path)
+    assert isinstance(f, PipeReader)
+    f.close()
+    assert element_tuples(path) == element_tuples(osm_file)
+
+
+@pytest.mark.skipif(os.name != 'posix', reason='needs a shell script as the decompressor')
+def test_parallel_bzip2_failure_raises(osm_file, tmp_path, monkeypatch):
+    # The output is a whole, valid file, so only the exit status tells that something went wrong
+    path = fake_bzip2(tmp_path, monkeypatch, osm_file, 2)
+    with pytest.raises(IOError, match='exit status 2'):
+        element_tuples(path)
+
+
+@pytest.mark.skipif(os.name != 'posix', reason='needs a shell script as the decompressor')
+def test_pipe_closed_early_does_not_raise(osm_file, tmp_path, monkeypatch):
+    path = fake_bzip2(tmp_path, monkeypatch, osm_file, 2)
+    f = open_osm(path)
+    f.read(10)
+    f.close()
@@ -0,0 +1,159 @@
+import sqlite3
+from collections import Counter
+
+import pytest
+
+from p3_osm.auditing import EXPECTED_STREET_TYPES
+from p3_osm.cleaning import mapping, update_name
+from p3_osm.cli import main
+from p3_osm.database import load_sqlite
+from p3_osm.queries import NAMES_DUPL, STR_IN_NAMES_ONLY
+from p3_osm.reconcile import StreetIndex, candidate_users, has_street_candidates, reconcile_streets
+
+from conftest import write_osm
+from test_queries import node, synthetic_osm, tag, way
+
+# Name tags of each kind: abbreviated and exact known streets, streets that are in no address, and other names
+EXTRA_ELEMENTS = [
+    node(900001, [tag('addr:street', 'Kollwitzstr.'), tag('name', 'Kollwitzstr.')]),
+    node(900002, [tag('name', 'Kollwitzstraße')]),
+    node(900003, [tag('name', 'kollwitzstrasse')]),
+    node(900004, [tag('name', 'Kastanienallee')]),
+    node(900005, [tag('name', 'Bistro Mitte')]),
+    node(900006, [tag('name', 'Café Strauss')]),
+    way(900007, [tag('name', 'Oberbaumbrücke')]),
+    way(900008, [tag('name', 'Am Lustgarten')]),
+    way(900009, [tag('addr:street', 'Am Lustgarten')]),
+    way(900010, [tag('name', 'Weinbergsweg'), tag('highway', 'residential')]),
+]
+
+
+def reconcile_osm():
+    text = synthetic_osm()
+    return text.replace('</osm>', ''.join(EXTRA_ELEMENTS) + '</osm>')
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = str(tmp_path / 'reconcile.db')
+    load_sqlite(write_osm(tmp_path / 'reconcile.osm', reconcile_osm()), db, aggregates=False, reconcile=False)
+    return db
+
+
+@pytest.fixture
+def con(db):
+    con = sqlite3.connect(db)
+    yield con
+    con.close()
+
+
+def expected_candidates(con):
+    """Classify every name tag by brute force, one normalization and list scan per tag"""
+    streets = set()
+    for tags in ('nodes_tags', 'ways_tags'):
+        streets.update(update_name(street, mapping) for street, in
+                       con.execute("SELECT value FROM %s WHERE key = 'street'" % tags))
+    rows = []
+    for kind, table, tags in (('node', 'nodes', 'nodes_tags'), ('way', 'ways', 'ways_tags')):
+        for el_id, name, user, uid in con.execute(
+                "SELECT t.id, t.value, e.user, e.uid FROM %s AS t JOIN %s AS e ON e.id = t.id WHERE t.key = 'name'"
+                % (tags, table)):
+            street = update_name(name, mapping)
+            if street in streets:
+                rows.append((kind, el_id, name, street, 'known', user, uid))
+            elif EXPECTED_STREET_TYPES.search(street):
+                rows.append((kind, el_id, name, street, 'street_type', user, uid))
+    return sorted(rows)
+
+
+def test_reconcile_streets_classifies_every_name_tag(con):
+    expected = expected_candidates(con)
+    counts = reconcile_streets(con)
+    rows = sorted(con.execute('SELECT element, id, name, street, reason, user, uid FROM street_candidates'))
+    assert rows == expected
+    assert counts == Counter(row[4] for row in expected)
+    by_name = dict((row[2], row[3:5]) for row in rows)
+    assert by_name['Kollwitzstr.'] == by_name['Kollwitzstraße'] == ('Kollwitzstraße', 'known')
+    assert by_name['kollwitzstrasse'] == ('Kollwitzstraße', 'known')
+    assert by_name['Am Lustgarten'] == ('Am Lustgarten', 'known')
+    assert by_name['Kastanienallee'] == ('Kastanienallee', 'street_type')
+    assert by_name['Oberbaumbrücke'] == ('Oberbaumbrücke', 'street_type')
+    assert 'Bistro Mitte' not in by_name and 'Café Strauss' not in by_name
+
+
+def test_reconcile_streets_twice_gives_the_same_table(con):
+    reconcile_streets(con)
+    first = sorted(con.execute('SELECT * FROM street_candidates'))
+    reconcile_streets(con)
+    assert sorted(con.execute('SELECT * FROM street_candidates')) == first
+
+
+def test_candidates_match_the_name_queries(con):
+    reconcile_streets(con)
+    ways = dict(con.execute("SELECT name, reason FROM street_candidates WHERE element = 'way'"))
+    # The way streets that are also way names are all known streets
+    names_dupl = [value for key, name, value in con.execute(NAMES_DUPL.replace('LIMIT 10', ''))]
+    assert names_dupl
+    assert all(ways[value] == 'known' for value in names_dupl)
+    # The names with "str" in them that are no way street are candidates if they have a street type
+    str_in_names_only = [value for value, in con.execute(STR_IN_NAMES_ONLY.replace('LIMIT 10', ''))]
+    assert str_in_names_only
+    for value in str_in_names_only:
+        has_type = EXPECTED_STREET_TYPES.search(update_name(value, mapping)) is not None
+        assert (value in ways) == has_type, value
+    # and every way candidate with "str" in its name is in one of the two
+    for name in ways:
+        if 'str' in name:
+            assert name in names_dupl or name in str_in_names_only, name
+
+
+def test_street_index():
+    index = StreetIndex(['Foo Str.', 'Bar Straße'])
+    assert len(index) == 2
+    assert 'Foo Strasse' in index and 'Bar Str' in index and 'Baz Str' not in index
+    assert index.classify('foo Str.') == ('known', 'Foo Straße')
+    assert index.classify('Baz Str') == ('street_type', 'Baz Straße')
+    assert index.classify('Baz') is None
+    index.add('Baz Strasse')
+    assert index.classify('Baz Str') == ('known', 'Baz Straße')
+
+
+def expected_users(con, limit=None):
+    users = {}
+    for uid, user, reason in con.execute('SELECT uid, user, reason FROM street_candidates'):
+        counts = users.setdefault(uid, [user, 0, 0])
+        counts[1 if reason == 'known' else 2] += 1
+    rows = sorted(((uid, user, known, street_type, known + street_type)
+                   for uid, (user, known, street_type) in users.items()), key=lambda row: (-row[4], row[0]))
+    return rows[:limit]
+
+
+@pytest.mark.parametrize('limit', [None, 1, 3, 100])
+def test_candidate_users(con, limit):
+    reconcile_streets(con)
+    rows = candidate_users(con, limit)
+    assert rows == expected_users(con, limit)
+    assert len(rows) == min(limit or len(rows), len(expected_users(con)))
+
+
+def test_streets_command(db, capsys):
+    con = sqlite3.connect(db)
+    try:
+        assert not has_street_candidates(con)
+        main(['streets', db, '--limit', '3'])
+        assert has_street_candidates(con)
+        expected = expected_users(con, 3)
+        counts = Counter(reason for reason, in con.execute('SELECT reason FROM street_candidates'))
+    finally:
+        con.close()
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == 'Found %d known street names and %d with a street type in name tags' % (
+        counts['known'], counts['street_type'])
+    assert lines[1] == 'uid\tuser\tknown\tstreet_type\ttotal'
+    assert lines[2:] == ['\t'.join(str(value) for value in row) for row in expected]
+
+    # The table is only rebuilt when asked for
+    main(['streets', db, '--limit', '3'])
+    assert capsys.readouterr().out.splitlines() == lines[1:]
+    main(['streets', db, '--limit', '3', '--rebuild'])
+    assert capsys.readouterr().out.splitlines() == lines
@@ -0,0 +1,85 @@
+import sqlite3
+
+import pytest
+
+from p3_osm.database import load_sqlite
+from p3_osm.rules import TagRules, reclean, tag_rules
+from p3_osm.shaping import shape_tag
+
+from conftest import SAMPLE_OSM, write_osm
+
+# The sample with a value for each of the normalizers, none of them clean yet
+DIRTY_OSM = SAMPLE_OSM.replace('  <tag k="phone" v="033201 1234"/>', '''  <tag k="phone" v="033201 1234"/>
+  <tag k="addr:postcode" v="D-10115"/>
+  <tag k="opening_hours" v="mo-fr 9:00 - 18:00"/>
+  <tag k="website" v="Example.COM/Path"/>''')
+TABLES = ('nodes_tags', 'ways_tags', 'relations_tags', 'tag_counts', 'category_counts', 'street_candidates')
+
+
+def table_rows(db):
+    con = sqlite3.connect(db)
+    try:
+        return dict((table, sorted(con.execute('SELECT * FROM %s' % table))) for table in TABLES)
+    finally:
+        con.close()
+
+
+def load_raw(path, db):
+    """Load with no normalizers registered, so the database has the raw values"""
+
+    saved = dict(tag_rules.normalizers)
+    tag_rules.normalizers.clear()
+    try:
+        load_sqlite(path, db)
+    finally:
+        tag_rules.normalizers.update(saved)
+
+
+@pytest.mark.parametrize('processes', [None, 2])
+def test_reclean_matches_a_clean_load(tmp_path, processes):
+    osm_file = write_osm(tmp_path / 'dirty.osm', DIRTY_OSM)
+    clean = str(tmp_path / 'clean.db')
+    load_sqlite(osm_file, clean)
+    raw = str(tmp_path / 'raw.db')
+    load_raw(osm_file, raw)
+    assert table_rows(raw) != table_rows(clean)
+
+    con = sqlite3.connect(raw)
+    try:
+        changed = reclean(con, processes=processes, chunk_size=1)
+    finally:
+        con.close()
+    assert changed == {'addr:street': 2, 'phone': 2, 'addr:postcode': 1, 'opening_hours': 1, 'website': 1}
+    assert table_rows(raw) == table_rows(clean)
+
+
+def test_reclean_of_a_clean_database_changes_nothing(tmp_path):
+    db = str(tmp_path / 'clean.db')
+    load_sqlite(write_osm(tmp_path / 'dirty.osm', DIRTY_OSM), db)
+    rows = table_rows(db)
+    con = sqlite3.connect(db)
+    try:
+        assert set(reclean(con).values()) == {0}
+    finally:
+        con.close()
+    assert table_rows(db) == rows
+
+
+def test_reclean_with_own_rules(tmp_path):
+    db = str(tmp_path / 'sample.db')
+    load_sqlite(write_osm(tmp_path / 'sample.osm', SAMPLE_OSM), db)
+    rules = TagRules()
+    rules.register('amenity', str.upper)
+    con = sqlite3.connect(db)
+    try:
+        assert reclean(con, rules) == {'amenity': 2}
+        values = sorted(value for value, in con.execute("SELECT value FROM nodes_tags WHERE key = 'amenity'"))
+    finally:
+        con.close()
+    assert values == ['CAFE', 'RESTAURANT']
+
+
+def test_shape_tag_uses_the_rules():
+    assert shape_tag('addr:street', 'Foo Str.') == ('street', 'Foo Straße', 'addr')
+    assert shape_tag('website', 'Example.COM') == ('website', 'http://example.com', 'regular')
+    assert shape_tag('bad key', 'x') == (None, 'x', None)
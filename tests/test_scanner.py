@@ -0,0 +1,93 @@
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from p3_osm.database import LOAD_TABLES, shaped_rows
+from p3_osm.reader import get_element
+from p3_osm.scanner import ScannedRows, scan_osm
+from p3_osm.shaping import shape_element
+
+from conftest import SAMPLE_OSM, write_osm
+
+# Single quotes, entities, whitespace in values, reversed and missing attributes, non-ASCII text
+ODD_OSM = '''<?xml version='1.0' encoding='UTF-8'?>
+<osm version='0.6' generator='JOSM'>
+  <node id='1' lat='52.5' lon='13.4' user='a&amp;b' uid='1' version='1' changeset='1' timestamp='2016-01-01T00:00:00Z' />
+  <node id="2" lat="52.5" lon="13.4" user="x" uid="2" version="1" changeset="1" timestamp="t">
+    <tag k='name' v='Caf&#233; &quot;X&quot;'/>
+    <tag k="addr:street" v="Foo Str."/>
+    <tag v="reversed" k="note"/>
+  </node>
+  <node id="3" lat="52.5" lon="13.4" user="ü name" uid="3" version="1" changeset="1" timestamp="t"><tag k="a" v="x > y"/><tag k="b" v="multi
+line"/></node>
+  <node id="4" lat="52.5" lon="13.4"/>
+  <way id="5" user="y" uid="4" version="2" changeset="1" timestamp="t">
+    <nd ref="1"/>
+    <nd ref='2' />
+    <tag k="highway" v="residential"/>
+    <tag k="name" v="Straße  am See"/>
+  </way>
+  <way id="6" user="y" uid="4" version="2" changeset="1" timestamp="t"/>
+  <relation id="7" user="y" uid="4" version="1" changeset="1" timestamp="t">
+    <member type="way" ref="5" role="outer"/>
+    <member type='node' ref='1' role=''/>
+    <tag k="type" v="multipolygon"/>
+  </relation>
+  <relation id="8" user="y" uid="4" version="1" changeset="1" timestamp="t">
+    <member ref="5" type="way" role="a&amp;b"/>
+  </relation>
+</osm>
+'''
+
+
+def element_tree_rows(osm_file):
+    tables = dict((table, []) for part, table, fields in LOAD_TABLES)
+    for element in get_element(osm_file):
+        el = shape_element(element)
+        for part, table, fields in LOAD_TABLES:
+            if part in el:
+                tables[table].extend(shaped_rows(el, part, fields))
+    return tables
+
+
+def scanned_rows(osm_file, block_size):
+    rows = ScannedRows()
+    counts = {}
+    tables = dict((table, []) for table in rows.tables)
+    for n in scan_osm(osm_file, rows, counts=counts, block_size=block_size):
+        for table in tables:
+            tables[table].extend(rows.rows(table))
+        rows.clear()
+    return tables, counts
+
+
+@pytest.mark.parametrize('text', [SAMPLE_OSM, ODD_OSM], ids=['sample', 'odd'])
+@pytest.mark.parametrize('block_size', [1, 1 << 20])
+def test_scanner_matches_element_tree(tmp_path, text, block_size):
+    osm_file = write_osm(tmp_path / 'test.osm', text)
+    tables, counts = scanned_rows(osm_file, block_size)
+    assert tables == element_tree_rows(osm_file)
+    assert counts['scanned'] > 0
+    if text == SAMPLE_OSM:
+        assert counts['parsed'] == 0
+
+
+def test_scanner_parses_entities_with_element_tree(tmp_path):
+    osm_file = write_osm(tmp_path / 'odd.osm', ODD_OSM)
+    tables, counts = scanned_rows(osm_file, 1 << 20)
+    assert counts['parsed'] >= 4
+    assert ('2', 'name', 'Café "X"', 'regular') in tables['nodes_tags']
+
+
+def test_scanner_rejects_malformed_elements(tmp_path):
+    osm_file = write_osm(tmp_path / 'bad.osm', SAMPLE_OSM.replace(' </way>', ' <way>', 1))
+    with pytest.raises(ET.ParseError):
+        scanned_rows(osm_file, 1 << 20)
+
+
+def test_scanner_reads_files_it_cannot_map(tmp_path):
+    text = SAMPLE_OSM.replace(' <way id="11"', ' <!-- a comment -->\n <way id="11"')
+    osm_file = write_osm(tmp_path / 'comment.osm', text)
+    tables, counts = scanned_rows(osm_file, 1 << 20)
+    assert tables == element_tree_rows(osm_file)
+    assert 'scanned' not in counts
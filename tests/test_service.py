@@ -0,0 +1,95 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from p3_osm.aggregates import report
+from p3_osm.database import load_sqlite
+from p3_osm.queries import NAMED_QUERIES
+from p3_osm.service import QueryService
+
+INSERT_NODE = '''
+              INSERT INTO nodes (id, lat, lon, user, uid, version, changeset, timestamp)
+              VALUES (4, 52.5, 13.4, 'dora', 13, 1, 106, '2016-01-07T00:00:00Z')
+              '''
+
+
+@pytest.fixture
+def db(osm_file, tmp_path):
+    path = str(tmp_path / 'sample.db')
+    load_sqlite(osm_file, path)
+    return path
+
+
+def journal_mode(db):
+    con = sqlite3.connect(db)
+    try:
+        return con.execute('PRAGMA journal_mode').fetchone()[0]
+    finally:
+        con.close()
+
+
+def test_reports_match_report(db):
+    con = sqlite3.connect(db)
+    try:
+        expected = [(name, report(con, name)) for name, query in NAMED_QUERIES]
+    finally:
+        con.close()
+    with QueryService(db, size=3) as service:
+        assert service.reports() == expected
+        assert [(name, service.report(name)) for name, query in NAMED_QUERIES] == expected
+        assert service.reports(['CUISINES', 'N_NODES'], aggregates=False) == [
+            ('CUISINES', dict(expected)['CUISINES']), ('N_NODES', [(3,)])]
+        with pytest.raises(KeyError):
+            service.report('NO_SUCH_QUERY')
+
+
+def test_cache_is_dropped_after_a_commit_elsewhere(db):
+    with QueryService(db, size=1) as service:
+        rows = service.report('N_NODES', aggregates=False)
+        assert rows == [(3,)]
+        assert service.report('N_NODES', aggregates=False) is rows
+        con = sqlite3.connect(db)
+        try:
+            con.execute(INSERT_NODE)
+            con.commit()
+        finally:
+            con.close()
+        assert service.report('N_NODES', aggregates=False) == [(4,)]
+        assert service.generation == 1
+
+
+def test_stream(db):
+    query = 'SELECT id, key, value FROM nodes_tags ORDER BY id, key'
+    con = sqlite3.connect(db)
+    try:
+        expected = con.execute(query).fetchall()
+    finally:
+        con.close()
+    with QueryService(db, size=1) as service:
+        assert list(service.stream(query, fetch_size=2)) == expected
+        # The connection is back in the pool once the rows are exhausted
+        assert service.report('N_WAYS') == [(2,)]
+
+
+def test_report_async(db):
+    with QueryService(db) as service:
+        async def run():
+            return await asyncio.gather(service.report_async('N_NODES'), service.report_async('N_WAYS'))
+
+        assert asyncio.run(run()) == [[(3,)], [(2,)]]
+
+
+def test_wal_is_opt_in(db):
+    with QueryService(db) as service:
+        service.report('N_NODES')
+    assert journal_mode(db) == 'delete'
+    with QueryService(db, wal=True) as service:
+        service.report('N_NODES')
+    assert journal_mode(db) == 'wal'
+
+
+def test_connections_are_read_only(db):
+    with QueryService(db, size=1) as service:
+        with pytest.raises(sqlite3.OperationalError):
+            service.run(lambda con: con.execute(INSERT_NODE))
@@ -0,0 +1,54 @@
+import sqlite3
+
+import pytest
+
+from p3_osm.aggregates import report
+from p3_osm.database import load_sqlite
+from p3_osm.queries import NAMED_QUERIES
+from p3_osm.shards import ShardSet, load_shards
+
+TABLES = ('nodes', 'nodes_tags', 'ways', 'ways_nodes', 'ways_tags', 'relations', 'relations_members',
+          'relations_tags')
+
+
+@pytest.fixture
+def full_db(osm_file, tmp_path):
+    db = str(tmp_path / 'full.db')
+    load_sqlite(osm_file, db)
+    con = sqlite3.connect(db)
+    yield con
+    con.close()
+
+
+@pytest.mark.parametrize('scheme,size', [('tile', 0.01), ('id', 5)])
+def test_shards_partition_the_tables(osm_file, full_db, tmp_path, scheme, size):
+    out_dir = str(tmp_path / 'shards')
+    manifest = load_shards(osm_file, out_dir, scheme, size)
+    assert len(manifest['shards']) > 1
+    paths = ShardSet(out_dir).select()
+    for table in TABLES:
+        rows = []
+        for path in paths:
+            con = sqlite3.connect(path)
+            rows.extend(con.execute('SELECT * FROM %s' % table))
+            con.close()
+        assert sorted(rows) == sorted(full_db.execute('SELECT * FROM %s' % table)), table
+
+
+def test_relation_follows_its_way_into_a_tile(osm_file, tmp_path):
+    out_dir = str(tmp_path / 'shards')
+    load_shards(osm_file, out_dir, 'tile', 0.01)
+    for path in ShardSet(out_dir).select():
+        con = sqlite3.connect(path)
+        if con.execute('SELECT 1 FROM ways WHERE id = 10').fetchone():
+            assert con.execute('SELECT 1 FROM relations WHERE id = 20').fetchone()
+        con.close()
+
+
+@pytest.mark.parametrize('aggregates', [True, False])
+def test_shard_reports_match_single_database(osm_file, full_db, tmp_path, aggregates):
+    out_dir = str(tmp_path / 'shards')
+    load_shards(osm_file, out_dir, 'tile', 0.01)
+    for name, rows in ShardSet(out_dir).reports(aggregates=aggregates):
+        assert rows == report(full_db, name, False), name
+    assert [name for name, rows in ShardSet(out_dir).reports()] == [name for name, query in NAMED_QUERIES]
@@ -0,0 +1,164 @@
+import math
+import random
+import sqlite3
+
+import pytest
+
+from p3_osm.database import load_sqlite
+from p3_osm.spatial import (EARTH_RADIUS, bbox, bbox_around, distance, nearest_nodes, nodes_in_bbox, nodes_within,
+                            update_spatial_index, ways_in_bbox)
+
+from conftest import write_osm
+
+# Just outside a bbox edge, but within the rounding of a 32 bit float at these coordinates
+NUDGE = 1e-9
+
+
+def grid_osm(n=20):
+    """A grid of n x n jittered nodes around Berlin, every third one a cafe, with a way along each row"""
+    rng = random.Random(7)
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<osm version="0.6">']
+    for i in range(n):
+        for j in range(n):
+            node_id = i * n + j + 1
+            lat = 52.5 + i * 0.001 + rng.uniform(0, 0.0005)
+            lon = 13.4 + j * 0.001 + rng.uniform(0, 0.0005)
+            tag = '<tag k="amenity" v="cafe"/>' if node_id % 3 == 0 else ''
+            lines.append(' <node id="%d" lat="%.7f" lon="%.7f" user="a" uid="1" version="1" changeset="1" '
+                         'timestamp="2016-01-01T00:00:00Z">%s</node>' % (node_id, lat, lon, tag))
+    for i in range(n):
+        refs = ''.join('<nd ref="%d"/>' % (i * n + j + 1) for j in range(0, n, 2 + i % 3))
+        lines.append(' <way id="%d" user="a" uid="1" version="1" changeset="1" '
+                     'timestamp="2016-01-01T00:00:00Z">%s</way>' % (1000 + i, refs))
+    lines.append('</osm>')
+    return '\n'.join(lines) + '\n'
+
+
+@pytest.fixture
+def con(tmp_path):
+    osm_file = write_osm(tmp_path / 'grid.osm', grid_osm())
+    db = str(tmp_path / 'grid.db')
+    load_sqlite(osm_file, db, geometry=True, aggregates=False, reconcile=False)
+    con = sqlite3.connect(db)
+    yield con
+    con.close()
+
+
+def all_nodes(con, key=None, value=None):
+    query = 'SELECT id, lat, lon FROM nodes'
+    if key is not None:
+        query += (' WHERE id IN (SELECT id FROM nodes_tags WHERE key = :key'
+                  ' AND (:value IS NULL OR value = :value))')
+    return con.execute(query, {'key': key, 'value': value}).fetchall()
+
+
+def brute_nodes_in_bbox(con, box, key=None, value=None):
+    return sorted(row for row in all_nodes(con, key, value)
+                  if box['min_lat'] <= row[1] <= box['max_lat'] and box['min_lon'] <= row[2] <= box['max_lon'])
+
+
+def brute_nodes_within(con, lat, lon, radius, key=None, value=None):
+    found = [(distance(lat, lon, node_lat, node_lon), node_id, node_lat, node_lon)
+             for node_id, node_lat, node_lon in all_nodes(con, key, value)]
+    return sorted(row for row in found if row[0] <= radius)
+
+
+def brute_ways_in_bbox(con, box):
+    return sorted(way_id for way_id, min_lat, min_lon, max_lat, max_lon in
+                  con.execute('SELECT id, min_lat, min_lon, max_lat, max_lon FROM ways_geometry')
+                  if max_lat >= box['min_lat'] and min_lat <= box['max_lat']
+                  and max_lon >= box['min_lon'] and min_lon <= box['max_lon'])
+
+
+BOXES = [bbox(52.503, 13.404, 52.509, 13.411), bbox(52.4, 13.3, 52.6, 13.5), bbox(52.0, 13.0, 52.1, 13.1)]
+
+
+@pytest.mark.parametrize('box', BOXES)
+@pytest.mark.parametrize('key, value', [(None, None), ('amenity', None), ('amenity', 'cafe'), ('amenity', 'bar')])
+def test_nodes_in_bbox(con, box, key, value):
+    assert sorted(nodes_in_bbox(con, box, key, value)) == brute_nodes_in_bbox(con, box, key, value)
+
+
+@pytest.mark.parametrize('box', BOXES)
+def test_ways_in_bbox(con, box):
+    assert sorted(ways_in_bbox(con, box)) == brute_ways_in_bbox(con, box)
+
+
+def test_bbox_edges_are_exact(con):
+    node_id, lat, lon = con.execute('SELECT id, lat, lon FROM nodes WHERE id = 50').fetchone()
+    # On the edge, the node is in the bbox, and just past it, it isn't, however the R*Tree rounded it
+    assert node_id in [row[0] for row in nodes_in_bbox(con, bbox(lat, lon, lat + 0.01, lon + 0.01))]
+    assert node_id not in [row[0] for row in nodes_in_bbox(con, bbox(lat + NUDGE, lon, lat + 0.01, lon + 0.01))]
+    assert node_id not in [row[0] for row in nodes_in_bbox(con, bbox(lat - 0.01, lon - 0.01, lat - NUDGE, lon))]
+
+    min_lat, min_lon, max_lat, max_lon = con.execute(
+        'SELECT min_lat, min_lon, max_lat, max_lon FROM ways_geometry WHERE id = 1005').fetchone()
+    for box in (bbox(max_lat, max_lon, max_lat + 1, max_lon + 1), bbox(max_lat + NUDGE, min_lon, max_lat + 1, max_lon),
+                bbox(min_lat - 1, min_lon - 1, min_lat - NUDGE, max_lon)):
+        assert sorted(ways_in_bbox(con, box)) == brute_ways_in_bbox(con, box)
+    assert 1005 in ways_in_bbox(con, bbox(max_lat, max_lon, max_lat + 1, max_lon + 1))
+    assert 1005 not in ways_in_bbox(con, bbox(max_lat + NUDGE, min_lon, max_lat + 1, max_lon))
+
+
+@pytest.mark.parametrize('radius', [0.0, 50.0, 300.0, 5000.0])
+@pytest.mark.parametrize('key, value', [(None, None), ('amenity', 'cafe')])
+def test_nodes_within(con, radius, key, value):
+    lat, lon = 52.5087, 13.4093
+    assert nodes_within(con, lat, lon, radius, key, value) == brute_nodes_within(con, lat, lon, radius, key, value)
+
+
+def destination(lat, lon, bearing, radius):
+    phi, lam, theta, angle = math.radians(lat), math.radians(lon), math.radians(bearing), radius / EARTH_RADIUS
+    phi2 = math.asin(math.sin(phi) * math.cos(angle) + math.cos(phi) * math.sin(angle) * math.cos(theta))
+    lam2 = lam + math.atan2(math.sin(theta) * math.sin(angle) * math.cos(phi),
+                            math.cos(angle) - math.sin(phi) * math.sin(phi2))
+    return math.degrees(phi2), (math.degrees(lam2) + 180.0) % 360.0 - 180.0
+
+
+@pytest.mark.parametrize('lat', [0.0, 52.5, -60.0, 80.0, 89.99])
+@pytest.mark.parametrize('radius', [10.0, 1000.0, 100000.0])
+def test_bbox_around_contains_the_circle(lat, radius):
+    box = bbox_around(lat, 13.4, radius)
+    for bearing in range(360):
+        point_lat, point_lon = destination(lat, 13.4, bearing, radius)
+        assert box['min_lat'] - 1e-9 <= point_lat <= box['max_lat'] + 1e-9
+        assert box['min_lon'] - 1e-9 <= point_lon <= box['max_lon'] + 1e-9
+
+
+@pytest.mark.parametrize('k', [1, 5, 60, 400, 1000])
+@pytest.mark.parametrize('key, value', [(None, None), ('amenity', 'cafe')])
+def test_nearest_nodes(con, k, key, value):
+    # A small first radius, so that most of these have to widen the search a few times
+    lat, lon = 52.5087, 13.4093
+    expected = brute_nodes_within(con, lat, lon, float('inf'), key, value)[:k]
+    assert nearest_nodes(con, lat, lon, k, key, value, radius=10.0) == expected
+
+
+def test_nearest_nodes_far_away(con):
+    # From the other side of the world, the search widens until it covers the whole globe
+    assert len(nearest_nodes(con, -52.5, -166.6, 3)) == 3
+
+
+def test_update_spatial_index(con):
+    con.execute('UPDATE nodes SET lat = 52.6, lon = 13.6 WHERE id = 1')
+    con.execute('DELETE FROM nodes WHERE id = 2')
+    con.execute('UPDATE ways_geometry SET min_lat = 52.6, max_lat = 52.61, min_lon = 13.6, max_lon = 13.61 '
+                'WHERE id = 1000')
+    con.execute('DELETE FROM ways_geometry WHERE id = 1001')
+    update_spatial_index(con, [1, 2], [1000, 1001])
+    for box in BOXES + [bbox(52.59, 13.59, 52.62, 13.62)]:
+        assert sorted(nodes_in_bbox(con, box)) == brute_nodes_in_bbox(con, box)
+        assert sorted(ways_in_bbox(con, box)) == brute_ways_in_bbox(con, box)
+    assert [row[0] for row in nodes_in_bbox(con, bbox(52.59, 13.59, 52.62, 13.62))] == [1]
+    assert ways_in_bbox(con, bbox(52.59, 13.59, 52.62, 13.62)) == [1000]
+    assert con.execute('SELECT COUNT(*) FROM nodes_rtree WHERE id = 2').fetchone() == (0,)
+    assert con.execute('SELECT COUNT(*) FROM ways_rtree WHERE id = 1001').fetchone() == (0,)
+
+
+def test_update_spatial_index_without_rtree(tmp_path):
+    con = sqlite3.connect(str(tmp_path / 'plain.db'))
+    try:
+        con.execute('CREATE TABLE nodes (id INTEGER, lat REAL, lon REAL)')
+        update_spatial_index(con, [1], [2])
+    finally:
+        con.close()
@@ -0,0 +1,94 @@
+import sqlite3
+
+from p3_osm.aggregates import report
+from p3_osm.database import load_sqlite
+from p3_osm.queries import NAMED_QUERIES
+from p3_osm.updates import apply_changes
+
+from conftest import SAMPLE_OSM, write_osm
+
+TABLES = ('nodes', 'nodes_tags', 'ways', 'ways_nodes', 'ways_tags', 'relations', 'relations_members',
+          'relations_tags', 'ways_geometry', 'tag_counts', 'user_counts', 'element_counts', 'category_counts')
+
+NODE_1 = '''<node id="1" lat="52.5201" lon="13.4051" user="anna" uid="10" version="1" changeset="100" timestamp="2016-01-01T00:00:00Z">
+  <tag k="amenity" v="restaurant"/>
+  <tag k="cuisine" v="italian"/>
+  <tag k="addr:street" v="Foo Str."/>
+  <tag k="phone" v="030 1234567"/>
+ </node>'''
+NODE_1_MODIFIED = '''<node id="1" lat="52.5251" lon="13.4001" user="carl" uid="12" version="2" changeset="200" timestamp="2016-02-01T00:00:00Z">
+  <tag k="amenity" v="restaurant"/>
+  <tag k="cuisine" v="german"/>
+ </node>'''
+NODE_4 = '''<node id="4" lat="52.5501" lon="13.4351" user="carl" uid="12" version="1" changeset="201" timestamp="2016-02-02T00:00:00Z">
+  <tag k="amenity" v="cafe"/>
+  <tag k="addr:street" v="Neue Str."/>
+ </node>'''
+WAY_10 = SAMPLE_OSM[SAMPLE_OSM.index(' <way id="10"'):SAMPLE_OSM.index(' <way id="11"')]
+WAY_10_MODIFIED = ''' <way id="10" user="carl" uid="12" version="2" changeset="202" timestamp="2016-02-03T00:00:00Z">
+  <nd ref="1"/>
+  <nd ref="2"/>
+  <nd ref="3"/>
+  <nd ref="4"/>
+  <tag k="highway" v="residential"/>
+  <tag k="name" v="Foo Straße"/>
+  <tag k="addr:street" v="Foo Strasse"/>
+ </way>
+'''
+WAY_11 = SAMPLE_OSM[SAMPLE_OSM.index(' <way id="11"'):SAMPLE_OSM.index(' <relation')]
+
+CHANGES = '''<?xml version="1.0" encoding="UTF-8"?>
+<osmChange version="0.6" generator="test">
+ <modify>
+ %s
+  <node id="2" lat="52.5301" lon="13.4151" user="ben" uid="11" version="1" changeset="99" timestamp="2015-12-01T00:00:00Z">
+   <tag k="amenity" v="stale"/>
+  </node>
+%s
+ </modify>
+ <create>
+ %s
+ </create>
+ <delete>
+  <way id="11" user="carl" uid="12" version="2" changeset="203" timestamp="2016-02-04T00:00:00Z"/>
+  <node id="99" user="carl" uid="12" version="2" changeset="203" timestamp="2016-02-04T00:00:00Z"/>
+ </delete>
+</osmChange>
+''' % (NODE_1_MODIFIED, WAY_10_MODIFIED, NODE_4)
+
+# SAMPLE_OSM as it is after CHANGES
+CHANGED_OSM = SAMPLE_OSM.replace(NODE_1, NODE_1_MODIFIED).replace(WAY_10, ' %s\n%s' % (NODE_4, WAY_10_MODIFIED))
+CHANGED_OSM = CHANGED_OSM.replace(WAY_11, '')
+
+
+def table_rows(db):
+    con = sqlite3.connect(db)
+    try:
+        tables = dict((table, sorted(con.execute('SELECT * FROM %s' % table))) for table in TABLES)
+        tables['reports'] = [report(con, name) for name, query in NAMED_QUERIES]
+        return tables
+    finally:
+        con.close()
+
+
+def test_apply_changes_matches_loading_the_changed_file(osm_file, tmp_path):
+    assert CHANGED_OSM.count('<node') == 4 and '<way id="11"' not in CHANGED_OSM
+    db = str(tmp_path / 'sample.db')
+    load_sqlite(osm_file, db, geometry=True)
+    osc_file = write_osm(tmp_path / 'changes.osc', CHANGES)
+    counts = apply_changes(osc_file, db, geometry=True)
+    assert counts == {'create': 1, 'modify': 2, 'delete': 1, 'skipped': 2}
+
+    expected = str(tmp_path / 'expected.db')
+    load_sqlite(write_osm(tmp_path / 'changed.osm', CHANGED_OSM), expected, geometry=True)
+    assert table_rows(db) == table_rows(expected)
+
+
+def test_apply_changes_twice_changes_nothing(osm_file, tmp_path):
+    db = str(tmp_path / 'sample.db')
+    load_sqlite(osm_file, db)
+    osc_file = write_osm(tmp_path / 'changes.osc', CHANGES)
+    apply_changes(osc_file, db)
+    rows = table_rows(db)
+    assert apply_changes(osc_file, db) == {'create': 0, 'modify': 0, 'delete': 0, 'skipped': 6}
+    assert table_rows(db) == rows
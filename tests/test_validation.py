@@ -0,0 +1,75 @@
+import csv
+import os
+
+import pytest
+
+from p3_osm.export import process_map, process_map_parallel
+from p3_osm.validation import REJECTS_FIELDS, Validator
+
+from conftest import SAMPLE_OSM, write_osm
+
+
+def node(node_id, uid='10', tags=()):
+    return ('node', {'node': {'id': node_id, 'lat': '52.5', 'lon': '13.4', 'user': 'anna', 'uid': uid,
+                              'version': '1', 'changeset': '1', 'timestamp': '2016-01-01T00:00:00Z'},
+                     'node_tags': [dict(id=node_id, key=k, value=v, type='regular') for k, v in tags]})
+
+
+def way_with_tag(key):
+    return ('way', {'way': {'id': '5', 'user': 'ben', 'uid': '11', 'version': '1', 'changeset': '1',
+                            'timestamp': '2016-01-01T00:00:00Z'},
+                    'way_nodes': [{'id': '5', 'node_id': '1', 'position': 0}],
+                    'way_tags': [{'id': '5', 'key': key, 'value': 'x', 'type': 'regular'}]})
+
+
+def read_rejects(path):
+    with open(path, encoding='utf-8', newline='') as f:
+        return list(csv.reader(f))
+
+
+def test_rejects_bad_values_with_header(tmp_path):
+    path = str(tmp_path / 'rejects.csv')
+    with Validator(rejects_path=path) as validator:
+        passed = validator.filter([node('1'), node('2', uid='abc'), node('3', tags=[('amenity', 'cafe')])])
+    assert [el['node']['id'] for tag, el in passed] == ['1', '3']
+    assert (validator.seen, validator.checked, validator.rejected) == (3, 3, 1)
+    rows = read_rejects(path)
+    assert rows[0] == REJECTS_FIELDS
+    assert rows[1:] == [['node', '2', 'nodes', 'uid', 'abc', 'not INTEGER']]
+
+
+def test_not_null_text_columns(tmp_path):
+    with Validator(rejects_path=str(tmp_path / 'rejects.csv')) as validator:
+        assert validator.filter([way_with_tag('')]) == []
+        assert validator.filter([way_with_tag(None)]) == []
+        assert len(validator.filter([way_with_tag('highway')])) == 1
+    # nodes_tags.key may be empty, as the schema does not make it NOT NULL
+    with Validator(rejects_path=str(tmp_path / 'rejects.csv')) as validator:
+        assert len(validator.filter([node('1', tags=[('', 'x')])])) == 1
+
+
+def test_sampling_checks_every_nth_element(tmp_path):
+    with Validator(sample=2, rejects_path=str(tmp_path / 'rejects.csv')) as validator:
+        passed = validator.filter([node(str(i), uid='abc') for i in range(1, 6)])
+    # The 1st, 3rd and 5th elements are checked and rejected, the others pass unchecked
+    assert [el['node']['id'] for tag, el in passed] == ['2', '4']
+    assert (validator.seen, validator.checked, validator.rejected) == (5, 3, 3)
+
+
+@pytest.mark.parametrize('sample', [0, -1])
+def test_sample_has_to_be_positive(sample):
+    with pytest.raises(ValueError):
+        Validator(sample=sample)
+
+
+def test_parallel_rejects_have_one_header(tmp_path, monkeypatch):
+    osm_file = write_osm(tmp_path / 'bad.osm', SAMPLE_OSM.replace('uid="11"', 'uid="x"'))
+    monkeypatch.chdir(str(tmp_path))
+    os.makedirs('serial')
+    validator = Validator(rejects_path=os.path.join('serial', 'rejects.csv'))
+    process_map(osm_file, validate=validator)
+    parallel = Validator(rejects_path='rejects.csv')
+    process_map_parallel(osm_file, validate=parallel, processes=2, chunk_size=200)
+    assert read_rejects('rejects.csv') == read_rejects(os.path.join('serial', 'rejects.csv'))
+    assert read_rejects('rejects.csv')[0] == REJECTS_FIELDS
+    assert parallel.rejected == validator.rejected == 2